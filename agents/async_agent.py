@@ -0,0 +1,272 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    MAX_RETRIES, LLM_MAX_IN_FLIGHT, LLM_RATE_LIMIT, LLM_RATE_BURST,
+    LLM_TIMEOUT, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, PLAN_REASK_ATTEMPTS
+)
+from agents.backends import TASK_CLASSIFY, TASK_PLAN
+from agents.file_agent import FileManagementAgent, record_llm_request
+from agents.plan_parser import PlanEntry, PlanStreamParser
+from agents.planner import SUMMARY_COLUMNS, summarize_file
+from utils.metrics import LLM_RETRIES
+
+# Exception classes of the OpenAI and httpx clients worth retrying, matched by
+# name so neither package has to be imported
+_TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+                     "TimeoutException", "NetworkError", "RemoteProtocolError"}
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed chat request may succeed when retried.
+
+    Timeouts, connection errors, rate limits (HTTP 429) and server errors
+    (HTTP 5xx) are transient; anything else, such as an invalid request or
+    a rejected API key, fails the same way every time.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and (status in (408, 429) or status >= 500)
+
+
+class AsyncTokenBucket:
+    """Token-bucket rate limiter: ``rate`` requests per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if not self.rate:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncFileManagementAgent:
+    """
+    asyncio front end for ``FileManagementAgent``.
+
+    Reuses the synchronous agent's prompts, response cache and planner, but
+    sends requests with the chat model's ``ainvoke`` so a folder scan can keep
+    many requests in flight. All calls share one semaphore (``max_in_flight``)
+    and one token bucket and time out after ``timeout`` seconds; transient
+    failures (see ``is_transient``) are retried up to ``max_retries`` times
+    with exponential backoff and jitter, never waiting longer than
+    ``LLM_BACKOFF_MAX`` seconds.
+    """
+
+    def __init__(self, agent: Optional[FileManagementAgent] = None,
+                 max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 rate_limit: float = LLM_RATE_LIMIT,
+                 rate_burst: int = LLM_RATE_BURST,
+                 timeout: Optional[float] = LLM_TIMEOUT,
+                 max_retries: int = MAX_RETRIES):
+        self.agent = agent or FileManagementAgent()
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = AsyncTokenBucket(rate_limit, rate_burst)
+        self.retries = 0
+
+        # Created on first use so they bind to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def _ainvoke(self, messages: List[Any], task: str = TASK_CLASSIFY) -> str:
+        """Send messages to the task's model through the cache, deduplicating identical concurrent requests."""
+        cache = self.agent.cache
+        key = self.agent.cache_key(messages, task)
+
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                cache.record("hits")
+                return cached
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            if cache is not None:
+                cache.record("deduplicated")
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if cache is not None:
+                cache.record("misses")
+            response = await self._call_with_retries(messages, task)
+            if cache is not None:
+                cache.put(key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _call_with_retries(self, messages: List[Any], task: str) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    await self.rate_limiter.acquire()
+                    start = time.perf_counter()
+                    call = self._achat(messages, task)
+                    if self.timeout:
+                        message = await asyncio.wait_for(call, self.timeout)
+                    else:
+                        message = await call
+                record_llm_request(messages, message.content, time.perf_counter() - start, "async")
+                return message.content
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e):
+                    raise
+                delay = LLM_BACKOFF_BASE * (2 ** attempt)
+                attempt += 1
+                self.retries += 1
+                LLM_RETRIES.inc()
+                await asyncio.sleep(min(LLM_BACKOFF_MAX, delay + random.uniform(0, delay)))
+
+    def _achat(self, messages: List[Any], task: str):
+        chat = self.agent.chat_for(task)
+        if hasattr(chat, "ainvoke"):
+            return chat.ainvoke(messages)
+        return asyncio.get_running_loop().run_in_executor(None, chat.invoke, messages)
+
+    async def aanalyze_file(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of ``FileManagementAgent.analyze_file``."""
+        response = await self._ainvoke(self.agent._analyze_file_messages(file_info))
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "file_info": file_info,
+            "ai_analysis": response
+        }
+
+    async def aanalyze_files(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Async version of ``FileManagementAgent.analyze_files``."""
+        if len(files) == 1:
+            return [await self.aanalyze_file(files[0])]
+
+        response = await self._ainvoke(self.agent._batch_messages(files))
+        results = self.agent._batch_results(files, response, self.aanalyze_file)
+        # Files the model skipped come back as coroutines from the fallback
+        pending = [index for index, result in enumerate(results) if asyncio.iscoroutine(result)]
+        for index, result in zip(pending, await asyncio.gather(*(results[i] for i in pending))):
+            results[index] = result
+        return results
+
+    async def agenerate_metadata(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of ``FileManagementAgent.generate_metadata``."""
+        response = await self._ainvoke(self.agent._metadata_messages(file_info))
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "file_info": file_info,
+            "metadata_suggestions": response
+        }
+
+    async def asuggest_organization(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Async version of ``FileManagementAgent.suggest_organization``; all chunks are sent concurrently."""
+        planner = self.agent.planner
+        # Chunking summarizes (and for ClusterPlanner clusters) every file; keep it off the event loop
+        chunks = await asyncio.get_running_loop().run_in_executor(None, planner.chunk, files)
+        partials = await asyncio.gather(*(self._aplan_chunk(chunk) for chunk in chunks))
+        plan = planner.merge(files, partials)
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "files": files,
+            "organization_suggestions": self.agent._format_plan(plan),
+            "plan": plan
+        }
+
+    async def aexecute_organization(self, files: List[Dict[str, Any]],
+                                    suggestions: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of ``FileManagementAgent.execute_organization``; moves run in a worker thread."""
+        try:
+            if suggestions.get('plan') is not None:
+                file_moves = suggestions['plan']['moves']
+            else:
+                file_moves = await self._amoves_from_suggestions(files, suggestions['organization_suggestions'])
+        except Exception as e:
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "error": str(e),
+                "successful_moves": [],
+                "failed_moves": []
+            }
+
+        return await asyncio.get_running_loop().run_in_executor(None, self.agent.apply_moves, files, file_moves)
+
+    async def _aplan_chunk(self, chunk: List[Tuple[int, str]]) -> Dict[str, Any]:
+        """Async version of ``OrganizationPlanner._plan_chunk``."""
+        planner = self.agent.planner
+        notes: List[str] = []
+        entries = await self._aplan_entries(chunk, planner.chunk_messages(chunk), planner.columns, notes)
+        return {"entries": entries, "notes": notes}
+
+    async def _aplan_entries(self, chunk: List[Tuple[int, str]], messages: List[Any], columns: str,
+                             notes: List[str]) -> List[PlanEntry]:
+        """Async version of ``FileManagementAgent._plan_entries``, returning the entries once all have arrived."""
+        entries = []
+        parser = PlanStreamParser(row_id for row_id, _ in chunk)
+        for attempt in range(PLAN_REASK_ATTEMPTS + 1):
+            entries.extend(parser.feed(await self._ainvoke(messages, TASK_PLAN)))
+            parser.close()
+            if parser.notes:
+                notes.append(parser.notes)
+            pending = parser.pending()
+            if not pending or attempt == PLAN_REASK_ATTEMPTS:
+                break
+            messages = self.agent._reask_messages(chunk, columns, pending)
+            parser = PlanStreamParser(pending)
+        return entries
+
+    async def _amoves_from_suggestions(self, files: List[Dict[str, Any]], suggestions: str) -> Dict[str, str]:
+        """Turn free-form suggestions into moves, re-asking only for invalid or missing entries."""
+        chunk = [(file_id, summarize_file(file_id, file_info)) for file_id, file_info in enumerate(files)]
+        messages = self.agent._suggestion_moves_messages(files, suggestions)
+        file_moves = {}
+        for entry in await self._aplan_entries(chunk, messages, SUMMARY_COLUMNS, []):
+            file_info = files[entry.id]
+            file_moves[file_info['path']] = str(PurePosixPath(entry.folder) / file_info['name'])
+
+        # Files without a valid entry go to their category folder
+        for file_info in files:
+            if file_info['path'] not in file_moves:
+                folder = file_info.get('category') or "Other"
+                file_moves[file_info['path']] = str(PurePosixPath(folder) / file_info['name'])
+        return file_moves
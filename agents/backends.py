@@ -0,0 +1,105 @@
+"""
+Chat model backends and per-task model routing.
+
+``AI_BACKEND`` selects where requests go:
+
+    "openai"          the OpenAI API
+    "local"           any OpenAI-compatible server at ``AI_BASE_URL`` (llama.cpp,
+                      vLLM, Ollama, LM Studio or ``agents/local_server.py``)
+    "fake"            in-process ``FakeChatModel``, no network at all
+    "package.module:factory"
+                      an in-process model: ``factory(model=..., temperature=...)``
+                      returns an object with ``invoke`` (and optionally ``stream``
+                      and ``ainvoke``) taking and returning LangChain-style messages
+
+Every request belongs to a task. Per-file classification and metadata use
+``AI_CLASSIFY_MODEL`` and folder-level planning uses ``AI_PLAN_MODEL``, so a
+small fast model can handle the many per-file calls and a larger one the few
+planning calls. Both default to ``AI_MODEL``.
+"""
+import importlib
+from typing import Any, Callable, Dict, Optional
+
+from config import (
+    AI_BACKEND, AI_BASE_URL, AI_MODEL, AI_CLASSIFY_MODEL, AI_PLAN_MODEL, AI_TEMPERATURE, OPENAI_API_KEY
+)
+
+TASK_CLASSIFY = "classify"  # per-file classification, batches and metadata
+TASK_PLAN = "plan"  # folder-level organization plans and moves
+
+BackendFactory = Callable[..., Any]
+
+_BACKENDS: Dict[str, BackendFactory] = {}
+
+
+def register_backend(name: str, factory: BackendFactory) -> None:
+    """
+    Make ``factory`` available as ``AI_BACKEND = name``.
+
+    Args:
+        name (str): Backend name
+        factory (BackendFactory): Called with ``model`` and ``temperature``;
+            returns the chat model
+    """
+    _BACKENDS[name] = factory
+
+
+def model_for(task: str) -> str:
+    """The model configured for a task."""
+    if task == TASK_PLAN:
+        return AI_PLAN_MODEL or AI_MODEL
+    return AI_CLASSIFY_MODEL or AI_MODEL
+
+
+def create_chat_model(model: str, temperature: float = AI_TEMPERATURE,
+                      backend: Optional[str] = None) -> Any:
+    """
+    Create a chat model on the configured backend.
+
+    Args:
+        model (str): Model name passed to the backend
+        temperature (float): Sampling temperature
+        backend (Optional[str]): Backend name or ``module:factory``; defaults to ``AI_BACKEND``
+
+    Returns:
+        Any: Chat model with ``invoke``
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    backend = backend or AI_BACKEND
+    factory = _BACKENDS.get(backend)
+    if factory is None:
+        if ":" not in backend:
+            raise ValueError(f"Unknown AI backend: {backend} (expected one of {', '.join(sorted(_BACKENDS))} "
+                             f"or module:factory)")
+        module_name, _, attribute = backend.partition(":")
+        factory = getattr(importlib.import_module(module_name), attribute)
+    return factory(model=model, temperature=temperature)
+
+
+def _openai(model: str, temperature: float, base_url: Optional[str] = None) -> Any:
+    from langchain_community.chat_models import ChatOpenAI
+
+    options = {"openai_api_base": base_url} if base_url else {}
+    return ChatOpenAI(
+        model=model,
+        # Local servers ignore the key, but the client refuses to start without one
+        openai_api_key=OPENAI_API_KEY or ("not-needed" if base_url else None),
+        temperature=temperature,
+        **options
+    )
+
+
+def _local(model: str, temperature: float) -> Any:
+    return _openai(model, temperature, base_url=AI_BASE_URL)
+
+
+def _fake(model: str, temperature: float) -> Any:
+    from agents.fake_chat import FakeChatModel, structured_responder
+    return FakeChatModel(responder=structured_responder, model_name=model, temperature=temperature)
+
+
+register_backend("openai", _openai)
+register_backend("local", _local)
+register_backend("fake", _fake)
@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import AI_CONCURRENCY, BATCH_MAX_FILES, BATCH_MAX_TOKENS, BATCH_WINDOW
+from agents.tokens import estimate_tokens
+
+
+class ClassificationBatcher:
+    """
+    Group per-file AI analysis requests into batched prompts.
+
+    Files submitted within ``window`` seconds of the first file in a batch are
+    sent together through ``FileManagementAgent.analyze_files``. A batch is
+    sent early once it holds ``max_files`` files or its file descriptions
+    would exceed ``max_tokens``. Each caller gets a future resolving to the
+    same result shape as ``FileManagementAgent.analyze_file``. Files the
+    model skips are analyzed one by one, and a failure there only fails
+    that file's future.
+    """
+
+    def __init__(self, agent, window: float = BATCH_WINDOW,
+                 max_files: int = BATCH_MAX_FILES, max_tokens: int = BATCH_MAX_TOKENS,
+                 workers: int = AI_CONCURRENCY):
+        self.agent = agent
+        self.window = window
+        self.max_files = max(1, max_files)
+        self.max_tokens = max_tokens
+
+        self._batch: List[Tuple[Dict[str, Any], Future]] = []
+        self._batch_tokens = 0
+        self._deadline: Optional[float] = None
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ai-batch")
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ai-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_info: Dict[str, Any]) -> Future:
+        """
+        Queue a file for batched AI analysis.
+
+        Args:
+            file_info (Dict[str, Any]): Information about the file
+
+        Returns:
+            Future: Resolves to the AI analysis of the file
+        """
+        future: Future = Future()
+        tokens = estimate_tokens(self.agent.describe_file(file_info))
+
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Batcher is stopped")
+            if self._batch and self._batch_tokens + tokens > self.max_tokens:
+                self._flush_locked()
+            self._batch.append((file_info, future))
+            self._batch_tokens += tokens
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.window
+                self._condition.notify()
+            if len(self._batch) >= self.max_files or self._batch_tokens >= self.max_tokens:
+                self._flush_locked()
+        return future
+
+    def stop(self) -> None:
+        """Send whatever is still pending and wait for outstanding batches."""
+        with self._condition:
+            self._running = False
+            self._flush_locked()
+            self._condition.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        with self._condition:
+            while self._running:
+                if self._deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        # Caller holds self._condition
+        batch, self._batch = self._batch, []
+        self._batch_tokens = 0
+        self._deadline = None
+        if batch:
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        files = [file_info for file_info, _ in batch]
+        try:
+            if len(files) == 1:
+                results = [self._analyze_one(files[0])]
+            else:
+                response = self.agent._invoke(self.agent._batch_messages(files))
+                results = self.agent._batch_results(files, response, self._analyze_one)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _analyze_one(self, file_info: Dict[str, Any]) -> Any:
+        """Analyze a single file, returning the exception instead of raising it."""
+        try:
+            return self.agent.analyze_file(file_info)
+        except Exception as e:
+            return e
@@ -0,0 +1,31 @@
+import threading
+from typing import Any, Dict, List
+
+from agents.backends import TASK_CLASSIFY, create_chat_model, model_for
+
+_chat_lock = threading.Lock()
+_chat_models: Dict[str, Any] = {}
+
+
+def get_chat_model(task: str = TASK_CLASSIFY) -> Any:
+    """
+    Return the process-wide chat model for a task, creating it on first use.
+
+    Tasks configured with the same model share one client. The backend
+    (and LangChain or the OpenAI client) is only imported here, so modules
+    that build prompts do not pay for them at import time.
+
+    Args:
+        task (str): ``TASK_CLASSIFY`` or ``TASK_PLAN``
+    """
+    model = model_for(task)
+    with _chat_lock:
+        if model not in _chat_models:
+            _chat_models[model] = create_chat_model(model)
+        return _chat_models[model]
+
+
+def chat_messages(system: str, human: str) -> List[Any]:
+    """Build the system + user message pair sent with every request."""
+    from langchain.schema import HumanMessage, SystemMessage
+    return [SystemMessage(content=system), HumanMessage(content=human)]
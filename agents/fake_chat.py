@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Rows of the planning prompts ("id|name|category|...") and of batched classification ("id: ...")
+_ROW = re.compile(r"^\s*(\d+)\|[^|\n]*\|([^|\n]*)", re.MULTILINE)
+_BATCH_ROW = re.compile(r"^\s*(\d+): ", re.MULTILINE)
+
+
+class FakeMessage:
+    """Minimal stand-in for a LangChain ``AIMessage``."""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+def echo_responder(messages: List[Any]) -> str:
+    """Deterministic default response derived from the prompt."""
+    digest = hashlib.sha1(messages[-1].content.encode("utf-8")).hexdigest()[:8]
+    return f"Fake response {digest}"
+
+
+def structured_responder(messages: List[Any]) -> str:
+    """
+    Answer the agent's structured prompts with valid JSON, and anything else like ``echo_responder``.
+
+    Batched classification prompts get one verdict per file id. Planning
+    prompts get every row id assigned to a folder named after the row's third
+    column (a file's category, or a group's top keyword) in the ``moves`` format.
+    """
+    prompt = messages[-1].content
+    if '"location"' in prompt:
+        verdicts = [{"id": int(file_id), "location": "Sorted", "naming": "keep", "related_types": "none",
+                     "security": "none", "metadata": "none"} for file_id in _BATCH_ROW.findall(prompt)]
+        return json.dumps(verdicts)
+    rows = _ROW.findall(prompt)
+    if not rows:
+        return echo_responder(messages)
+    folders: Dict[str, List[int]] = {}
+    for row_id, label in rows:
+        folder = (label.split(",")[0].strip() or "Misc").title()
+        folders.setdefault(folder, []).append(int(row_id))
+    moves = [{"id": row_id, "folder": folder} for folder, ids in folders.items() for row_id in ids]
+    return json.dumps({"moves": moves, "notes": "Grouped by category"})
+
+
+class FakeChatModel:
+    """
+    Offline chat model with the ``invoke``/``stream`` interface of ``ChatOpenAI``.
+
+    Used to exercise ``FileManagementAgent`` without network access. Responses
+    come from ``responder`` and every call can be delayed by ``latency``
+    seconds to mimic API round trips.
+    """
+
+    def __init__(self, responder: Optional[Callable[[List[Any]], str]] = None,
+                 latency: float = 0.0, model_name: str = "fake-chat",
+                 temperature: float = 0.0, stream_chunk: int = 16, token_latency: float = 0.0):
+        self.responder = responder or echo_responder
+        self.latency = latency
+        self.stream_chunk = stream_chunk
+        self.token_latency = token_latency
+        self.model_name = model_name
+        self.temperature = temperature
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages: List[Any]) -> FakeMessage:
+        """Return a response for the given messages."""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeMessage(self.responder(messages))
+
+    def stream(self, messages: List[Any]) -> Iterator[FakeMessage]:
+        """
+        Return the response in pieces of ``stream_chunk`` characters.
+
+        ``latency`` is spent before the first piece and ``token_latency`` before each later one.
+        """
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = self.responder(messages)
+        for start in range(0, len(response), self.stream_chunk):
+            if start and self.token_latency:
+                time.sleep(self.token_latency)
+            yield FakeMessage(response[start:start + self.stream_chunk])
+
+    async def ainvoke(self, messages: List[Any]) -> FakeMessage:
+        """Async version of ``invoke``."""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return FakeMessage(self.responder(messages))
@@ -1,18 +1,49 @@
-from langchain_community.chat_models import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
-from pathlib import Path
-from typing import Dict, Any, List
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
 import json
+import re
+import time
 from datetime import datetime
-from config import OPENAI_API_KEY, AI_MODEL
+from config import AI_TEMPERATURE, SIMILARITY_PLANNING, PLAN_REASK_ATTEMPTS
+from agents.backends import TASK_CLASSIFY, TASK_PLAN, model_for
+from agents.chat import chat_messages, get_chat_model
+from agents.response_cache import ResponseCache, make_cache_key
+from agents.tokens import estimate_tokens
+from agents.planner import ClusterPlanner, OrganizationPlanner, PLAN_FORMAT, SUMMARY_COLUMNS, summarize_file
+from agents.plan_parser import PlanEntry, PlanStreamParser, merge_streams, reask_prompt
+from utils.move_executor import MoveExecutor, MoveOperation
+from utils.metrics import LLM_SECONDS, LLM_TOKENS
+
+
+def record_llm_request(messages: List[Any], response: str, seconds: float, mode: str) -> None:
+    """Record the latency and estimated token usage of one chat model request."""
+    LLM_SECONDS.observe(seconds, mode=mode)
+    LLM_TOKENS.inc(sum(estimate_tokens(message.content) for message in messages), direction="in")
+    LLM_TOKENS.inc(estimate_tokens(response), direction="out")
+
 
 class FileManagementAgent:
-    def __init__(self):
-        self.chat = ChatOpenAI(
-            model=AI_MODEL,
-            openai_api_key=OPENAI_API_KEY,
-            temperature=0.2
-        )
+    def __init__(self, chat: Optional[Any] = None, cache: Optional[ResponseCache] = None,
+                 move_executor: Optional[MoveExecutor] = None, plan_chat: Optional[Any] = None):
+        """
+        Args:
+            chat (Optional[Any]): Chat model with an ``invoke`` method for per-file requests;
+                defaults to the shared client of ``AI_CLASSIFY_MODEL``
+            cache (Optional[ResponseCache]): Response cache shared across calls
+            move_executor (Optional[MoveExecutor]): Executes and journals organization moves
+            plan_chat (Optional[Any]): Chat model for organization planning; defaults to
+                ``chat`` if one is given, otherwise the shared client of ``AI_PLAN_MODEL``
+        """
+        self._chats = {TASK_CLASSIFY: chat, TASK_PLAN: plan_chat or chat}
+        self.cache = cache
+        # Cache keys name the model, so answers of different models never mix
+        self.model_names = {
+            task: getattr(model, "model_name", model_for(task)) if model is not None else model_for(task)
+            for task, model in self._chats.items()
+        }
+        self.temperature = getattr(chat, "temperature", None) if chat is not None else AI_TEMPERATURE
+        self.planner = ClusterPlanner(self) if SIMILARITY_PLANNING else OrganizationPlanner(self)
+        self.move_executor = move_executor or MoveExecutor()
         
         self.system_message = """You are an intelligent file management assistant. Your role is to:
             1. Analyze files and suggest appropriate organization
@@ -28,6 +59,63 @@ class FileManagementAgent:
             - User's organization preferences
             - Security and privacy concerns"""
     
+    @property
+    def chat(self) -> Any:
+        """The per-file chat model; the shared client is only created when the first request is sent."""
+        return self.chat_for(TASK_CLASSIFY)
+    
+    def chat_for(self, task: str) -> Any:
+        """The chat model routed ``task`` (``TASK_CLASSIFY`` or ``TASK_PLAN``)."""
+        if self._chats[task] is None:
+            self._chats[task] = get_chat_model(task)
+        return self._chats[task]
+    
+    def cache_key(self, messages: List[Any], task: str = TASK_CLASSIFY) -> str:
+        return make_cache_key(messages, self.model_names[task], self.temperature)
+    
+    def _invoke(self, messages: List[Any], task: str = TASK_CLASSIFY) -> str:
+        """Send messages to the task's chat model, going through the response cache if one is set."""
+        if self.cache is None:
+            return self._call(messages, task)
+        
+        return self.cache.get_or_call(self.cache_key(messages, task), lambda: self._call(messages, task))
+    
+    def _call(self, messages: List[Any], task: str = TASK_CLASSIFY) -> str:
+        start = time.perf_counter()
+        response = self.chat_for(task).invoke(messages).content
+        record_llm_request(messages, response, time.perf_counter() - start, "invoke")
+        return response
+    
+    def _stream(self, messages: List[Any], task: str = TASK_PLAN) -> Iterator[str]:
+        """Yield the model's response piece by piece; cached responses arrive as one piece."""
+        chat = self.chat_for(task)
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(messages, task)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.record("hits")
+                yield cached
+                return
+            self.cache.record("misses")
+        if not hasattr(chat, "stream"):
+            response = self._call(messages, task)
+            if key is not None:
+                self.cache.put(key, response)
+            yield response
+            return
+        
+        parts = []
+        start = time.perf_counter()
+        for chunk in chat.stream(messages):
+            if not parts:
+                LLM_SECONDS.observe(time.perf_counter() - start, mode="first_token")
+            parts.append(chunk.content)
+            yield chunk.content
+        record_llm_request(messages, "".join(parts), time.perf_counter() - start, "stream")
+        if key is not None:
+            self.cache.put(key, "".join(parts))
+    
     def analyze_file(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
         """
         Get AI analysis and recommendations for a file.
@@ -38,6 +126,15 @@ class FileManagementAgent:
         Returns:
             Dict[str, Any]: AI analysis and recommendations
         """
+        response = self._invoke(self._analyze_file_messages(file_info))
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "file_info": file_info,
+            "ai_analysis": response
+        }
+    
+    def _analyze_file_messages(self, file_info: Dict[str, Any]) -> List[Any]:
         prompt = f"""Analyze this file and provide recommendations:
         Name: {file_info['name']}
         Type: {file_info['mime_type']}
@@ -54,18 +151,101 @@ class FileManagementAgent:
         4. Any security considerations
         5. Additional metadata suggestions"""
         
-        messages = [
-            SystemMessage(content=self.system_message),
-            HumanMessage(content=prompt)
-        ]
+        return chat_messages(self.system_message, prompt)
+    
+    def describe_file(self, file_info: Dict[str, Any]) -> str:
+        """Compact one-line description of a file used in batched prompts."""
+        return json.dumps({
+            "name": file_info['name'],
+            "type": file_info['mime_type'],
+            "category": file_info['category'],
+            "size": file_info['size'],
+            "modified": file_info['modified'],
+            "metadata": file_info['metadata']
+        }, separators=(',', ':'), default=str)
+    
+    def analyze_files(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Get AI analysis for several files with a single request.
         
-        response = self.chat.invoke(messages).content
+        Args:
+            files (List[Dict[str, Any]]): Information about each file
+            
+        Returns:
+            List[Dict[str, Any]]: One result per file, in the same order and
+            shape as ``analyze_file``. Files missing from the model's answer
+            are analyzed individually.
+        """
+        if len(files) == 1:
+            return [self.analyze_file(files[0])]
         
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "file_info": file_info,
-            "ai_analysis": response
-        }
+        response = self._invoke(self._batch_messages(files))
+        return self._batch_results(files, response, self.analyze_file)
+    
+    def _batch_messages(self, files: List[Dict[str, Any]]) -> List[Any]:
+        listing = "\n".join(f"{index}: {self.describe_file(file_info)}" for index, file_info in enumerate(files))
+        prompt = f"""Analyze each of these files and provide recommendations.
+        Files (one per line, prefixed by id):
+        {listing}
+        
+        Respond with only a JSON array containing one object per file:
+        [{{"id": 0, "location": "suggested organization location", "naming": "recommended naming convention",
+          "related_types": "related file types to consider", "security": "security considerations",
+          "metadata": "additional metadata suggestions"}}]"""
+        
+        return chat_messages(self.system_message, prompt)
+    
+    def _batch_results(self, files: List[Dict[str, Any]], response: str,
+                       fallback: Callable[[Dict[str, Any]], Any]) -> List[Any]:
+        """Fan a batched response out to per-file results; ``fallback`` handles files the model skipped."""
+        verdicts = {}
+        for verdict in self._parse_verdicts(response):
+            if isinstance(verdict, dict) and isinstance(verdict.get("id"), int):
+                verdicts[verdict["id"]] = verdict
+        
+        results = []
+        timestamp = datetime.now().isoformat()
+        for index, file_info in enumerate(files):
+            verdict = verdicts.get(index)
+            if verdict is None:
+                results.append(fallback(file_info))
+                continue
+            results.append({
+                "timestamp": timestamp,
+                "file_info": file_info,
+                "ai_analysis": self._format_verdict(verdict),
+                "verdict": verdict
+            })
+        return results
+    
+    @staticmethod
+    def _parse_verdicts(response: str) -> List[Any]:
+        """Extract the JSON array of per-file verdicts from a model response."""
+        try:
+            verdicts = json.loads(response)
+        except json.JSONDecodeError:
+            match = re.search(r'\[.*\]', response, re.DOTALL)
+            if not match:
+                return []
+            try:
+                verdicts = json.loads(match.group())
+            except json.JSONDecodeError:
+                return []
+        return verdicts if isinstance(verdicts, list) else []
+    
+    @staticmethod
+    def _format_verdict(verdict: Dict[str, Any]) -> str:
+        labels = [
+            ("location", "Suggested organization location"),
+            ("naming", "Recommended naming convention"),
+            ("related_types", "Related file types to consider"),
+            ("security", "Security considerations"),
+            ("metadata", "Additional metadata suggestions")
+        ]
+        return "\n".join(
+            f"{number}. {label}: {verdict.get(key, '')}"
+            for number, (key, label) in enumerate(labels, 1)
+        )
     
     def suggest_organization(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -75,31 +255,31 @@ class FileManagementAgent:
             files (List[Dict[str, Any]]): List of file information
             
         Returns:
-            Dict[str, Any]: Organization suggestions
+            Dict[str, Any]: Organization suggestions, including the merged
+            ``plan`` produced by the token-budgeted planner
         """
-        prompt = f"""Analyze these files and suggest an organization structure:
-        {json.dumps(files, indent=2)}
-        
-        Please provide:
-        1. Suggested folder structure
-        2. File grouping recommendations
-        3. Naming conventions
-        4. Any patterns or relationships to consider
-        5. Security and privacy recommendations"""
-        
-        messages = [
-            SystemMessage(content=self.system_message),
-            HumanMessage(content=prompt)
-        ]
-        
-        response = self.chat.invoke(messages).content
+        plan = self.planner.plan(files)
         
         return {
             "timestamp": datetime.now().isoformat(),
             "files": files,
-            "organization_suggestions": response
+            "organization_suggestions": self._format_plan(plan),
+            "plan": plan
         }
     
+    @staticmethod
+    def _format_plan(plan: Dict[str, Any]) -> str:
+        lines = ["Suggested folder structure:"]
+        for folder, paths in sorted(plan["folders"].items()):
+            names = [Path(path).name for path in paths]
+            shown = ", ".join(names[:5]) + (f", ... (+{len(names) - 5} more)" if len(names) > 5 else "")
+            lines.append(f"- {folder}/ ({len(names)} files): {shown}")
+        if plan["notes"]:
+            lines.append("")
+            lines.append("Recommendations:")
+            lines.extend(plan["notes"])
+        return "\n".join(lines)
+    
     def generate_metadata(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate enhanced metadata suggestions for a file.
@@ -110,6 +290,15 @@ class FileManagementAgent:
         Returns:
             Dict[str, Any]: Enhanced metadata suggestions
         """
+        response = self._invoke(self._metadata_messages(file_info))
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "file_info": file_info,
+            "metadata_suggestions": response
+        }
+    
+    def _metadata_messages(self, file_info: Dict[str, Any]) -> List[Any]:
         prompt = f"""Generate enhanced metadata suggestions for this file:
         {json.dumps(file_info, indent=2)}
         
@@ -120,18 +309,103 @@ class FileManagementAgent:
         4. Related files
         5. Usage recommendations"""
         
-        messages = [
-            SystemMessage(content=self.system_message),
-            HumanMessage(content=prompt)
-        ]
+        return chat_messages(self.system_message, prompt)
+    
+    def _suggestion_moves_messages(self, files: List[Dict[str, Any]], suggestions: str) -> List[Any]:
+        rows = "\n".join(summarize_file(file_id, file_info) for file_id, file_info in enumerate(files))
+        prompt = f"""Based on these organization suggestions, decide which folder each file goes to.
+        Original files ({SUMMARY_COLUMNS}):
+        {rows}
+        Suggestions: {suggestions}
         
-        response = self.chat.invoke(messages).content
+        Respond with only a JSON object, one entry per file id:
+        {PLAN_FORMAT}
+        Folders are relative to the source directory; use descriptive subfolder names based on projects or categories."""
         
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "file_info": file_info,
-            "metadata_suggestions": response
-        }
+        return chat_messages(self.system_message, prompt)
+    
+    def _reask_messages(self, chunk: List[Tuple[int, str]], columns: str, pending: Dict[int, str]) -> List[Any]:
+        rows = "\n".join(row for row_id, row in chunk if row_id in pending)
+        return chat_messages(self.system_message, reask_prompt(columns, rows, pending))
+    
+    def _plan_entries(self, chunk: List[Tuple[int, str]], messages: List[Any], columns: str,
+                      notes: List[str]) -> Iterator[PlanEntry]:
+        """
+        Stream one chunk's plan, yielding each valid entry as soon as it is parsed.
+        
+        Invalid or missing entries are asked for again, up to
+        ``PLAN_REASK_ATTEMPTS`` times, with only the affected rows.
+        """
+        parser = PlanStreamParser(row_id for row_id, _ in chunk)
+        for attempt in range(PLAN_REASK_ATTEMPTS + 1):
+            for text in self._stream(messages, TASK_PLAN):
+                yield from parser.feed(text)
+            parser.close()
+            if parser.notes:
+                notes.append(parser.notes)
+            pending = parser.pending()
+            if not pending or attempt == PLAN_REASK_ATTEMPTS:
+                return
+            messages = self._reask_messages(chunk, columns, pending)
+            parser = PlanStreamParser(pending)
+    
+    def _stream_moves(self, files: List[Dict[str, Any]], streams: List[Iterator[PlanEntry]],
+                      members: Callable[[int], List[int]], plan: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+        """
+        Turn streamed plan entries into (source path, relative destination) moves.
+        
+        Files that no valid entry covers go to their category folder. The
+        resulting folders and moves are recorded in ``plan``.
+        """
+        assigned = set()
+        
+        def place(file_id: int, folder: str) -> Tuple[str, str]:
+            file_info = files[file_id]
+            destination = str(PurePosixPath(folder) / file_info['name'])
+            plan["folders"].setdefault(folder, []).append(file_info['path'])
+            plan["moves"][file_info['path']] = destination
+            return file_info['path'], destination
+        
+        for entry in merge_streams(streams, self.planner.workers):
+            for file_id in members(entry.id):
+                if file_id not in assigned:
+                    assigned.add(file_id)
+                    yield place(file_id, entry.folder)
+        for file_id, file_info in enumerate(files):
+            if file_id not in assigned:
+                yield place(file_id, file_info.get('category') or "Other")
+    
+    def organize(self, files: List[Dict[str, Any]],
+                 on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        Suggest a folder structure and execute it in one streamed request per chunk.
+        
+        Combines ``suggest_organization`` and ``execute_organization``: each
+        file is moved as soon as its plan entry arrives.
+        
+        Args:
+            files (List[Dict[str, Any]]): List of file information
+            on_progress (Optional[Callable]): Called after each move (see ``MoveExecutor.execute``)
+            
+        Returns:
+            Dict[str, Any]: Results of the organization operation, plus the
+            ``plan`` and its ``organization_suggestions`` text
+        """
+        planner = self.planner
+        chunks = planner.chunk(files)
+        plan = {"folders": {}, "moves": {}, "notes": [], "chunks": len(chunks)}
+        streams = [
+            self._plan_entries(chunk, planner.chunk_messages(chunk), planner.columns, plan["notes"])
+            for chunk in chunks
+        ]
+        moves = self._stream_moves(files, streams, lambda row_id: planner.members(files, row_id), plan)
+        results = self.apply_moves(files, moves, on_progress)
+        results.update({
+            "files": files,
+            "plan": plan,
+            "organization_suggestions": self._format_plan(plan)
+        })
+        return results
     
     def execute_organization(self, files: List[Dict[str, Any]], suggestions: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -144,100 +418,51 @@ class FileManagementAgent:
         Returns:
             Dict[str, Any]: Results of the organization operation
         """
-        results = {
-            "timestamp": datetime.now().isoformat(),
-            "successful_moves": [],
-            "failed_moves": []
-        }
+        # Suggestions from the planner already carry the moves; free-form
+        # suggestions are turned into a plan that is streamed and executed
+        # entry by entry
+        if suggestions.get('plan') is not None:
+            return self.apply_moves(files, suggestions['plan']['moves'])
         
-        try:
-            # Parse the AI suggestions to get the folder structure
-            prompt = f"""Based on these organization suggestions, provide a JSON structure of where each file should go.
-            Original files: {json.dumps(files, indent=2)}
-            Suggestions: {suggestions['organization_suggestions']}
-            
-            Create a JSON object where:
-            1. Keys are source file paths
-            2. Values are destination paths (relative to the source directory)
-            3. Use descriptive subfolder names based on projects or categories
-            4. Keep the paths within the same parent directory
-            
-            Example format:
-            {{
-                "/path/to/file.txt": "Project A/docs/file.txt",
-                "/path/to/image.png": "Project B/assets/image.png"
-            }}"""
-            
-            messages = [
-                SystemMessage(content=self.system_message),
-                HumanMessage(content=prompt)
-            ]
-            
-            response = self.chat.invoke(messages).content
-            
-            # Parse the JSON response
-            try:
-                file_moves = json.loads(response)
-            except json.JSONDecodeError:
-                # If the response isn't valid JSON, try to extract it from the text
-                import re
-                json_match = re.search(r'\{.*\}', response.replace('\n', ''), re.DOTALL)
-                if json_match:
-                    file_moves = json.loads(json_match.group())
-                else:
-                    raise ValueError("Could not parse AI suggestions into valid file moves")
+        chunk = [(file_id, summarize_file(file_id, file_info)) for file_id, file_info in enumerate(files)]
+        messages = self._suggestion_moves_messages(files, suggestions['organization_suggestions'])
+        plan = {"folders": {}, "moves": {}, "notes": [], "chunks": 1}
+        stream = self._plan_entries(chunk, messages, SUMMARY_COLUMNS, plan["notes"])
+        return self.apply_moves(files, self._stream_moves(files, [stream], lambda file_id: [file_id], plan))
+    
+    def apply_moves(self, files: List[Dict[str, Any]],
+                    file_moves: Union[Dict[str, str], Iterable[Tuple[str, str]]],
+                    on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        Move files according to a plan.
+        
+        Args:
+            files (List[Dict[str, Any]]): List of file information
+            file_moves (Union[Dict[str, str], Iterable[Tuple[str, str]]]): Source path ->
+                destination relative to the source directory, or a stream of such pairs
+                that is executed as it is produced
+            on_progress (Optional[Callable]): Called after each move
             
+        Returns:
+            Dict[str, Any]: Results of the organization operation, including the move journal
+        """
+        try:
             # Get the base directory from the first file
             if files and 'path' in files[0]:
-                base_dir = str(Path(files[0]['path']).parent)
+                base_dir = Path(files[0]['path']).parent
             else:
                 raise ValueError("No valid files to organize")
             
-            # Execute the moves
-            for source, dest in file_moves.items():
-                try:
-                    source_path = Path(source)
-                    # Make sure the destination is relative to the base directory
-                    dest_path = Path(base_dir) / dest
-                    
-                    # Skip if source and destination are the same
-                    if source_path == dest_path:
-                        continue
-                    
-                    # Create destination directory if it doesn't exist
-                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Move the file
-                    if source_path.exists():
-                        # If destination exists, add a number to the filename
-                        counter = 1
-                        original_dest_path = dest_path
-                        while dest_path.exists():
-                            stem = original_dest_path.stem
-                            suffix = original_dest_path.suffix
-                            dest_path = original_dest_path.parent / f"{stem}_{counter}{suffix}"
-                            counter += 1
-                        
-                        import shutil
-                        shutil.move(str(source_path), str(dest_path))
-                        results["successful_moves"].append({
-                            "source": str(source_path),
-                            "destination": str(dest_path)
-                        })
-                    else:
-                        results["failed_moves"].append({
-                            "source": str(source_path),
-                            "destination": str(dest_path),
-                            "error": "Source file does not exist"
-                        })
-                except Exception as e:
-                    results["failed_moves"].append({
-                        "source": str(source_path),
-                        "destination": str(dest_path),
-                        "error": str(e)
-                    })
-            
-            return results
+            # Destinations are relative to the base directory; collisions are
+            # resolved while planning and every move is journaled for undo
+            if isinstance(file_moves, dict):
+                operations = self.move_executor.plan(
+                    (Path(source), base_dir / dest) for source, dest in file_moves.items()
+                )
+                return self.move_executor.execute(operations, on_progress)
+            return self.move_executor.execute_stream(
+                ((Path(source), base_dir / dest) for source, dest in file_moves), on_progress
+            )
             
         except Exception as e:
             return {
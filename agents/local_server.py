@@ -0,0 +1,209 @@
+"""
+Deterministic OpenAI-compatible chat server for tests and air-gapped setups.
+
+    python -m agents.local_server [--port 8080] [--latency 0.05]
+
+Serves ``POST /v1/chat/completions`` (plain and ``"stream": true``
+server-sent events) and ``GET /v1/models``. Answers come from a responder
+function, ``structured_responder`` by default, so the same prompt always
+gets the same answer and the agent's JSON prompts get valid JSON. Point the
+app at it with ``AI_BACKEND = "local"`` and ``AI_BASE_URL``.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import AI_MODEL, AI_CLASSIFY_MODEL, AI_PLAN_MODEL
+from agents.fake_chat import FakeMessage, structured_responder
+from agents.tokens import estimate_tokens
+
+# Characters per streamed chunk
+STREAM_CHUNK = 16
+
+
+class LocalChatServer:
+    """
+    OpenAI-compatible chat completions endpoint answering with ``responder``.
+
+    Any model name is accepted; ``models`` is what ``/v1/models`` lists.
+    Every request waits ``latency`` seconds, like a model on local hardware.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080,
+                 responder: Callable[[List[Any]], str] = structured_responder,
+                 latency: float = 0.0, models: Optional[Iterable[str]] = None):
+        from http.server import ThreadingHTTPServer
+
+        self.responder = responder
+        self.latency = latency
+        self.models = [model for model in dict.fromkeys(models or (AI_MODEL, AI_CLASSIFY_MODEL, AI_PLAN_MODEL))
+                       if model]
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port actually bound (useful with port 0)."""
+        return self._server.server_address[:2]
+
+    @property
+    def base_url(self) -> str:
+        """Value for ``AI_BASE_URL``."""
+        host, port = self.address
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="local-chat-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def complete(self, request: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Answer one chat completion request.
+
+        Args:
+            request (Dict[str, Any]): Request body with ``model`` and ``messages``
+
+        Returns:
+            Tuple[str, str]: The model name and the response text
+
+        Raises:
+            ValueError: If the request has no messages
+        """
+        messages = request.get("messages")
+        if not isinstance(messages, list) or not messages:
+            raise ValueError("'messages' must be a non-empty list")
+        model = str(request.get("model") or (self.models[0] if self.models else "local"))
+        with self._lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        return model, self.responder([FakeMessage(str(message.get("content") or "")) for message in messages])
+
+    def _handler(self) -> type:
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") == "/v1/models":
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": model, "object": "model", "owned_by": "local"} for model in server.models
+                    ]})
+                else:
+                    self._send_error(404, f"Unknown path {self.path}")
+
+            def do_POST(self) -> None:
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self._send_error(404, f"Unknown path {self.path}")
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    model, response = server.complete(request)
+                except (ValueError, AttributeError) as e:
+                    self._send_error(400, str(e))
+                    return
+
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                if request.get("stream"):
+                    self._stream(completion_id, model, response)
+                    return
+                prompt_tokens = sum(estimate_tokens(str(message.get("content") or ""))
+                                    for message in request["messages"])
+                completion_tokens = estimate_tokens(response)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": response},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    }
+                })
+
+            def _stream(self, completion_id: str, model: str, response: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                created = int(time.time())
+
+                def event(delta: Dict[str, str], finish_reason: Optional[str] = None) -> bytes:
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                    }
+                    return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+                self.wfile.write(event({"role": "assistant", "content": ""}))
+                for start in range(0, len(response), STREAM_CHUNK):
+                    self.wfile.write(event({"content": response[start:start + STREAM_CHUNK]}))
+                self.wfile.write(event({}, "stop"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self, status: int, message: str) -> None:
+                self._send_json(status, {"error": {"message": message, "type": "invalid_request_error"}})
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args(argv)
+
+    server = LocalChatServer(args.host, args.port, latency=args.latency)
+    server.start()
+    print(f"Serving {', '.join(server.models)} at {server.base_url}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, TypeVar
+
+from agents.planner import PLAN_FORMAT, normalize_folder
+from utils.metrics import STAGE_SECONDS
+
+T = TypeVar("T")
+_DONE = object()
+
+# Plan format requested from the model and enforced by ``validate_entry``
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "moves": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "folder": {"type": "string", "minLength": 1}
+                },
+                "required": ["id", "folder"]
+            }
+        },
+        "notes": {"type": "string"}
+    },
+    "required": ["moves"]
+}
+
+
+class PlanEntry(NamedTuple):
+    id: int
+    folder: str
+
+
+def validate_entry(entry: Any, ids: Set[int], assigned: Set[int]) -> PlanEntry:
+    """
+    Check one plan entry against ``PLAN_SCHEMA`` and the ids being planned.
+
+    Args:
+        entry (Any): Decoded entry of the ``moves`` array
+        ids (Set[int]): Ids the plan may assign
+        assigned (Set[int]): Ids already assigned by earlier entries
+
+    Returns:
+        PlanEntry: The entry with its folder normalized
+
+    Raises:
+        ValueError: If the entry is invalid; the message is sent back to the model
+    """
+    if not isinstance(entry, dict):
+        raise ValueError("entry must be an object with \"id\" and \"folder\"")
+    entry_id = entry.get("id")
+    if isinstance(entry_id, str) and entry_id.isdigit():
+        entry_id = int(entry_id)
+    if not isinstance(entry_id, int) or isinstance(entry_id, bool):
+        raise ValueError("\"id\" must be an integer")
+    if entry_id not in ids:
+        raise ValueError(f"unknown id {entry_id}")
+    if entry_id in assigned:
+        raise ValueError(f"id {entry_id} is assigned more than once")
+    folder = entry.get("folder")
+    if not isinstance(folder, str) or not normalize_folder(folder):
+        raise ValueError("\"folder\" must be a non-empty relative path")
+    return PlanEntry(entry_id, normalize_folder(folder))
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for plans streamed in the ``PLAN_SCHEMA`` format.
+
+    Text is fed as it arrives. Each object of the ``moves`` array is decoded
+    and validated as soon as its closing brace is seen, so valid entries can
+    be acted on before the response is complete; invalid entries are kept
+    with their error for a targeted re-ask. Prose or code fences around the
+    JSON are ignored.
+    """
+
+    def __init__(self, ids: Iterable[int]):
+        self.ids = set(ids)
+        self.assigned: Set[int] = set()
+        self.errors: Dict[Optional[int], str] = {}
+        self.notes = ""
+        self.complete = False
+        # Time spent in ``feed``, recorded as one plan_parse observation by ``close``
+        self.parse_seconds = 0.0
+
+        self._buffer = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._entry_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[PlanEntry]:
+        """
+        Consume the next piece of the response.
+
+        Returns:
+            List[PlanEntry]: Valid entries completed by this piece
+        """
+        start = time.perf_counter()
+        self._buffer += text
+        entries = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self.complete:
+                break
+            if self._start is None:
+                if char in "{[":
+                    self._start = pos
+                    self._stack.append(char)
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._stack[-1] == "[" and self._entry_start is None:
+                    self._entry_start = pos
+                self._stack.append(char)
+            elif char in "}]":
+                self._stack.pop()
+                if (char == "}" and self._entry_start is not None
+                        and self._stack and self._stack[-1] == "["):
+                    entry = self._entry(buffer[self._entry_start:pos + 1])
+                    if entry is not None:
+                        entries.append(entry)
+                    self._entry_start = None
+                if not self._stack:
+                    self.complete = True
+                    self._finish(buffer[self._start:pos + 1])
+        self._pos = len(buffer)
+        self.parse_seconds += time.perf_counter() - start
+        return entries
+
+    def close(self) -> None:
+        """Mark the end of the response; a truncated plan leaves its unfinished ids pending."""
+        if not self.complete and self._start is not None:
+            self.errors.setdefault(None, "the response was cut off before the plan was complete")
+        STAGE_SECONDS.observe(self.parse_seconds, stage="plan_parse")
+
+    def pending(self) -> Dict[int, str]:
+        """Ids without a valid entry, with the reason to give the model."""
+        reasons = {entry_id: "missing from the plan" for entry_id in self.ids - self.assigned}
+        for entry_id, message in self.errors.items():
+            if entry_id in reasons:
+                reasons[entry_id] = message
+        return reasons
+
+    def _entry(self, text: str) -> Optional[PlanEntry]:
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.errors.setdefault(None, f"malformed entry {text[:80]!r}: {e.msg}")
+            return None
+        try:
+            entry = validate_entry(raw, self.ids, self.assigned)
+        except ValueError as e:
+            entry_id = raw.get("id") if isinstance(raw, dict) else None
+            self.errors[entry_id if isinstance(entry_id, int) else None] = str(e)
+            return None
+        self.assigned.add(entry.id)
+        return entry
+
+    def _finish(self, text: str) -> None:
+        try:
+            plan = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        if isinstance(plan, dict) and isinstance(plan.get("notes"), str):
+            self.notes = plan["notes"]
+
+
+def reask_prompt(columns: str, rows: str, pending: Dict[int, str]) -> str:
+    """Prompt asking the model to redo only the invalid or missing entries of a plan."""
+    problems = "\n".join(f"- id {entry_id}: {reason}" for entry_id, reason in sorted(pending.items()))
+    return f"""Some entries of your plan were invalid or missing:
+        {problems}
+
+        Rows ({columns}):
+        {rows}
+
+        Respond with only a JSON object with an entry for exactly these ids:
+        {PLAN_FORMAT}"""
+
+
+def merge_streams(streams: List[Iterator[T]], workers: int) -> Iterator[T]:
+    """
+    Interleave several iterators, consuming up to ``workers`` of them concurrently.
+
+    Items are yielded in the order they are produced; an exception raised by
+    any iterator is re-raised once the items produced before it are yielded.
+    """
+    if len(streams) <= 1 or workers <= 1:
+        for stream in streams:
+            yield from stream
+        return
+
+    items: "queue.Queue" = queue.Queue()
+    pending = list(reversed(streams))
+    lock = threading.Lock()
+
+    def drain() -> None:
+        while True:
+            with lock:
+                if not pending:
+                    break
+                stream = pending.pop()
+            try:
+                for item in stream:
+                    items.put((item, None))
+            except Exception as e:
+                items.put((None, e))
+        items.put((_DONE, None))
+
+    threads = [threading.Thread(target=drain, daemon=True) for _ in range(min(workers, len(streams)))]
+    for thread in threads:
+        thread.start()
+    running = len(threads)
+    error = None
+    while running:
+        item, exception = items.get()
+        if item is _DONE:
+            running -= 1
+        elif exception is not None:
+            error = error or exception
+        else:
+            yield item
+    if error is not None:
+        raise error
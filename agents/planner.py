@@ -0,0 +1,308 @@
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from config import AI_CONCURRENCY, PLAN_CHUNK_TOKENS, SIMILARITY_THRESHOLD, SIMILARITY_NEIGHBORS
+from agents.chat import chat_messages
+from agents.tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from utils.similarity import SimilarityIndex
+
+SUMMARY_COLUMNS = "id|name|category|size|modified|details"
+CLUSTER_COLUMNS = "id|files|keywords|categories|examples"
+
+PLAN_FORMAT = '{"moves": [{"id": 0, "folder": "Folder/Subfolder"}, ...], "notes": "..."}'
+
+_MAX_DETAIL_ITEMS = 5
+_MAX_DETAIL_CHARS = 40
+
+
+def _compact_value(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        items = [_compact_value(item) for item in value[:_MAX_DETAIL_ITEMS]]
+        if len(value) > _MAX_DETAIL_ITEMS:
+            items.append(f"+{len(value) - _MAX_DETAIL_ITEMS}")
+        return "[" + ",".join(items) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{k}:{_compact_value(v)}" for k, v in list(value.items())[:_MAX_DETAIL_ITEMS]) + "}"
+    text = str(value).replace("|", "/").replace("\n", " ")
+    return text[:_MAX_DETAIL_CHARS]
+
+
+def summarize_file(file_id: int, file_info: Dict[str, Any]) -> str:
+    """
+    Render a file as one compact row of the columnar summary.
+
+    Metadata is reduced to a few short key/value pairs (e.g. the first CSV
+    headers and the row count) instead of the full analysis.
+    """
+    details = ";".join(
+        f"{key}={_compact_value(value)}"
+        for key, value in file_info.get('metadata', {}).items()
+        if value not in ("", None, [], {})
+    )
+    return "|".join([
+        str(file_id),
+        file_info['name'].replace("|", "/"),
+        file_info.get('category', ''),
+        str(file_info.get('size', '')),
+        str(file_info.get('modified', ''))[:10],
+        details
+    ])
+
+
+def normalize_folder(folder: str) -> str:
+    """
+    Clean a model-proposed folder path so it stays relative and inside the source directory.
+
+    Returns:
+        str: Normalized relative folder path, or "" if nothing usable is left
+    """
+    parts = []
+    for part in re.split(r"[\\/]+", str(folder)):
+        part = " ".join(part.split()).strip(" .")
+        if part and part != "..":
+            parts.append(part)
+    return "/".join(parts)
+
+
+class OrganizationPlanner:
+    """
+    Token-budgeted folder planner for large sets of files.
+
+    Files are rendered as a compact columnar summary, split into chunks whose
+    estimated prompt size stays under ``max_chunk_tokens``, and planned
+    concurrently in the ``PLAN_SCHEMA`` format; invalid or missing entries
+    are asked for again. The partial plans are merged into one, treating
+    folder names that differ only by case or spacing as the same folder.
+    """
+
+    def __init__(self, agent, max_chunk_tokens: int = PLAN_CHUNK_TOKENS,
+                 workers: int = AI_CONCURRENCY,
+                 token_estimator: Callable[[str], int] = estimate_tokens):
+        self.agent = agent
+        self.max_chunk_tokens = max_chunk_tokens
+        self.workers = max(1, workers)
+        self.token_estimator = token_estimator
+        self.columns = SUMMARY_COLUMNS
+
+    def chunk(self, files: List[Dict[str, Any]]) -> List[List[Tuple[int, str]]]:
+        """
+        Split files into summary rows grouped by token budget.
+
+        Returns:
+            List[List[Tuple[int, str]]]: Chunks of (file id, summary row)
+        """
+        overhead = self.token_estimator(self.agent.system_message + self._prompt(""))
+        budget = max(1, self.max_chunk_tokens - overhead)
+
+        chunks: List[List[Tuple[int, str]]] = []
+        current: List[Tuple[int, str]] = []
+        used = 0
+        for file_id, file_info in enumerate(files):
+            row = summarize_file(file_id, file_info)
+            tokens = self.token_estimator(row) + 1
+            if current and used + tokens > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append((file_id, row))
+            used += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def estimate_prompt_tokens(self, files: List[Dict[str, Any]]) -> List[int]:
+        """Estimated prompt tokens of each chunk request, known before anything is sent."""
+        return [
+            self.token_estimator(self.agent.system_message + self._prompt(self._rows(chunk)))
+            for chunk in self.chunk(files)
+        ]
+
+    def plan(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Plan a folder structure for the given files.
+
+        Args:
+            files (List[Dict[str, Any]]): List of file information
+
+        Returns:
+            Dict[str, Any]: ``folders`` (folder -> file paths), ``moves``
+            (source path -> destination relative to the source directory),
+            ``notes`` from each chunk and the number of ``chunks`` sent
+        """
+        chunks = self.chunk(files)
+        if not chunks:
+            return self.merge(files, [])
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+            partials = list(executor.map(self._plan_chunk, chunks))
+
+        return self.merge(files, partials)
+
+    def _rows(self, chunk: List[Tuple[int, str]]) -> str:
+        return "\n".join(row for _, row in chunk)
+
+    def chunk_messages(self, chunk: List[Tuple[int, str]]) -> List[Any]:
+        """Chat messages planning one chunk as a list of moves, for ``PlanStreamParser``."""
+        return chat_messages(self.agent.system_message, self._prompt(self._rows(chunk)))
+
+    def _prompt(self, rows: str) -> str:
+        return f"""Organize these files into folders.
+        Files ({self.columns}):
+        {rows}
+
+        Respond with only a JSON object, one entry per file id, then your notes on naming conventions, patterns and security:
+        {PLAN_FORMAT}
+        Use descriptive folder names based on projects or categories and assign every file id exactly once."""
+
+    def members(self, files: List[Dict[str, Any]], row_id: int) -> List[int]:
+        """File ids covered by a summary row id."""
+        return [row_id]
+
+    def _plan_chunk(self, chunk: List[Tuple[int, str]]) -> Dict[str, Any]:
+        notes: List[str] = []
+        entries = list(self.agent._plan_entries(chunk, self.chunk_messages(chunk), self.columns, notes))
+        return {"entries": entries, "notes": notes}
+
+    def merge(self, files: List[Dict[str, Any]], partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge per-chunk plans into one plan (see ``plan``).
+
+        Each partial plan holds the validated ``entries`` of one chunk
+        (``PlanEntry`` tuples of row id and folder) and its ``notes``.
+        """
+        display_names: Dict[str, str] = {}
+        assignments: Dict[int, str] = {}
+        notes: List[str] = []
+
+        for partial in partials:
+            for entry in partial["entries"]:
+                key = entry.folder.casefold()
+                display_names.setdefault(key, entry.folder)
+                assignments.setdefault(entry.id, display_names[key])
+            notes.extend(note for note in partial["notes"] if note not in notes)
+
+        folders: Dict[str, List[str]] = {}
+        moves: Dict[str, str] = {}
+        for file_id, file_info in enumerate(files):
+            # Files the model skipped fall back to their category folder
+            folder = assignments.get(file_id) or file_info.get('category') or "Other"
+            folders.setdefault(folder, []).append(file_info['path'])
+            moves[file_info['path']] = str(PurePosixPath(folder) / file_info['name'])
+
+        return {"folders": folders, "moves": moves, "notes": notes, "chunks": len(partials)}
+
+
+class ClusterPlanner(OrganizationPlanner):
+    """
+    Folder planner that groups files locally and has the model only name the groups.
+
+    Files are clustered by content similarity in a ``SimilarityIndex``; each
+    cluster is summarized as one row (size, characteristic keywords,
+    categories and example names), so the prompt grows with the number of
+    clusters rather than the number of files. Files without a similar
+    neighbour go to their category folder. The index is kept between calls,
+    so only new or modified files are read again.
+    """
+
+    def __init__(self, agent, index: Optional["SimilarityIndex"] = None,
+                 threshold: float = SIMILARITY_THRESHOLD, neighbors: int = SIMILARITY_NEIGHBORS, **kwargs):
+        super().__init__(agent, **kwargs)
+        self._index = index
+        self.threshold = threshold
+        self.neighbors = neighbors
+        self.columns = CLUSTER_COLUMNS
+        self._memo: Tuple[Any, List[List[int]]] = (None, [])
+
+    @property
+    def index(self) -> "SimilarityIndex":
+        """The similarity index, created on first use so NumPy loads only when planning."""
+        if self._index is None:
+            from utils.similarity import SimilarityIndex
+            self._index = SimilarityIndex()
+        return self._index
+
+    def groups(self, files: List[Dict[str, Any]]) -> List[List[int]]:
+        """
+        Cluster files by content.
+
+        Returns:
+            List[List[int]]: Clusters of file ids (indexes into ``files``), largest first
+        """
+        for file_info in files:
+            if 'error' not in file_info:
+                self.index.add_file(file_info)
+        paths = tuple(file_info['path'] for file_info in files)
+        key = (self.index.version, paths, self.threshold, self.neighbors)
+        if self._memo[0] != key:
+            ids = {path: file_id for file_id, path in enumerate(paths)}
+            clusters = self.index.cluster(list(ids), self.threshold, self.neighbors)
+            self._memo = (key, [sorted(ids[path] for path in cluster) for cluster in clusters])
+        return self._memo[1]
+
+    def chunk(self, files: List[Dict[str, Any]]) -> List[List[Tuple[int, str]]]:
+        """
+        Split cluster summaries into chunks by token budget.
+
+        Returns:
+            List[List[Tuple[int, str]]]: Chunks of (cluster id, summary row)
+        """
+        overhead = self.token_estimator(self.agent.system_message + self._prompt(""))
+        budget = max(1, self.max_chunk_tokens - overhead)
+
+        chunks: List[List[Tuple[int, str]]] = []
+        current: List[Tuple[int, str]] = []
+        used = 0
+        for cluster_id, file_ids in enumerate(self.groups(files)):
+            row = self._summarize_cluster(cluster_id, [files[file_id] for file_id in file_ids])
+            tokens = self.token_estimator(row) + 1
+            if current and used + tokens > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append((cluster_id, row))
+            used += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _summarize_cluster(self, cluster_id: int, members: List[Dict[str, Any]]) -> str:
+        keywords = self.index.top_terms([file_info['path'] for file_info in members])
+        categories = Counter(file_info.get('category', '') for file_info in members)
+        examples = [file_info['name'].replace("|", "/") for file_info in members[:_MAX_DETAIL_ITEMS]]
+        return "|".join([
+            str(cluster_id),
+            str(len(members)),
+            ",".join(keywords),
+            ",".join(category for category, _ in categories.most_common(3) if category),
+            ",".join(examples)
+        ])
+
+    def _prompt(self, rows: str) -> str:
+        return f"""Name project folders for these groups of related files.
+        Groups ({self.columns}):
+        {rows}
+
+        Respond with only a JSON object, one entry per group id, then your notes on naming conventions, patterns and security:
+        {PLAN_FORMAT}
+        Use descriptive folder names based on the keywords and examples; groups may share a folder."""
+
+    def members(self, files: List[Dict[str, Any]], row_id: int) -> List[int]:
+        """File ids in a cluster."""
+        return self.groups(files)[row_id]
+
+    def merge(self, files: List[Dict[str, Any]], partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Expand the per-cluster folder assignments to files (see ``OrganizationPlanner.plan``)."""
+        groups = self.groups(files)
+        expanded = [
+            {
+                "entries": [entry._replace(id=file_id) for entry in partial["entries"] for file_id in groups[entry.id]],
+                "notes": partial["notes"]
+            }
+            for partial in partials
+        ]
+        plan = super().merge(files, expanded)
+        plan["clusters"] = len(groups)
+        return plan
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config import RESPONSE_CACHE_FILE, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL
+from utils.metrics import CACHE_REQUESTS
+
+# Puts between trims of the SQLite table
+_EVICT_EVERY = 500
+
+
+def normalize_prompt(text: str) -> str:
+    """Collapse whitespace so indentation changes in prompt templates do not change keys."""
+    lines = (" ".join(line.split()) for line in text.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(messages: List[Any], model: str, temperature: Optional[float]) -> str:
+    """
+    Build a cache key from chat messages and the model settings.
+
+    Args:
+        messages (List[Any]): LangChain messages (anything with ``content``)
+        model (str): Model name
+        temperature (Optional[float]): Sampling temperature
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = [
+        model,
+        temperature,
+        [[getattr(message, "type", type(message).__name__), normalize_prompt(message.content)]
+         for message in messages]
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """
+    LRU/TTL cache for chat responses with in-flight request deduplication.
+
+    Responses live in an in-memory LRU and, when ``db_path`` is set, in a
+    SQLite table so they survive restarts; the table is trimmed to the
+    newest ``max_entries`` responses on open and every few hundred puts.
+    Concurrent callers asking for the
+    same key share a single model call: the first caller runs it and the
+    others wait for its result.
+    """
+
+    def __init__(self, db_path: Optional[Path] = RESPONSE_CACHE_FILE,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl: Optional[float] = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._puts = 0
+
+        self._conn = None
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._expired(row[1], now):
+                return None
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store a response."""
+        now = time.time()
+        evict = False
+        with self._lock:
+            self._remember(key, value, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, now)
+                )
+                self._conn.commit()
+                self._puts += 1
+                evict = self._puts % _EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def get_or_call(self, key: str, call: Callable[[], str]) -> str:
+        """
+        Return the cached response for ``key``, calling the model at most once.
+
+        Args:
+            key (str): Cache key from ``make_cache_key``
+            call (Callable[[], str]): Performs the model request
+
+        Returns:
+            str: Model response
+        """
+        value = self.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            CACHE_REQUESTS.inc(cache="response", result="hit")
+            return value
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.deduplicated += 1
+        CACHE_REQUESTS.inc(cache="response", result="miss" if leader else "deduplicated")
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = call()
+            self.put(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def record(self, counter: str) -> None:
+        """Increment ``hits``, ``misses`` or ``deduplicated`` for lookups made outside ``get_or_call``."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        CACHE_REQUESTS.inc(cache="response", result={"hits": "hit", "misses": "miss"}.get(counter, counter))
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "deduplicated": self.deduplicated,
+                "entries": len(self._memory)
+            }
+
+    def evict(self) -> int:
+        """
+        Drop persisted responses older than ``ttl`` and trim the table to ``max_entries``.
+
+        Returns:
+            int: Number of responses removed
+        """
+        with self._lock:
+            if self._conn is None:
+                return 0
+            removed = 0
+            if self.ttl:
+                cursor = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+                removed += cursor.rowcount
+            if self.max_entries:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+            return removed
+
+    def close(self) -> None:
+        """Close the persistent backend."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _expired(self, created: float, now: float) -> bool:
+        return bool(self.ttl) and now - created > self.ttl
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        # Caller holds self._lock
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -1,111 +1,75 @@
 import os
-import shutil
-import time
 import sys
-import magic
-import PyPDF2
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+import threading
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QPushButton, QListWidget, QLabel, QLineEdit, QTextEdit, QProgressBar, QMessageBox
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QHeaderView, QComboBox,
+    QLabel, QLineEdit, QTextEdit, QProgressBar, QMessageBox
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from typing import Dict, Any, List, Optional
 
 from config import (
     DOWNLOADS_FOLDER, SORTED_FOLDER, WINDOW_TITLE,
-    WINDOW_SIZE, REFRESH_INTERVAL, PROCESSING_DELAY, AI_MODEL
+    WINDOW_SIZE, REFRESH_INTERVAL, OPENAI_API_KEY, AI_BACKEND, AI_CONCURRENCY, BATCH_ENABLED,
+    DEDUP_ENABLED, PLAN_COMBINED, METRICS_SERVER
 )
-from utils.logger import setup_logger, log_file_operation
+from utils.logger import setup_logger
 from utils.file_analyzer import FileAnalyzer
+from utils.analysis_cache import AnalysisCache
+from utils.dedup import DuplicateDetector
+from utils.ingest import IngestPipeline
+from utils.metrics import start_metrics_server
+from utils.stability import WriteCompletionDetector
+from utils.move_executor import free_path
+from utils.transfer import move_file
+from utils.processor import FileProcessor
+from utils.rules import RuleEngine
+from utils.watcher import FolderWatcher, index_roots, load_watch_roots
+from utils.classification import get_classification_index
+from agents.chat import chat_messages, get_chat_model
 from agents.file_agent import FileManagementAgent
-
-# Load environment variables
-load_dotenv()
-
-# Get API key from environment
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("Please set OPENAI_API_KEY in your .env file")
+from agents.response_cache import ResponseCache
+from agents.batcher import ClassificationBatcher
+from ui.file_list_model import FileListModel
 
 # Directories
 DOWNLOADS_FOLDER = Path(DOWNLOADS_FOLDER)
 SORTED_FOLDER = Path(SORTED_FOLDER)
-LOG_FILE = os.path.expanduser("~/SortedProjects/classification_log.txt")
-
-# AI File Manager
-chat = ChatOpenAI(
-    model=AI_MODEL,
-    openai_api_key=OPENAI_API_KEY,
-    temperature=0.2
-)
 
 # Set up logging
 logger = setup_logger("FileOrganizer")
 
-class FileHandler(FileSystemEventHandler):
-    def __init__(self, app):
-        self.app = app
-        self.file_analyzer = FileAnalyzer()
-        self.file_agent = FileManagementAgent()
-    
-    def on_created(self, event):
-        if not event.is_directory:
-            file_path = Path(event.src_path)
-            self.app.process_new_file(file_path)
-
-
-def start_monitor(app):
-    observer = Observer()
-    event_handler = FileHandler(app)
-    observer.schedule(event_handler, DOWNLOADS_FOLDER, recursive=False)
-    observer.start()
-    try:
-        while True:
-            time.sleep(10)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
-
-
 def track_download(file_path):
     """Process a file with AI assistance."""
     system_message = """You are an intelligent file management assistant. Your role is to sort and organize files."""
     
     prompt = f"Sort and organize {file_path} into a relevant project folder."
     
-    messages = [
-        SystemMessage(content=system_message),
-        HumanMessage(content=prompt)
-    ]
+    messages = chat_messages(system_message, prompt)
     
-    response = chat.invoke(messages).content
+    response = get_chat_model().invoke(messages).content
     return response
 
 
 def classify_file(file_path):
+    index = get_classification_index()
+    category = index.category_for_extension(os.path.splitext(file_path)[1])
+    if category:
+        return category
+    # Only sniff the content when the extension is unknown
+    import magic
     mime = magic.Magic(mime=True)
-    file_type = mime.from_file(file_path)
-    if "pdf" in file_type:
-        return "Documents"
-    elif "image" in file_type:
-        return "Images"
-    elif "zip" in file_type or "compressed" in file_type:
-        return "Archives"
-    else:
-        return "Other"
+    return index.classify("", mime.from_file(file_path))
 
 
 def organize_file(file_path):
     category = classify_file(file_path)
     project_folder = os.path.join(SORTED_FOLDER, category)
     os.makedirs(project_folder, exist_ok=True)
-    shutil.move(file_path, os.path.join(project_folder, os.path.basename(file_path)))
-    return f"File {file_path} moved to {project_folder}"
+    new_path = free_path(Path(project_folder), os.path.basename(file_path))
+    move_file(file_path, new_path)
+    return f"File {file_path} moved to {new_path}"
 
 
 def open_file(file_path):
@@ -134,31 +98,94 @@ def extract_zip(file_path):
     return f"Extracted {file_path} to {extract_folder}"
 
 
+class IngestSignals(QObject):
+    """Signals used by pipeline worker threads to hand results to the GUI thread."""
+    file_processed = pyqtSignal(object)
+    file_failed = pyqtSignal(str, str)
+    queue_depth_changed = pyqtSignal(int, int)
+
+
+class CommandSignals(QObject):
+    """Signals used by the command worker thread to hand its outcome to the GUI thread."""
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+
+
 class AIFileOrganizerApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle(WINDOW_TITLE)
         self.setGeometry(200, 200, *WINDOW_SIZE)
         
-        self.file_analyzer = FileAnalyzer()
-        self.file_agent = FileManagementAgent()
+        self.analysis_cache = AnalysisCache()
+        self.duplicates = DuplicateDetector() if DEDUP_ENABLED else None
+        self.file_analyzer = FileAnalyzer(cache=self.analysis_cache, dedup=self.duplicates)
+        self.rule_engine = RuleEngine.from_config()
+        self.response_cache = ResponseCache()
+        self.file_agent = FileManagementAgent(cache=self.response_cache)
+        self.ai_slots = threading.BoundedSemaphore(AI_CONCURRENCY)
+        self.batcher = ClassificationBatcher(self.file_agent) if BATCH_ENABLED else None
+        self.processor = FileProcessor(
+            self.file_analyzer, self.rule_engine, self.file_agent,
+            duplicates=self.duplicates, batcher=self.batcher, ai_slots=self.ai_slots,
+            on_batched=lambda result: self.signals.file_processed.emit(result)
+        )
+        
+        # Only directories changed since the last run are listed again
+        self.watch_roots = load_watch_roots()
+        self.directory_index = index_roots(self.watch_roots)
+        self.directory_index.reconcile()
+        self._listed_version = -1
+        
+        # Commands analyze and plan in a worker thread, so the window stays responsive
+        self.command_signals = CommandSignals()
+        queued = Qt.ConnectionType.QueuedConnection
+        self.command_signals.finished.connect(self.on_command_finished, queued)
+        self.command_signals.failed.connect(self.on_command_failed, queued)
         
         self.setup_ui()
+        self.setup_pipeline()
         self.setup_file_monitoring()
         self.refresh_file_list()
+        self.check_interrupted_moves()
     
     def setup_ui(self):
         layout = QVBoxLayout()
         
         # Status section
-        self.status_label = QLabel("📂 File Organizer Status: Active")
+        self.status_label = QLabel()
+        self.update_status(0, 0)
         layout.addWidget(self.status_label)
         
         # File list section
         self.file_label = QLabel("📂 Detected Files:")
         layout.addWidget(self.file_label)
         
-        self.file_list = QListWidget()
+        filter_layout = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter by name...")
+        self.filter_input.textChanged.connect(self.apply_file_filter)
+        filter_layout.addWidget(self.filter_input)
+        
+        self.category_filter = QComboBox()
+        self.category_filter.addItem("All categories", None)
+        for category in get_classification_index().categories:
+            self.category_filter.addItem(category, category)
+        self.category_filter.currentIndexChanged.connect(self.apply_file_filter)
+        filter_layout.addWidget(self.category_filter)
+        layout.addLayout(filter_layout)
+        
+        # Rows are materialized on scroll and updated in place from the directory index
+        self.file_model = FileListModel(self)
+        self.file_list = QTableView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setSortingEnabled(True)
+        self.file_list.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.file_list.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.file_list.setWordWrap(False)
+        self.file_list.verticalHeader().setVisible(False)
+        self.file_list.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.file_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         layout.addWidget(self.file_list)
         
         # Progress section
@@ -184,6 +211,12 @@ class AIFileOrganizerApp(QWidget):
         self.execute_button.setEnabled(False)  # Disabled by default until we have suggestions
         layout.addWidget(self.execute_button)
         
+        # Undo the last organization from its move journal
+        self.undo_button = QPushButton("↩️ Undo Last Organization")
+        self.undo_button.clicked.connect(self.undo_organization)
+        self.undo_button.setEnabled(self.file_agent.move_executor.last_journal() is not None)
+        layout.addWidget(self.undo_button)
+        
         # Output section
         self.output_label = QLabel("🤖 AI Assistant Output:")
         layout.addWidget(self.output_label)
@@ -194,63 +227,110 @@ class AIFileOrganizerApp(QWidget):
         
         # Refresh button
         self.refresh_button = QPushButton("🔄 Refresh File List")
-        self.refresh_button.clicked.connect(self.refresh_file_list)
+        self.refresh_button.clicked.connect(lambda: self.refresh_file_list(reconcile=True))
         layout.addWidget(self.refresh_button)
         
         self.setLayout(layout)
     
+    def setup_pipeline(self):
+        """Create the ingest pipeline and route its results back through Qt signals."""
+        self.signals = IngestSignals()
+        queued = Qt.ConnectionType.QueuedConnection
+        self.signals.file_processed.connect(self.on_file_processed, queued)
+        self.signals.file_failed.connect(self.on_file_failed, queued)
+        self.signals.queue_depth_changed.connect(self.update_status, queued)
+        
+        self.pipeline = IngestPipeline(
+            self.processor.process,
+            on_result=self._emit_result,
+            on_error=lambda path, error: self.signals.file_failed.emit(str(path), str(error)),
+            on_depth=self.signals.queue_depth_changed.emit
+        )
+        # One queue per watched folder, so a burst in one does not hold up the others
+        for root in self.watch_roots:
+            self.pipeline.add_shard(root.path, self._processor_for(root), workers=root.workers or None)
+        self.pipeline.start()
+        
+        # Files reach the pipeline only once they have stopped changing
+        self.write_detector = WriteCompletionDetector(self.enqueue_file)
+        self.write_detector.start()
+        
+        self.metrics_server = None
+        if METRICS_SERVER:
+            try:
+                self.metrics_server = start_metrics_server()
+            except OSError as e:
+                logger.warning("Could not start the metrics server: %s", e)
+    
+    def _emit_result(self, file_path: Path, result: Optional[Dict[str, Any]]):
+        # Batched files report later, from the batch completion callback
+        if result is not None:
+            self.signals.file_processed.emit(result)
+    
+    def _processor_for(self, root):
+        return lambda file_path: self.processor.process(file_path, root.sorted_folder)
+    
+    def enqueue_file(self, file_path: Path):
+        """Hand a fully written file to its watched folder's ingest queue."""
+        root = self.watcher.root_for(file_path)
+        if not self.pipeline.submit(file_path, root.path if root is not None else None):
+            self.signals.file_failed.emit(str(file_path), "Ingest queue is full, file skipped")
+    
     def setup_file_monitoring(self):
-        self.observer = Observer()
-        self.event_handler = FileHandler(self)
-        self.observer.schedule(self.event_handler, str(DOWNLOADS_FOLDER), recursive=False)
-        self.observer.start()
+        self.watcher = FolderWatcher(self.watch_roots, self.directory_index, self.write_detector)
+        self.watcher.start()
         
         # Set up refresh timer
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.refresh_file_list)
         self.refresh_timer.start(REFRESH_INTERVAL)
     
-    def process_new_file(self, file_path: Path):
-        """Process a newly downloaded file."""
-        try:
-            # Wait for file to be fully written
-            time.sleep(PROCESSING_DELAY)
-            
-            # Analyze file
-            file_info = self.file_analyzer.analyze_file(file_path)
-            
-            if "error" in file_info:
-                self.log_message(f"Error analyzing file {file_path.name}: {file_info['error']}")
-                return
-            
-            # Get AI analysis
-            analysis = self.file_agent.analyze_file(file_info)
-            
-            # Log the analysis
-            self.log_message(f"Analyzed file: {file_path.name}")
-            self.log_message(f"Category: {file_info['category']}")
-            self.log_message(f"AI Recommendations: {analysis['ai_analysis']}")
-            
-            # Move file to appropriate category folder
-            category_folder = SORTED_FOLDER / file_info['category']
-            category_folder.mkdir(exist_ok=True)
-            
-            new_path = category_folder / file_path.name
-            file_path.rename(new_path)
-            
-            log_file_operation(logger, "move", file_path, True)
-            self.log_message(f"Moved file to: {new_path}")
-            
-        except Exception as e:
-            log_file_operation(logger, "process", file_path, False, e)
-            self.log_message(f"Error processing file {file_path.name}: {str(e)}")
+    def on_file_processed(self, result: Dict[str, Any]):
+        """Report a pipeline result (runs on the GUI thread)."""
+        if "error" in result:
+            self.log_message(f"{result['error']} ({result['name']})")
+            return
+        
+        self.log_message(f"Analyzed file: {result['name']}")
+        self.log_message(f"Category: {result['category']}")
+        self.log_message(f"AI Recommendations: {result['ai_analysis']}")
+        self.log_message(f"Moved file to: {result['new_path']}")
+    
+    def on_file_failed(self, file_path: str, error: str):
+        """Report a file the pipeline could not process (runs on the GUI thread)."""
+        self.log_message(f"Error processing file {Path(file_path).name}: {error}")
+    
+    def update_status(self, queued: int, active: int):
+        """Show the ingest queue depth in the status label."""
+        status = "📂 File Organizer Status: Active"
+        if queued or active:
+            status += f" | Queue: {queued} waiting, {active} processing"
+        stats = self.rule_engine.stats()
+        if stats["total"]:
+            status += f" | Fast path: {stats['fast_path_ratio']:.0%} of {stats['total']} files"
+        self.status_label.setText(status)
+    
+    def refresh_file_list(self, reconcile: bool = False):
+        """
+        Bring the file list up to date with the directory index.
+        
+        Replays the journaled filesystem events (or rescans changed directories
+        when ``reconcile`` is set) and applies only the resulting differences.
+        """
+        index = self.directory_index
+        changes = index.reconcile() if reconcile else index.sync()
+        if index.version == self._listed_version:
+            return
+        
+        if self._listed_version < 0:
+            self.file_model.set_entries(index.query())
+        else:
+            self.file_model.apply_changes(changes)
+        self._listed_version = index.version
     
-    def refresh_file_list(self):
-        """Refresh the list of files in the downloads folder."""
-        self.file_list.clear()
-        for file_path in DOWNLOADS_FOLDER.glob("*"):
-            if file_path.is_file():
-                self.file_list.addItem(file_path.name)
+    def apply_file_filter(self, *args):
+        """Filter the file list by the name text and selected category."""
+        self.file_model.set_filter(self.filter_input.text(), self.category_filter.currentData())
     
     def send_command(self):
         """Send a command to the AI assistant."""
@@ -258,26 +338,52 @@ class AIFileOrganizerApp(QWidget):
         if command:
             self.log_message(f"User: {command}")
             
-            try:
-                # Get all files in downloads
-                files = []
-                for file_path in DOWNLOADS_FOLDER.glob("*"):
-                    if file_path.is_file():
-                        file_info = self.file_analyzer.analyze_file(file_path)
-                        if "error" not in file_info:
-                            files.append(file_info)
-                
-                # Get AI suggestions
-                self.current_suggestions = self.file_agent.suggest_organization(files)
-                self.current_files = files
-                self.log_message(f"AI: {self.current_suggestions['organization_suggestions']}")
-                
-                # Enable execute button if we have suggestions
-                self.execute_button.setEnabled(True)
-                
-            except Exception as e:
-                self.log_message(f"Error processing command: {str(e)}")
-                self.execute_button.setEnabled(False)
+            # Get all files in downloads from the directory index
+            self.refresh_file_list()
+            paths = [Path(entry.path) for entry in self.directory_index.query(root=DOWNLOADS_FOLDER)]
+            
+            # Analysis and planning run in a worker thread until on_command_finished
+            self.send_button.setEnabled(False)
+            self.execute_button.setEnabled(False)
+            self.log_message("Organizing files..." if PLAN_COMBINED else "Analyzing files...")
+            threading.Thread(target=self._run_command, args=(paths,), name="command", daemon=True).start()
+    
+    def _run_command(self, paths: List[Path]):
+        """Analyze the files and plan their organization (runs in a worker thread)."""
+        try:
+            files = [
+                file_info for file_info in self.file_analyzer.analyze_many(paths)
+                if "error" not in file_info
+            ]
+            if PLAN_COMBINED:
+                # Plan and move in one streamed request
+                results = self.file_agent.organize(files)
+            else:
+                results = self.file_agent.suggest_organization(files)
+            self.command_signals.finished.emit(files, results)
+        except Exception as e:
+            self.command_signals.failed.emit(str(e))
+    
+    def on_command_finished(self, files: List[Dict[str, Any]], results: Dict[str, Any]):
+        """Report the outcome of a command (runs on the GUI thread)."""
+        self.send_button.setEnabled(True)
+        self.log_message(f"AI: {results['organization_suggestions']}")
+        if PLAN_COMBINED:
+            self._log_move_results(results)
+            self.refresh_file_list()
+            return
+        
+        self.current_suggestions = results
+        self.current_files = files
+        
+        # Enable execute button if we have suggestions
+        self.execute_button.setEnabled(True)
+    
+    def on_command_failed(self, error: str):
+        """Report a command that failed (runs on the GUI thread)."""
+        self.send_button.setEnabled(True)
+        self.log_message(f"Error processing command: {error}")
+        self.execute_button.setEnabled(False)
     
     def execute_organization(self):
         """Execute the current organization suggestions."""
@@ -291,20 +397,7 @@ class AIFileOrganizerApp(QWidget):
                     self.current_suggestions
                 )
                 
-                # Log results
-                if "error" in results:
-                    self.log_message(f"❌ Error executing organization: {results['error']}")
-                else:
-                    if results["successful_moves"]:
-                        self.log_message("✅ Successfully moved files:")
-                        for move in results["successful_moves"]:
-                            self.log_message(f"  • {move['source']} → {move['destination']}")
-                    
-                    if results["failed_moves"]:
-                        self.log_message("❌ Failed to move files:")
-                        for move in results["failed_moves"]:
-                            self.log_message(f"  • {move['source']} → {move['destination']}")
-                            self.log_message(f"    Error: {move['error']}")
+                self._log_move_results(results)
                 
                 # Refresh the file list
                 self.refresh_file_list()
@@ -317,6 +410,62 @@ class AIFileOrganizerApp(QWidget):
             self.log_message(f"❌ Error executing organization: {str(e)}")
             self.execute_button.setEnabled(False)
     
+    def _log_move_results(self, results):
+        """Log the outcome of an organization run."""
+        if "error" in results:
+            self.log_message(f"❌ Error executing organization: {results['error']}")
+        if results["successful_moves"]:
+            self.log_message("✅ Successfully moved files:")
+            for move in results["successful_moves"]:
+                self.log_message(f"  • {move['source']} → {move['destination']}")
+        
+        if results["failed_moves"]:
+            self.log_message("❌ Failed to move files:")
+            for move in results["failed_moves"]:
+                self.log_message(f"  • {move['source']} → {move['destination']}")
+                self.log_message(f"    Error: {move['error']}")
+        if results.get("journal"):
+            self.undo_button.setEnabled(True)
+    
+    def undo_organization(self):
+        """Move the files of the last organization back to where they were."""
+        executor = self.file_agent.move_executor
+        journal = executor.last_journal()
+        if journal is None:
+            self.log_message("❌ Nothing to undo.")
+            self.undo_button.setEnabled(False)
+            return
+        
+        try:
+            results = executor.undo(journal)
+            self.log_message(f"↩️ Restored {len(results['restored'])} files")
+            for move in results["failed"]:
+                self.log_message(f"  • Could not restore {move['destination']}: {move['error']}")
+        except Exception as e:
+            self.log_message(f"❌ Error undoing organization: {str(e)}")
+        
+        self.refresh_file_list()
+        self.undo_button.setEnabled(executor.last_journal() is not None)
+    
+    def check_interrupted_moves(self):
+        """Offer to resume or undo organization runs that were interrupted."""
+        executor = self.file_agent.move_executor
+        for journal in executor.interrupted():
+            answer = QMessageBox.question(
+                self, "Interrupted Organization",
+                f"An organization run ({journal.stem}) was interrupted.\n"
+                "Resume it? Choose No to undo the moves it already made.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Ignore
+            )
+            if answer == QMessageBox.StandardButton.Yes:
+                results = executor.resume(journal)
+                self.log_message(f"✅ Resumed organization: {len(results['successful_moves'])} files moved, "
+                                 f"{len(results['failed_moves'])} failed")
+            elif answer == QMessageBox.StandardButton.No:
+                results = executor.undo(journal)
+                self.log_message(f"↩️ Undid interrupted organization: {len(results['restored'])} files restored")
+        self.refresh_file_list()
+    
     def log_message(self, message: str):
         """Log a message to the output text area."""
         self.output_text.append(message)
@@ -326,11 +475,22 @@ class AIFileOrganizerApp(QWidget):
     
     def closeEvent(self, event):
         """Handle application closure."""
-        self.observer.stop()
-        self.observer.join()
+        self.watcher.stop()
+        self.write_detector.stop()
+        # Do not wait for queued files to be classified; they stay in the watched folders
+        self.pipeline.stop(drain=False)
+        if self.batcher is not None:
+            self.batcher.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.analysis_cache.close()
+        self.response_cache.close()
+        self.directory_index.close()
         event.accept()
 
 if __name__ == "__main__":
+    if AI_BACKEND == "openai" and not OPENAI_API_KEY:
+        raise ValueError("Please set OPENAI_API_KEY in your .env file")
     try:
         logger.info("Starting AI File Organizer")
         app = QApplication(sys.argv)
@@ -338,5 +498,5 @@ if __name__ == "__main__":
         main_window.show()
         sys.exit(app.exec())
     except Exception as e:
-        logger.error(f"Application error: {str(e)}")
+        logger.error("Application error: %s", e)
         sys.exit(1)
\ No newline at end of file
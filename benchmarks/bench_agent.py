@@ -0,0 +1,78 @@
+"""
+``FileManagementAgent`` against the offline ``FakeChatModel``.
+
+Model latency is simulated (``--llm-latency``), so these measure the
+agent's own overhead, batching, and how well requests and moves overlap.
+"""
+import itertools
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from agents.fake_chat import FakeChatModel, structured_responder
+from agents.file_agent import FileManagementAgent
+from corpus import link_files
+from utils.file_analyzer import FileAnalyzer, iter_files
+from utils.move_executor import MoveExecutor
+
+# Files per organization run (the whole corpus would mostly measure the analyzer)
+ORGANIZE_FILES = 500
+BATCH_FILES = 25
+
+
+@pytest.fixture(scope="module")
+def sources(corpus) -> List[Path]:
+    return sorted(path for path, _ in iter_files(corpus))[:ORGANIZE_FILES]
+
+
+def _agent(scratch: Path, latency: float) -> FileManagementAgent:
+    return FileManagementAgent(chat=FakeChatModel(responder=structured_responder, latency=latency),
+                               move_executor=MoveExecutor(scratch / "journals"))
+
+
+def test_classify_batch(benchmark, sources, scratch, llm_latency):
+    """One batched classification request for ``BATCH_FILES`` new files."""
+    analyzer = FileAnalyzer()
+    files = [analyzer.analyze_file(path) for path in sources[:BATCH_FILES]]
+    agent = _agent(scratch, llm_latency)
+    benchmark.group = "agent"
+    results = benchmark(agent.analyze_files, files)
+    assert all("verdict" in result for result in results)
+
+
+def test_organize_end_to_end(benchmark, sources, scratch, llm_latency):
+    """Scan a folder, plan it with the model and execute the moves."""
+    agent = _agent(scratch, llm_latency)
+    rounds = itertools.count()
+
+    def setup() -> Tuple[Tuple[Path], Dict[str, Any]]:
+        folder = scratch / f"downloads{next(rounds)}"
+        link_files(sources, folder)
+        return (folder,), {}
+
+    def organize(folder: Path) -> Dict[str, Any]:
+        files = [file_info for file_info in FileAnalyzer().scan_directory(folder, workers=1)
+                 if "error" not in file_info]
+        return agent.execute_organization(files, agent.suggest_organization(files))
+
+    benchmark.group = "agent"
+    results = benchmark.pedantic(organize, setup=setup, rounds=3, iterations=1)
+    assert not results["failed_moves"]
+    assert len(results["successful_moves"]) == len(sources)
+
+
+def test_execute_organization(benchmark, sources, scratch):
+    """Executing a ready plan: planning destinations, journaling and moving every file."""
+    agent = _agent(scratch, 0.0)
+    analyzer = FileAnalyzer()
+    rounds = itertools.count()
+
+    def setup() -> Tuple[Tuple[List[Dict[str, Any]], Dict[str, Any]], Dict[str, Any]]:
+        folder = scratch / f"plan{next(rounds)}"
+        files = [analyzer.analyze_file(path) for path in link_files(sources, folder)]
+        return (files, agent.suggest_organization(files)), {}
+
+    benchmark.group = "moves"
+    results = benchmark.pedantic(agent.execute_organization, setup=setup, rounds=5, iterations=1)
+    assert len(results["successful_moves"]) == len(sources)
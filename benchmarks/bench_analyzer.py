@@ -0,0 +1,58 @@
+"""Per-file analysis cost by file kind, uncached and answered from the analysis cache."""
+import itertools
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from utils.analysis_cache import AnalysisCache
+from utils.file_analyzer import FileAnalyzer, iter_files
+
+# Files analyzed per kind (the benchmark cycles through them)
+SAMPLE_FILES = 50
+
+
+@pytest.fixture(scope="module")
+def samples(corpus) -> Dict[str, List[Path]]:
+    by_suffix: Dict[str, List[Path]] = {}
+    for path, _ in iter_files(corpus):
+        by_suffix.setdefault(path.suffix, []).append(path)
+    for paths in by_suffix.values():
+        paths.sort()
+    csvs = sorted(by_suffix[".csv"], key=lambda path: path.stat().st_size)
+    return {
+        "pdf": by_suffix[".pdf"][:SAMPLE_FILES],
+        "csv": csvs[:SAMPLE_FILES],
+        "large_csv": csvs[-3:],
+        "json": by_suffix[".json"][:SAMPLE_FILES],
+        "image": (by_suffix[".png"] + by_suffix[".gif"])[:SAMPLE_FILES],
+        "archive": by_suffix[".zip"][:SAMPLE_FILES],
+        "text": by_suffix[".txt"][:SAMPLE_FILES],
+        "binary": by_suffix[".bin"][:SAMPLE_FILES],
+    }
+
+
+@pytest.mark.parametrize("kind", ["pdf", "csv", "large_csv", "json", "image", "archive", "text", "binary"])
+def test_analyze_file(benchmark, samples, kind):
+    """libmagic sniffing and metadata extraction of one file, without caches."""
+    analyzer = FileAnalyzer()
+    files = itertools.cycle(samples[kind])
+    benchmark.group = "analyze_file"
+    result = benchmark(lambda: analyzer.analyze_file(next(files)))
+    assert "error" not in result
+
+
+def test_analyze_file_cached(benchmark, samples, scratch):
+    """An unchanged file answered from the SQLite analysis cache."""
+    cache = AnalysisCache(scratch / "analysis.sqlite3")
+    analyzer = FileAnalyzer(cache=cache)
+    paths = [path for kind in ("pdf", "csv", "json", "text") for path in samples[kind]]
+    for path in paths:
+        analyzer.analyze_file(path)
+    files = itertools.cycle(paths)
+    benchmark.group = "analyze_file"
+    try:
+        benchmark(lambda: analyzer.analyze_file(next(files)))
+        assert cache.hits > 0
+    finally:
+        cache.close()
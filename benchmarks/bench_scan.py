@@ -0,0 +1,43 @@
+"""Listing and bulk analysis of the whole corpus, compared with globbing and analyzing file by file."""
+from pathlib import Path
+
+import pytest
+
+from utils.file_analyzer import FileAnalyzer, iter_files
+
+
+def glob_scan(analyzer: FileAnalyzer, root: Path) -> int:
+    """The approach ``scan_directory`` replaced: glob, ``is_file`` and ``analyze_file`` per entry."""
+    count = 0
+    for file_path in root.rglob("*"):
+        if file_path.is_file():
+            analyzer.analyze_file(file_path)
+            count += 1
+    return count
+
+
+def test_iter_files(benchmark, corpus):
+    """Directory listing with stat results reused."""
+    benchmark.group = "scan"
+    count = benchmark(lambda: sum(1 for _ in iter_files(corpus, recursive=True)))
+    assert count > 0
+
+
+def test_glob_scan(benchmark, corpus):
+    """Baseline for ``test_scan_directory``: one ``analyze_file`` per globbed path."""
+    analyzer = FileAnalyzer()
+    benchmark.group = "scan"
+    count = benchmark.pedantic(lambda: glob_scan(analyzer, corpus), rounds=3, iterations=1)
+    assert count > 0
+
+
+@pytest.mark.parametrize("workers", [1, None], ids=["serial", "pool"])
+def test_scan_directory(benchmark, corpus, workers):
+    """Bulk analysis of the whole corpus, in-process or on the worker process pool."""
+    options = {"workers": workers} if workers else {}
+    benchmark.group = "scan"
+    count = benchmark.pedantic(
+        lambda: sum(1 for _ in FileAnalyzer().scan_directory(corpus, recursive=True, **options)),
+        rounds=3, iterations=1
+    )
+    assert count > 0
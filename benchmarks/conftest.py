@@ -0,0 +1,138 @@
+"""
+Fixtures shared by the benchmark suite.
+
+    python -m pytest benchmarks [--corpus-size 10000] [--llm-latency 0.05]
+    python -m pytest benchmarks --update-baselines
+
+Baselines in ``baselines.json`` are stored per machine (OS, architecture,
+Python version and CPU count). When the current machine has a baseline for a
+benchmark, a mean slower than it by more than the threshold fails; on other
+machines the benchmarks only report their timings. ``--update-baselines``
+records this machine's means.
+"""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINES_FILE = BENCHMARKS_DIR / "baselines.json"
+DEFAULT_THRESHOLD = 0.3
+
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+# Caches, journals and logs of the code under test stay out of the user's folders;
+# config.py reads ORGANIZER_CONFIG when the benchmark modules first import it
+WORK_DIR = Path(tempfile.mkdtemp(prefix="organizer-bench-"))
+(WORK_DIR / "settings.json").write_text(json.dumps({
+    "DOWNLOADS_FOLDER": str(WORK_DIR / "downloads"),
+    "SORTED_FOLDER": str(WORK_DIR / "sorted"),
+}))
+os.environ["ORGANIZER_CONFIG"] = str(WORK_DIR / "settings.json")
+
+from corpus import generate_corpus  # noqa: E402
+
+_measured: Dict[str, Dict[str, float]] = {}
+_compared = 0
+
+
+def machine() -> str:
+    """Key of the current machine's baselines."""
+    return f"{platform.system()} {platform.machine()}, Python {platform.python_version()}, {os.cpu_count()} CPUs"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("organizer benchmarks")
+    group.addoption("--corpus-size", type=int, default=1000, help="files in the generated corpus (1000, 10000, 100000)")
+    group.addoption("--llm-latency", type=float, default=0.02, help="seconds the fake chat model takes per request")
+    group.addoption("--update-baselines", action="store_true", help="store this run's means in baselines.json")
+    group.addoption("--regression-threshold", type=float, default=None,
+                    help="allowed slowdown over the baseline, e.g. 0.3 for 30%% (default: from baselines.json)")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not session.config.getoption("--update-baselines", False) or not _measured:
+        return
+    stored = _load_baselines()
+    stored.setdefault("threshold", DEFAULT_THRESHOLD)
+    benchmarks = stored.setdefault("machines", {}).setdefault(machine(), {})
+    benchmarks.update(_measured)
+    stored["machines"][machine()] = dict(sorted(benchmarks.items()))
+    BASELINES_FILE.write_text(json.dumps(stored, indent=2) + "\n")
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not config.getoption("--update-baselines") and not _compared:
+        terminalreporter.write_line(f"No baselines recorded for this machine ({machine()}); regression checks "
+                                    f"skipped. Record them with --update-baselines.")
+
+
+def _load_baselines() -> Dict:
+    if BASELINES_FILE.exists():
+        return json.loads(BASELINES_FILE.read_text())
+    return {}
+
+
+@pytest.fixture(scope="session")
+def corpus_size(request) -> int:
+    return request.config.getoption("--corpus-size")
+
+
+@pytest.fixture(scope="session")
+def llm_latency(request) -> float:
+    return request.config.getoption("--llm-latency")
+
+
+@pytest.fixture(scope="session")
+def corpus(corpus_size) -> Path:
+    """The generated downloads folder (seed 0), shared by the whole session; do not modify it."""
+    root = WORK_DIR / f"corpus-{corpus_size}"
+    generate_corpus(root, corpus_size)
+    return root
+
+
+@pytest.fixture
+def scratch(tmp_path_factory) -> Path:
+    return tmp_path_factory.mktemp("scratch")
+
+
+@pytest.fixture(autouse=True)
+def _check_baseline(request):
+    """Fail a benchmark whose mean regressed past this machine's baseline; record it with --update-baselines."""
+    yield
+    benchmark = request.node.funcargs.get("benchmark")
+    stats = getattr(benchmark, "stats", None)
+    if benchmark is None or benchmark.disabled or stats is None:
+        return
+
+    key = request.node.name
+    if "corpus" in request.fixturenames:
+        key += f"@{request.config.getoption('--corpus-size')}"
+    mean = stats.stats.mean
+    if request.config.getoption("--update-baselines"):
+        _measured[key] = {"mean": mean}
+        return
+
+    stored = _load_baselines()
+    baseline = stored.get("machines", {}).get(machine(), {}).get(key)
+    if baseline is None:
+        return
+    global _compared
+    _compared += 1
+    threshold = request.config.getoption("--regression-threshold")
+    if threshold is None:
+        threshold = stored.get("threshold", DEFAULT_THRESHOLD)
+    if mean > baseline["mean"] * (1 + threshold):
+        pytest.fail(f"{key} regressed: mean {mean * 1000:.3f} ms vs baseline {baseline['mean'] * 1000:.3f} ms "
+                    f"(+{mean / baseline['mean'] - 1:.0%}, threshold {threshold:.0%})", pytrace=False)
@@ -0,0 +1,246 @@
+"""
+Deterministic synthetic download folders for the benchmarks.
+
+    python benchmarks/corpus.py DIR [--count 10000] [--seed 0]
+
+The same count and seed always produce byte-identical files with the same
+names and modification times. The mix resembles a real downloads folder:
+text notes, PDFs with document info, small and large CSVs, nested JSON, PNG
+and GIF images, zip archives, source files, opaque binaries and copies of
+earlier files. Names and contents are drawn from a few topics, so the
+similarity planner has real groups to find.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import struct
+import sys
+import zipfile
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+TOPICS = {
+    "invoice": ["invoice", "payment", "amount", "due", "vendor", "total", "tax", "billing", "account", "receipt"],
+    "travel": ["flight", "hotel", "booking", "itinerary", "passport", "airport", "reservation", "luggage", "visa", "train"],
+    "research": ["experiment", "dataset", "results", "analysis", "hypothesis", "model", "sample", "method", "figure", "paper"],
+    "recipe": ["flour", "sugar", "oven", "bake", "butter", "minutes", "recipe", "ingredients", "serve", "whisk"],
+    "project": ["roadmap", "milestone", "sprint", "release", "backlog", "feature", "design", "review", "deadline", "team"],
+    "health": ["doctor", "appointment", "prescription", "insurance", "clinic", "dosage", "symptoms", "lab", "report", "visit"],
+}
+FILLER = ["the", "and", "with", "for", "from", "note", "update", "summary", "draft", "version", "plan", "list"]
+
+# (kind, weight); duplicates are added on top of these
+KINDS = [
+    ("text", 20), ("pdf", 15), ("csv", 10), ("json", 10), ("png", 10), ("gif", 5),
+    ("zip", 5), ("code", 5), ("binary", 5), ("markdown", 5), ("large_csv", 1),
+]
+
+# Base timestamp of the generated files (2024-01-01 UTC)
+_EPOCH = 1704067200
+
+
+def _words(rng: random.Random, topic: str, count: int) -> List[str]:
+    vocabulary = TOPICS[topic]
+    return [rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(count)]
+
+
+def _sentences(rng: random.Random, topic: str, count: int) -> str:
+    return "\n".join(" ".join(_words(rng, topic, rng.randint(6, 14))).capitalize() + "." for _ in range(count))
+
+
+def _pdf(rng: random.Random, topic: str) -> bytes:
+    """A small valid PDF: one page of text, document info and a classic xref table."""
+    title = " ".join(_words(rng, topic, 4)).title()
+    text = " ".join(_words(rng, topic, 30))
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Title ({title}) /Author (Benchmark Corpus) /Subject ({topic}) /Keywords ({topic}, {rng.choice(TOPICS[topic])}) >>".encode("latin-1"),
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R /Info 6 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def _csv(rng: random.Random, topic: str, rows: int) -> bytes:
+    columns = ["id", "date"] + rng.sample(TOPICS[topic], 3)
+    lines = [",".join(columns)]
+    for row in range(rows):
+        day = rng.randint(1, 365)
+        values = [str(row), f"2024-{(day % 12) + 1:02d}-{(day % 28) + 1:02d}"]
+        values += [f"{rng.uniform(0, 10_000):.2f}", rng.choice(TOPICS[topic]), f'"{rng.choice(FILLER)}, {rng.choice(FILLER)}"']
+        lines.append(",".join(values))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _nested(rng: random.Random, topic: str, depth: int) -> object:
+    if depth == 0:
+        return rng.choice([rng.randint(0, 1000), rng.choice(TOPICS[topic]), rng.random() < 0.5, None])
+    if rng.random() < 0.3:
+        return [_nested(rng, topic, depth - 1) for _ in range(rng.randint(1, 4))]
+    return {rng.choice(TOPICS[topic]) + str(key): _nested(rng, topic, depth - 1) for key in range(rng.randint(1, 4))}
+
+
+def _png(rng: random.Random) -> bytes:
+    width, height = rng.randint(8, 64), rng.randint(8, 64)
+    raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def _gif(rng: random.Random) -> bytes:
+    width, height = rng.randint(1, 32), rng.randint(1, 32)
+    palette = rng.randbytes(6)
+    return (b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80, 0, 0) + palette
+            + b"\x2c" + struct.pack("<HHHHB", 0, 0, width, height, 0) + b"\x02\x02\x44\x01\x00\x3b")
+
+
+def _zip(rng: random.Random, topic: str) -> bytes:
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for member in range(rng.randint(1, 3)):
+            info = zipfile.ZipInfo(f"{topic}_{member}.txt", date_time=(2024, 1, 1, 0, 0, 0))
+            archive.writestr(info, _sentences(rng, topic, rng.randint(3, 20)))
+    return out.getvalue()
+
+
+def _code(rng: random.Random, topic: str) -> bytes:
+    names = rng.sample(TOPICS[topic], 3)
+    body = "\n\n".join(f"def {name}_{index}(value):\n    return value * {rng.randint(2, 9)}"
+                       for index, name in enumerate(names))
+    return f'"""{" ".join(_words(rng, topic, 8))}"""\n\n{body}\n'.encode("utf-8")
+
+
+def _content(kind: str, rng: random.Random, topic: str, large_csv_rows: int) -> Tuple[str, bytes]:
+    """Return the extension and bytes of one file of ``kind``."""
+    if kind == "text":
+        return ".txt", _sentences(rng, topic, rng.randint(2, 40)).encode("utf-8")
+    if kind == "markdown":
+        return ".md", f"# {topic.title()}\n\n{_sentences(rng, topic, rng.randint(2, 20))}\n".encode("utf-8")
+    if kind == "pdf":
+        return ".pdf", _pdf(rng, topic)
+    if kind == "csv":
+        return ".csv", _csv(rng, topic, rng.randint(5, 200))
+    if kind == "large_csv":
+        return ".csv", _csv(rng, topic, large_csv_rows)
+    if kind == "json":
+        return ".json", json.dumps(_nested(rng, topic, rng.randint(3, 6))).encode("utf-8")
+    if kind == "png":
+        return ".png", _png(rng)
+    if kind == "gif":
+        return ".gif", _gif(rng)
+    if kind == "zip":
+        return ".zip", _zip(rng, topic)
+    if kind == "code":
+        return ".py", _code(rng, topic)
+    return ".bin", rng.randbytes(rng.randint(64, 4096))
+
+
+def generate_corpus(root: Path, count: int, seed: int = 0, duplicate_ratio: float = 0.05,
+                    large_csv_rows: int = 5000, per_dir: Optional[int] = None,
+                    on_progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+    """
+    Write ``count`` files into ``root``.
+
+    Args:
+        root (Path): Folder to fill (created if missing)
+        count (int): Number of files, duplicates included
+        seed (int): Seed of the generator; the same seed gives the same corpus
+        duplicate_ratio (float): Share of files that are copies of an earlier file
+        large_csv_rows (int): Rows of the occasional large CSV
+        per_dir (Optional[int]): Spread the files over subfolders of this many
+            files (default: one flat folder, like a downloads folder)
+        on_progress (Optional[Callable[[int], None]]): Called with the number of files written
+
+    Returns:
+        Dict[str, int]: Files written per kind
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    kinds, weights = zip(*KINDS)
+    written: List[Path] = []
+    counts: Counter = Counter()
+
+    for index in range(count):
+        directory = root / f"batch{index // per_dir:04d}" if per_dir else root
+        if per_dir and index % per_dir == 0:
+            directory.mkdir(exist_ok=True)
+
+        if written and rng.random() < duplicate_ratio:
+            original = written[rng.randrange(len(written))]
+            path = directory / f"{original.stem} ({index}){original.suffix}"
+            data = original.read_bytes()
+            kind = "duplicate"
+        else:
+            kind = rng.choices(kinds, weights)[0]
+            topic = rng.choice(list(TOPICS))
+            extension, data = _content(kind, rng, topic, large_csv_rows)
+            path = directory / f"{topic}_{'_'.join(_words(rng, topic, 2))}_{index:06d}{extension}"
+
+        path.write_bytes(data)
+        timestamp = _EPOCH + index * 37
+        os.utime(path, (timestamp, timestamp))
+        written.append(path)
+        counts[kind] += 1
+        if on_progress is not None and (index + 1) % 1000 == 0:
+            on_progress(index + 1)
+
+    return dict(counts)
+
+
+def link_files(paths: Iterable[Path], destination: Path) -> List[Path]:
+    """Hard-link (or copy) files into ``destination`` so a benchmark can move them."""
+    destination.mkdir(parents=True, exist_ok=True)
+    linked = []
+    for path in paths:
+        target = destination / path.name
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copy2(path, target)
+        linked.append(target)
+    return linked
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic downloads folder")
+    parser.add_argument("folder")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="share of copied files")
+    parser.add_argument("--per-dir", type=int, help="files per subfolder (default: flat)")
+    args = parser.parse_args(argv)
+
+    counts = generate_corpus(Path(args.folder), args.count, args.seed, args.duplicates, per_dir=args.per_dir,
+                             on_progress=lambda done: print(f"  {done} files", file=sys.stderr))
+    for kind, written in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"{kind:<10} {written:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
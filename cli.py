@@ -0,0 +1,226 @@
+"""
+Command-line interface for running the organizer without the GUI.
+
+    python cli.py [--config settings.json] [--json] <command> ...
+
+Commands: ``scan`` (analyze a folder), ``watch`` (run the headless daemon),
+``plan`` (suggest a folder structure), ``apply`` (execute a saved plan, or
+plan and execute in one step), ``undo`` (revert an organization run) and
+``stats``. Settings in the ``--config`` JSON file override ``config.py``;
+they are applied before anything else is imported, so every module sees them.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="AI File Organizer (headless)")
+    parser.add_argument("--config", help='JSON file of setting overrides, e.g. {"DOWNLOADS_FOLDER": "/srv/incoming"}')
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="analyze the files in a folder")
+    scan.add_argument("folder", nargs="?", help="folder to scan (default: DOWNLOADS_FOLDER)")
+    scan.add_argument("--recursive", action="store_true", help="include subfolders")
+
+    watch = commands.add_parser("watch", help="watch the downloads folder and sort new files until stopped")
+    watch.add_argument("--process-existing", action="store_true", help="also sort the files already in the folder")
+    watch.add_argument("--metrics", action="store_true", help="serve /metrics and /metrics.json on METRICS_PORT")
+    watch.add_argument("--profile", action="store_true", help="with --metrics, also serve sampled stacks at /profile")
+
+    plan = commands.add_parser("plan", help="suggest a folder structure for a folder")
+    plan.add_argument("folder", nargs="?", help="folder to organize (default: DOWNLOADS_FOLDER)")
+    plan.add_argument("-o", "--output", help="save the plan for 'apply'")
+
+    apply = commands.add_parser("apply", help="execute a saved plan, or plan and execute in one request")
+    source = apply.add_mutually_exclusive_group(required=True)
+    source.add_argument("plan_file", nargs="?", help="plan saved by 'plan --output'")
+    source.add_argument("--now", metavar="FOLDER", nargs="?", const="", help="plan and execute immediately")
+    source.add_argument("--resume", metavar="JOURNAL", nargs="?", const="", help="finish an interrupted run")
+
+    undo = commands.add_parser("undo", help="move the files of an organization run back")
+    undo.add_argument("journal", nargs="?", help="journal of the run (default: the last one)")
+
+    commands.add_parser("stats", help="show index, cache and daemon statistics")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.config:
+        # Read by config.py when it is first imported
+        os.environ["ORGANIZER_CONFIG"] = os.path.abspath(os.path.expanduser(args.config))
+
+    from utils.logger import setup_logger
+    setup_logger("FileOrganizer")
+
+    handler = {
+        "scan": cmd_scan, "watch": cmd_watch, "plan": cmd_plan,
+        "apply": cmd_apply, "undo": cmd_undo, "stats": cmd_stats
+    }[args.command]
+    try:
+        return handler(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+def _folder(args: argparse.Namespace) -> Path:
+    from config import DOWNLOADS_FOLDER
+    return Path(args.folder).expanduser() if getattr(args, "folder", None) else Path(DOWNLOADS_FOLDER)
+
+
+def _print(args: argparse.Namespace, data: Any, text: str) -> None:
+    print(json.dumps(data, indent=2, default=str) if args.json else text)
+
+
+def _analyze(folder: Path, recursive: bool = False) -> List[Dict[str, Any]]:
+    from config import CACHE_DIR, LOG_DIR
+    from utils.analysis_cache import AnalysisCache
+    from utils.file_analyzer import FileAnalyzer
+
+    cache = AnalysisCache()
+    try:
+        return list(FileAnalyzer(cache=cache).scan_directory(folder, recursive=recursive,
+                                                             excluded=(LOG_DIR, CACHE_DIR)))
+    finally:
+        cache.close()
+
+
+def _agent():
+    from agents.file_agent import FileManagementAgent
+    from agents.response_cache import ResponseCache
+    return FileManagementAgent(cache=ResponseCache())
+
+
+def _move_summary(results: Dict[str, Any]) -> str:
+    lines = [f"Moved {len(results['successful_moves'])} files, {len(results['failed_moves'])} failed"]
+    for move in results["failed_moves"]:
+        lines.append(f"  {move['source']}: {move['error']}")
+    if results.get("error"):
+        lines.append(f"Error: {results['error']}")
+    if results.get("journal"):
+        lines.append(f"Journal: {results['journal']} (revert with 'cli.py undo')")
+    return "\n".join(lines)
+
+
+def cmd_scan(args: argparse.Namespace) -> int:
+    folder = _folder(args)
+    files = _analyze(folder, args.recursive)
+    categories = Counter(file_info.get('category', 'Error') for file_info in files)
+    errors = [file_info for file_info in files if "error" in file_info]
+    lines = [f"{folder}: {len(files)} files"]
+    lines.extend(f"  {category}: {count}" for category, count in categories.most_common())
+    lines.extend(f"  ! {file_info.get('path', file_info.get('name'))}: {file_info['error']}" for file_info in errors)
+    _print(args, files, "\n".join(lines))
+    return 0
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    from daemon import OrganizerDaemon
+
+    from config import METRICS_SERVER, PROFILER_ENABLED
+
+    daemon = OrganizerDaemon(metrics=args.metrics or args.profile or METRICS_SERVER,
+                             profile=args.profile or PROFILER_ENABLED)
+    daemon.run(process_existing=args.process_existing)
+    return 0
+
+
+def cmd_plan(args: argparse.Namespace) -> int:
+    folder = _folder(args)
+    files = [file_info for file_info in _analyze(folder) if "error" not in file_info]
+    suggestions = _agent().suggest_organization(files)
+    if args.output:
+        saved = {"base_dir": str(folder), "files": files, "plan": suggestions["plan"]}
+        Path(args.output).write_text(json.dumps(saved, indent=2, default=str))
+    _print(args, suggestions["plan"], suggestions["organization_suggestions"])
+    return 0
+
+
+def cmd_apply(args: argparse.Namespace) -> int:
+    if args.now is not None:
+        folder = Path(args.now).expanduser() if args.now else _folder(args)
+        files = [file_info for file_info in _analyze(folder) if "error" not in file_info]
+        results = _agent().organize(files)
+        if not args.json:
+            print(results["organization_suggestions"])
+        results.pop("files", None)
+    else:
+        from utils.move_executor import MoveExecutor
+
+        executor = MoveExecutor()
+        if args.resume is not None:
+            interrupted = executor.interrupted()
+            journal = Path(args.resume) if args.resume else (interrupted[-1] if interrupted else None)
+            if journal is None:
+                print("No interrupted organization run to resume", file=sys.stderr)
+                return 1
+            results = executor.resume(journal)
+        else:
+            saved = json.loads(Path(args.plan_file).read_text())
+            base_dir = Path(saved["base_dir"])
+            operations = executor.plan(
+                (Path(source), base_dir / destination) for source, destination in saved["plan"]["moves"].items()
+            )
+            results = executor.execute(operations)
+
+    _print(args, results, _move_summary(results))
+    return 1 if results.get("error") or results["failed_moves"] else 0
+
+
+def cmd_undo(args: argparse.Namespace) -> int:
+    from utils.move_executor import MoveExecutor
+
+    executor = MoveExecutor()
+    journal = Path(args.journal) if args.journal else executor.last_journal()
+    if journal is None:
+        print("Nothing to undo", file=sys.stderr)
+        return 1
+    results = executor.undo(journal)
+    lines = [f"Restored {len(results['restored'])} files from {journal.name}"]
+    lines.extend(f"  {move['destination']}: {move['error']}" for move in results["failed"])
+    _print(args, results, "\n".join(lines))
+    return 1 if results["failed"] else 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    from config import DAEMON_STATS_FILE
+    from utils.move_executor import MoveExecutor
+    from utils.watcher import index_roots, load_watch_roots
+
+    roots = load_watch_roots()
+    index = index_roots(roots)
+    try:
+        index.reconcile()
+        entries = index.query()
+    finally:
+        index.close()
+    executor = MoveExecutor()
+    stats = {
+        "folders": [str(root.path) for root in roots],
+        "files": len(entries),
+        "bytes": sum(entry.size for entry in entries),
+        "categories": dict(Counter(entry.category for entry in entries).most_common()),
+        "journals": len(executor.journals()),
+        "interrupted": [str(journal) for journal in executor.interrupted()],
+        "daemon": json.loads(DAEMON_STATS_FILE.read_text()) if DAEMON_STATS_FILE.exists() else None
+    }
+
+    lines = [f"{', '.join(stats['folders'])}: {stats['files']} files, {stats['bytes'] / 1e6:.1f} MB"]
+    lines.extend(f"  {category}: {count}" for category, count in stats["categories"].items())
+    lines.append(f"Organization runs: {stats['journals']} ({len(stats['interrupted'])} interrupted)")
+    daemon = stats["daemon"]
+    if daemon:
+        lines.append(f"Daemon (updated {daemon['updated']}): {daemon['processed']} sorted, "
+                     f"{daemon['failed']} failed, {daemon['queued']} queued")
+    _print(args, stats, "\n".join(lines))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,59 @@
+import json
 import os
 from pathlib import Path
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+
+def load_overrides(config_file: Optional[str]) -> Dict[str, Any]:
+    """
+    Read setting overrides from a JSON file of ``{"SETTING_NAME": value}``.
+
+    Names are case-insensitive. Returns an empty dict when no file is given.
+    """
+    if not config_file:
+        return {}
+    with open(os.path.expanduser(config_file), "r", encoding="utf-8") as file:
+        values = json.load(file)
+    if not isinstance(values, dict):
+        raise ValueError(f"{config_file} must contain a JSON object of settings")
+    return {str(name).upper(): value for name, value in values.items()}
+
+
+def _coerce(value: Any, default: Any) -> Any:
+    if isinstance(default, Path):
+        return Path(os.path.expanduser(str(value)))
+    if isinstance(default, tuple) and isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+# Overrides from the file named by ORGANIZER_CONFIG (set by ``cli.py --config``)
+_OVERRIDES = load_overrides(os.getenv("ORGANIZER_CONFIG"))
+
+
+def _setting(name: str, default: Any) -> Any:
+    return _coerce(_OVERRIDES[name], default) if name in _OVERRIDES else default
+
+
 # Base directories
 HOME_DIR = Path.home()
-DOWNLOADS_FOLDER = Path("/Users/jatanrathod/SortedProjects/Dummy Downloads")
-SORTED_FOLDER = Path("/Users/jatanrathod/SortedProjects/Dummy Downloads")  # Same as DOWNLOADS_FOLDER
-LOG_DIR = SORTED_FOLDER / "logs"
-
-# Create necessary directories
-SORTED_FOLDER.mkdir(exist_ok=True)
-LOG_DIR.mkdir(exist_ok=True)
+DOWNLOADS_FOLDER = _setting("DOWNLOADS_FOLDER", Path("/Users/jatanrathod/SortedProjects/Dummy Downloads"))
+SORTED_FOLDER = _setting("SORTED_FOLDER", Path("/Users/jatanrathod/SortedProjects/Dummy Downloads"))  # Same as DOWNLOADS_FOLDER
+LOG_DIR = _setting("LOG_DIR", SORTED_FOLDER / "logs")
+CACHE_DIR = _setting("CACHE_DIR", SORTED_FOLDER / ".cache")
 
 # Logging configuration
 LOG_FILE = LOG_DIR / "file_organizer.log"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_LEVEL = "INFO"
+LOG_JSON = True  # write the log file as JSON lines (the console stays plain text)
+LOG_MAX_BYTES = 10 * 1024 * 1024  # rotate the log file at this size...
+LOG_ROTATE_INTERVAL = 24 * 3600  # ...or after this many seconds (0 rotates by size only)
+LOG_BACKUP_COUNT = 5  # rotated files kept
 
 # File categories and their extensions
 FILE_CATEGORIES = {
@@ -46,14 +81,133 @@ FILE_CATEGORIES = {
 
 # AI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+AI_BACKEND = "openai"  # "openai", "local" (OpenAI-compatible server at AI_BASE_URL), "fake" (offline) or "module:factory"
+AI_BASE_URL = "http://127.0.0.1:8080/v1"  # endpoint of the "local" backend
 AI_MODEL = "gpt-3.5-turbo"
+AI_CLASSIFY_MODEL = None  # per-file classification and metadata (default: AI_MODEL); a small, fast model
+AI_PLAN_MODEL = None  # folder-level organization planning (default: AI_MODEL); a larger model
+AI_TEMPERATURE = 0.2
 
 # File processing settings
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
-PROCESSING_DELAY = 1  # 1 second
+STABILITY_QUIET_PERIOD = 0.5  # seconds a file must stay unchanged before it is processed
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".partial", ".download", ".tmp")
 MAX_RETRIES = 3  # maximum number of retries for file operations
 
+# Watched folders: a path, or {"path": ..., "recursive": true, "ingest": "top" | "all" | "none",
+# "sorted_folder": ..., "ignore": ["*.tmp"], "workers": 2}. "ingest" sorts new files directly in the
+# folder ("top"), at any depth ("all") or only indexes them ("none"); "sorted_folder" defaults to SORTED_FOLDER
+WATCH_ROOTS = [{"path": DOWNLOADS_FOLDER, "recursive": True, "ingest": "top"}]
+WATCH_COALESCE_WINDOW = 0.1  # seconds a path's events are folded into one before dispatch (0 dispatches each)
+# Seconds the next event on a path the organizer itself moved is kept out of the pipeline
+# (every event in that time, not just the next, when WATCH_COALESCE_WINDOW is 0)
+WATCH_SELF_EVENT_TTL = 5.0
+
+# Ingestion pipeline settings
+INGEST_WORKERS = 4  # worker threads analyzing and moving new files, per watched folder
+INGEST_QUEUE_SIZE = 500  # files waiting for a worker (per watched folder) before the observer blocks
+INGEST_SUBMIT_TIMEOUT = 30.0  # seconds the observer blocks on a full queue
+AI_CONCURRENCY = 2  # maximum concurrent AI calls from the pipeline
+
+# Bulk folder scanning
+SCAN_WORKERS = os.cpu_count() or 1  # worker processes for FileAnalyzer.analyze_many
+SCAN_BATCH_SIZE = 64  # files sent to a worker process at a time
+SCAN_PARALLEL_THRESHOLD = 256  # uncached files needed before starting the process pool
+
+# Analysis cache settings
+ANALYSIS_CACHE_FILE = CACHE_DIR / "analysis.sqlite3"
+ANALYSIS_CACHE_MAX_ENTRIES = 200_000
+ANALYSIS_CACHE_MAX_AGE = 30 * 24 * 3600  # drop entries not used for 30 days
+ANALYSIS_CACHE_HASH_FALLBACK = False  # match renamed/re-downloaded files by content hash
+
+# AI response cache settings
+RESPONSE_CACHE_FILE = CACHE_DIR / "responses.sqlite3"
+RESPONSE_CACHE_MAX_ENTRIES = 5000  # responses kept in memory
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # 7 days
+
+# Duplicate detection
+DEDUP_ENABLED = True  # reuse the analysis and AI verdict of identical files
+DEDUP_PARTIAL_BYTES = 64 * 1024  # bytes hashed at each end of a file before a full hash
+DEDUP_MAX_ENTRIES = 100_000  # files remembered as potential originals
+DEDUP_HARDLINK = False  # replace exact duplicates with hard links to the original
+DEDUP_NEAR_ENABLED = False  # also match near-duplicate text files by MinHash
+DEDUP_NEAR_THRESHOLD = 0.9  # estimated Jaccard similarity of word shingles
+DEDUP_SKETCH_SIZE = 128  # MinHash values kept per file
+DEDUP_SHINGLE_WORDS = 5  # words per shingle
+DEDUP_SHINGLE_BYTES = 64 * 1024  # bytes of text sketched per file
+
+# Directory index settings
+DIRECTORY_INDEX_FILE = CACHE_DIR / "directory_index.sqlite3"
+
+# Organization moves
+MOVE_JOURNAL_DIR = CACHE_DIR / "journals"  # append-only journals used for resume/undo
+MOVE_WORKERS = 8  # concurrent moves when executing a plan
+TRANSFER_VERIFY = False  # hash-compare cross-device copies before deleting the source
+TRANSFER_FSYNC = True  # flush cross-device copies to disk before deleting the source
+
+# Headless daemon (cli.py watch)
+DAEMON_SYNC_INTERVAL = 5.0  # seconds between directory index syncs and stats updates
+DAEMON_STATS_FILE = CACHE_DIR / "daemon_stats.json"  # counters of the running daemon, read by `cli.py stats`
+
+# Metrics and profiling
+METRICS_SERVER = False  # serve /metrics (Prometheus text), /metrics.json and /profile from the app and daemon
+METRICS_HOST = "127.0.0.1"  # keep the endpoint local
+METRICS_PORT = 9464
+PROFILER_ENABLED = False  # sample every thread's stack while the metrics server runs (opt-in)
+PROFILER_INTERVAL = 0.01  # seconds between stack samples
+PROFILER_MAX_DEPTH = 64  # frames kept per sampled stack
+
+# Batched classification of new files
+BATCH_ENABLED = True
+BATCH_WINDOW = 0.5  # seconds to wait for more files before sending a batch
+BATCH_MAX_FILES = 25  # files per batched request
+BATCH_MAX_TOKENS = 3000  # estimated prompt tokens of file descriptions per batch
+
+# Folder planning
+PLAN_CHUNK_TOKENS = 6000  # estimated prompt tokens per planning request
+PLAN_REASK_ATTEMPTS = 2  # follow-up requests for invalid or missing plan entries
+PLAN_COMBINED = False  # suggest and execute in one streamed request instead of two steps
+SIMILARITY_PLANNING = True  # group files locally by content and have the AI only name the groups
+SIMILARITY_DIMENSIONS = 2048  # hashed TF-IDF features per file
+SIMILARITY_THRESHOLD = 0.35  # cosine similarity linking two files into one group
+SIMILARITY_NEIGHBORS = 10  # nearest neighbours considered per file when grouping
+SIMILARITY_SNIPPET_CHARS = 4000  # characters of text/PDF content read per file
+
+# Async AI requests
+LLM_MAX_IN_FLIGHT = 16  # concurrent requests across the async agent
+LLM_RATE_LIMIT = 5.0  # requests per second (0 disables rate limiting)
+LLM_RATE_BURST = 10  # requests allowed back to back before the rate limit applies
+LLM_TIMEOUT = 60.0  # seconds per request attempt
+LLM_BACKOFF_BASE = 0.5  # seconds before the first retry, doubled on every attempt
+LLM_BACKOFF_MAX = 20.0  # longest delay between retries
+
+# Rules-first classification
+RULES_FILE = Path(__file__).parent / "rules.json"  # optional user rules, checked before the defaults
+RULES_CONFIDENCE_THRESHOLD = 0.8  # rule matches at or above this skip the AI call
+DEFAULT_RULE_CONFIDENCE = 0.9  # confidence of the FILE_CATEGORIES extension rules
+CATEGORIES_FILE = Path(__file__).parent / "categories.json"  # optional user categories added to FILE_CATEGORIES
+
 # UI Configuration
 WINDOW_TITLE = "AI File Organizer"
 WINDOW_SIZE = (800, 600)
-REFRESH_INTERVAL = 5000  # 5 seconds 
\ No newline at end of file
+REFRESH_INTERVAL = 5000  # 5 seconds
+FILE_LIST_FETCH_BATCH = 500  # rows materialized per scroll step in the file list
+FILE_LIST_RESET_THRESHOLD = 1000  # changes applied as one model reset instead of row updates
+
+
+def ensure_directories() -> None:
+    """Create the sorted, log and cache folders; called by ``setup_logger``, not on import."""
+    for directory in (SORTED_FOLDER, LOG_DIR, CACHE_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+def apply_overrides(overrides: Dict[str, Any]) -> None:
+    """Replace module settings with override values, keeping each setting's type."""
+    settings = globals()
+    for name, value in overrides.items():
+        if not name.isupper() or name not in settings:
+            raise ValueError(f"Unknown setting in config file: {name}")
+        settings[name] = _coerce(value, settings[name])
+
+
+apply_overrides(_OVERRIDES)
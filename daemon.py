@@ -0,0 +1,226 @@
+"""
+Headless organizer service.
+
+Watches the folders in ``WATCH_ROOTS`` and files new downloads away like the
+GUI does, without importing Qt. Run it through ``cli.py watch``.
+"""
+import json
+import logging
+import signal
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from config import (
+    SORTED_FOLDER, AI_CONCURRENCY, BATCH_ENABLED, DEDUP_ENABLED,
+    DAEMON_SYNC_INTERVAL, DAEMON_STATS_FILE, METRICS_SERVER, PROFILER_ENABLED
+)
+from utils.analysis_cache import AnalysisCache
+from utils.dedup import DuplicateDetector
+from utils.file_analyzer import FileAnalyzer
+from utils.ingest import IngestPipeline
+from utils.metrics import MetricsServer, start_metrics_server
+from utils.processor import FileProcessor
+from utils.rules import RuleEngine
+from utils.stability import WriteCompletionDetector
+from utils.watcher import FolderWatcher, WatchRoot, index_roots, load_watch_roots
+from agents.batcher import ClassificationBatcher
+from agents.file_agent import FileManagementAgent
+from agents.response_cache import ResponseCache
+
+logger = logging.getLogger("FileOrganizer.daemon")
+
+
+class OrganizerDaemon:
+    """
+    Long-running watcher that sorts new downloads into category folders.
+
+    Uses the same folder watcher, ingest pipeline, write-completion
+    detector, rules, caches and agent as the GUI. Each watched folder has
+    its own ingest queue and workers. ``run`` blocks until ``stop`` is
+    called (or SIGINT / SIGTERM arrives), then stops accepting events,
+    finishes the files being processed, leaves the queued ones in place for
+    the next run and closes the caches. While running, it periodically syncs
+    the directory index and writes its counters to ``stats_file``.
+    """
+
+    def __init__(self, roots: Optional[Iterable[WatchRoot]] = None, sorted_folder: Path = SORTED_FOLDER,
+                 sync_interval: float = DAEMON_SYNC_INTERVAL, stats_file: Optional[Path] = DAEMON_STATS_FILE,
+                 file_agent: Optional[FileManagementAgent] = None, metrics: bool = METRICS_SERVER,
+                 profile: bool = PROFILER_ENABLED):
+        """
+        Args:
+            roots (Optional[Iterable[WatchRoot]]): Folders to watch and their policies
+                (default: ``WATCH_ROOTS``)
+            sorted_folder (Path): Root of the category folders of roots without their own
+            sync_interval (float): Seconds between directory index syncs and stats updates
+            stats_file (Optional[Path]): Where to write the counters (None to disable)
+            file_agent (Optional[FileManagementAgent]): Agent to classify files with
+            metrics (bool): Serve metrics locally while running (``METRICS_HOST``:``METRICS_PORT``)
+            profile (bool): Also run the sampling profiler (needs ``metrics``)
+        """
+        self.roots = list(roots) if roots is not None else load_watch_roots()
+        self.sorted_folder = Path(sorted_folder)
+        self.sync_interval = sync_interval
+        self.stats_file = Path(stats_file) if stats_file else None
+        self.metrics = metrics
+        self.profile = profile
+        self.metrics_server: Optional[MetricsServer] = None
+        self.processed = 0
+        self.failed = 0
+        self.started: Optional[datetime] = None
+
+        self.analysis_cache = AnalysisCache()
+        self.duplicates = DuplicateDetector() if DEDUP_ENABLED else None
+        self.file_analyzer = FileAnalyzer(cache=self.analysis_cache, dedup=self.duplicates)
+        self.rule_engine = RuleEngine.from_config()
+        self.response_cache = ResponseCache()
+        self.file_agent = file_agent or FileManagementAgent(cache=self.response_cache)
+        self.batcher = ClassificationBatcher(self.file_agent) if BATCH_ENABLED else None
+        self.processor = FileProcessor(
+            self.file_analyzer, self.rule_engine, self.file_agent,
+            duplicates=self.duplicates, batcher=self.batcher,
+            ai_slots=threading.BoundedSemaphore(AI_CONCURRENCY),
+            sorted_folder=self.sorted_folder, on_batched=self._report
+        )
+        self.directory_index = index_roots(self.roots)
+
+        self.pipeline = IngestPipeline(
+            self.processor.process,
+            on_result=lambda path, result: self._report(result) if result is not None else None,
+            on_error=lambda path, error: self._report({"name": Path(path).name, "error": str(error)})
+        )
+        for root in self.roots:
+            self.pipeline.add_shard(root.path, self._processor_for(root), workers=root.workers or None)
+        self.write_detector = WriteCompletionDetector(self._enqueue)
+        self.watcher = FolderWatcher(self.roots, self.directory_index, self.write_detector)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, process_existing: bool = False) -> None:
+        """
+        Start watching.
+
+        Args:
+            process_existing (bool): Also sort the files already in the folders
+        """
+        self.started = datetime.now()
+        self.directory_index.reconcile()
+        for journal in self.file_agent.move_executor.interrupted():
+            logger.warning("Organization run %s was interrupted; finish it with "
+                           "'cli.py apply --resume %s' or revert it with 'cli.py undo %s'",
+                           journal.stem, journal, journal)
+
+        self.pipeline.start()
+        self.write_detector.start()
+        self.watcher.start()
+        if self.metrics:
+            try:
+                self.metrics_server = start_metrics_server(self.profile)
+            except OSError as e:
+                logger.warning("Could not start the metrics server: %s", e)
+
+        if process_existing:
+            for file_path in self.watcher.existing_files():
+                self._enqueue(file_path)
+
+    def run(self, process_existing: bool = False, handle_signals: bool = True) -> None:
+        """
+        Start and block until stopped, then shut down.
+
+        Args:
+            process_existing (bool): Also sort the files already in the folders
+            handle_signals (bool): Stop on SIGINT/SIGTERM (main thread only)
+        """
+        if handle_signals:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda signum, frame: self.stop())
+        self.start(process_existing)
+        try:
+            while not self._stop.wait(self.sync_interval):
+                self.directory_index.sync()
+                self.write_stats()
+        finally:
+            self.shutdown()
+
+    def stop(self) -> None:
+        """Ask ``run`` to return; safe to call from signal handlers and other threads."""
+        self._stop.set()
+
+    def shutdown(self) -> None:
+        """Stop watching, finish the files being processed and close the caches."""
+        logger.info("Shutting down")
+        self.watcher.stop()
+        self.write_detector.stop()
+        # Queued files stay where they are; the next start (with --process-existing) picks them up
+        discarded = self.pipeline.stop(drain=False)
+        if discarded:
+            logger.info("Left %d queued files unsorted", discarded)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.batcher is not None:
+            self.batcher.stop()
+        self.directory_index.sync()
+        self.write_stats()
+        self.analysis_cache.close()
+        self.response_cache.close()
+        self.directory_index.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the daemon's counters."""
+        with self._lock:
+            counters = {"processed": self.processed, "failed": self.failed}
+        return {
+            "started": self.started.isoformat() if self.started else None,
+            "updated": datetime.now().isoformat(),
+            "running": self.started is not None and not self._stop.is_set(),
+            "watching": [str(root.path) for root in self.roots],
+            **counters,
+            "queued": self.pipeline.depth,
+            "queued_by_folder": self.pipeline.shard_depths(),
+            "active": self.pipeline.active,
+            "settling": self.write_detector.pending,
+            "events": self.watcher.stats(),
+            "indexed_files": len(self.directory_index),
+            "rules": self.rule_engine.stats(),
+            "analysis_cache": {"hits": self.analysis_cache.hits, "misses": self.analysis_cache.misses},
+            "response_cache": self.response_cache.stats(),
+            "duplicates": self.duplicates.stats() if self.duplicates is not None else None
+        }
+
+    def write_stats(self) -> None:
+        """Write the counters to ``stats_file`` (atomically, for ``cli.py stats``)."""
+        if self.stats_file is None:
+            return
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            temp = self.stats_file.with_suffix(".tmp")
+            temp.write_text(json.dumps(self.stats(), indent=2))
+            temp.replace(self.stats_file)
+        except OSError as e:
+            logger.warning("Could not write stats to %s: %s", self.stats_file, e)
+
+    def _processor_for(self, root: WatchRoot):
+        sorted_folder = root.sorted_folder or self.sorted_folder
+        return lambda file_path: self.processor.process(file_path, sorted_folder)
+
+    def _enqueue(self, file_path: Path) -> None:
+        root = self.watcher.root_for(file_path)
+        if not self.pipeline.submit(file_path, root.path if root is not None else None):
+            self._report({"name": file_path.name, "error": "Ingest queue is full, file skipped"})
+
+    def _report(self, result: Dict[str, Any]) -> None:
+        # Runs on pipeline and batcher threads
+        with self._lock:
+            if "error" in result:
+                self.failed += 1
+            else:
+                self.processed += 1
+        if "error" in result:
+            logger.error("%s (%s)", result['error'], result['name'], extra={"file": result['name']})
+        else:
+            logger.info("Moved %s to %s (%s)", result['name'], result['new_path'], result['category'],
+                        extra={"file": result['name'], "destination": result['new_path'],
+                               "category": result['category']})
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Cumulative import time budget per entry module, in milliseconds
+IMPORT_BUDGETS_MS = {
+    "agents.file_agent": 300,
+    "utils.file_analyzer": 200,
+    "daemon": 400,
+    "cli": 50,
+}
+
+# Dependencies that must only load when a feature first needs them
+LAZY_MODULES = ["langchain", "langchain_community", "openai", "PyPDF2", "numpy", "PyQt6"]
+
+ROOT = Path(__file__).resolve().parent
+
+
+def _run(code: str, *options: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter from the project root."""
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative time spent importing ``module`` in a cold interpreter, from ``-X importtime``."""
+    result = _run(f"import {module}", "-X", "importtime")
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def loaded_modules(module: str) -> set:
+    """Top-level packages present in ``sys.modules`` after importing ``module``."""
+    result = _run(f"import sys, {module}; print('\\n'.join(sys.modules))")
+    return {name.split(".")[0] for name in result.stdout.split()}
+
+
+def test_heavy_dependencies_load_lazily():
+    """Importing the entry modules must not pull in LangChain, OpenAI, PyPDF2, NumPy or Qt."""
+    for module in IMPORT_BUDGETS_MS:
+        eager = sorted(set(LAZY_MODULES) & loaded_modules(module))
+        assert not eager, f"importing {module} loads {', '.join(eager)}"
+
+
+def test_import_time_budget():
+    """Each entry module imports within its cold-start budget (best of three runs)."""
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        elapsed = min(import_time_ms(module) for _ in range(3))
+        assert elapsed <= budget, f"importing {module} took {elapsed:.0f} ms (budget {budget} ms)"
+
+
+def test_config_import_has_no_side_effects(tmp_path):
+    """Importing config must not create the sorted, log or cache folders."""
+    settings = tmp_path / "settings.json"
+    sorted_folder = tmp_path / "sorted"
+    settings.write_text(f'{{"SORTED_FOLDER": "{sorted_folder}"}}')
+    subprocess.run(
+        [sys.executable, "-c", "import config"], cwd=ROOT, check=True,
+        env={**os.environ, "ORGANIZER_CONFIG": str(settings)}
+    )
+    assert not sorted_folder.exists()
+
+
+if __name__ == "__main__":
+    print("⏱  Cold import times (best of three):")
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        elapsed = min(import_time_ms(module) for _ in range(3))
+        eager = sorted(set(LAZY_MODULES) & loaded_modules(module))
+        status = "✅" if elapsed <= budget and not eager else "❌"
+        print(f"{status} {module}: {elapsed:.0f} ms (budget {budget} ms)"
+              + (f", loads {', '.join(eager)}" if eager else ""))
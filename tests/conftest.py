@@ -0,0 +1,30 @@
+"""
+Fixtures shared by the unit tests.
+
+    python -m pytest tests
+
+config.py reads ``ORGANIZER_CONFIG`` on first import, so every folder the
+code under test writes to (sorted files, journals, caches, logs) points into
+a temporary directory instead of the user's.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+sys.path.insert(0, str(TESTS_DIR.parent))
+
+WORK_DIR = Path(tempfile.mkdtemp(prefix="organizer-tests-"))
+(WORK_DIR / "settings.json").write_text(json.dumps({
+    "DOWNLOADS_FOLDER": str(WORK_DIR / "downloads"),
+    "SORTED_FOLDER": str(WORK_DIR / "sorted"),
+}))
+os.environ["ORGANIZER_CONFIG"] = str(WORK_DIR / "settings.json")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from utils import analysis_cache
+from utils.analysis_cache import AnalysisCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnalysisCache(tmp_path / "analysis.sqlite3", hash_fallback=True)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """Paths passed to ``hash_file``, in call order."""
+    calls = []
+
+    def hash_file(file_path):
+        calls.append(str(file_path))
+        return real_hash_file(file_path)
+
+    real_hash_file = analysis_cache.hash_file
+    monkeypatch.setattr(analysis_cache, "hash_file", hash_file)
+    return calls
+
+
+def test_miss_then_put_hashes_once(cache, hashed, tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text("quarterly numbers")
+    stat = os.stat(path)
+
+    assert cache.get(path, stat) is None
+    cache.put(path, stat, {"name": path.name, "category": "Documents"})
+
+    assert hashed == [str(path)]
+    assert cache.get(path, stat)["category"] == "Documents"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_put_without_lookup_still_hashes(cache, hashed, tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text("quarterly numbers")
+
+    cache.put(path, os.stat(path), {"name": path.name})
+
+    assert hashed == [str(path)]
+
+
+def test_changed_file_is_hashed_again(cache, hashed, tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text("quarterly numbers")
+    assert cache.get(path, os.stat(path)) is None
+
+    path.write_text("revised quarterly numbers")
+    cache.put(path, os.stat(path), {"name": path.name})
+
+    assert hashed == [str(path), str(path)]
+
+
+def test_renamed_file_hits_by_content(cache, tmp_path):
+    original = tmp_path / "report.txt"
+    original.write_text("quarterly numbers")
+    cache.put(original, os.stat(original), {"name": original.name, "path": str(original), "category": "Documents"})
+
+    renamed = tmp_path / "report (1).txt"
+    original.rename(renamed)
+    analysis = cache.get(renamed, os.stat(renamed))
+
+    assert analysis["category"] == "Documents"
+    assert analysis["path"] == str(renamed)
+    assert analysis["name"] == renamed.name
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+from agents import async_agent
+from agents.async_agent import AsyncFileManagementAgent, AsyncTokenBucket, is_transient
+from agents.chat import chat_messages
+from agents.fake_chat import FakeChatModel
+from agents.file_agent import FileManagementAgent
+
+MESSAGES = chat_messages("system", "hello")
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def _failing(*errors):
+    """Responder raising ``errors`` on the first calls, then answering "ok"."""
+    remaining = list(errors)
+
+    def respond(messages):
+        if remaining:
+            raise remaining.pop(0)
+        return "ok"
+    return respond
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays, recorded instead of slept; jitter is always at its maximum."""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    monkeypatch.setattr(async_agent.random, "uniform", lambda low, high: high)
+    return delays
+
+
+def _agent(chat, **kwargs):
+    kwargs.setdefault("rate_limit", 0)
+    return AsyncFileManagementAgent(FileManagementAgent(chat=chat), **kwargs)
+
+
+@pytest.mark.parametrize("error, transient", [
+    (asyncio.TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (RateLimitError(), True),
+    (APIStatusError(503), True),
+    (APIStatusError(429), True),
+    (APIStatusError(400), False),
+    (APIStatusError(401), False),
+    (ValueError("bad prompt"), False),
+])
+def test_only_transient_errors_are_retried(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_transient_failures_are_retried_with_backoff(sleeps):
+    chat = FakeChatModel(_failing(ConnectionError(), APIStatusError(502)))
+    agent = _agent(chat, max_retries=3)
+
+    assert asyncio.run(agent._ainvoke(MESSAGES)) == "ok"
+    assert chat.calls == 3 and agent.retries == 2
+    assert sleeps == [2 * async_agent.LLM_BACKOFF_BASE, 4 * async_agent.LLM_BACKOFF_BASE]
+
+
+def test_permanent_failures_are_not_retried(sleeps):
+    chat = FakeChatModel(_failing(APIStatusError(400)))
+
+    with pytest.raises(APIStatusError):
+        asyncio.run(_agent(chat, max_retries=3)._ainvoke(MESSAGES))
+    assert chat.calls == 1 and sleeps == []
+
+
+def test_backoff_is_capped(sleeps, monkeypatch):
+    monkeypatch.setattr(async_agent, "LLM_BACKOFF_BASE", 4.0)
+    monkeypatch.setattr(async_agent, "LLM_BACKOFF_MAX", 10.0)
+    chat = FakeChatModel(_failing(*[ConnectionError()] * 4))
+
+    assert asyncio.run(_agent(chat, max_retries=4)._ainvoke(MESSAGES)) == "ok"
+    assert sleeps == [8.0, 10.0, 10.0, 10.0]
+
+
+def test_timed_out_attempts_are_retried_then_raised(monkeypatch):
+    monkeypatch.setattr(async_agent, "LLM_BACKOFF_BASE", 0.001)
+    chat = FakeChatModel(latency=1.0)
+    agent = _agent(chat, timeout=0.05, max_retries=2)
+
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(agent._ainvoke(MESSAGES))
+    assert chat.calls == 3 and time.monotonic() - start < 0.9
+
+
+def test_token_bucket_allows_a_burst_then_paces_requests():
+    bucket = AsyncTokenBucket(rate=20, capacity=2)
+
+    async def acquire(count):
+        times = []
+        for _ in range(count):
+            await bucket.acquire()
+            times.append(time.monotonic())
+        return times
+
+    start = time.monotonic()
+    times = [t - start for t in asyncio.run(acquire(5))]
+
+    assert times[1] < 0.03
+    assert times[4] >= 3 / 20 - 0.01
+
+
+def test_token_bucket_without_a_rate_never_waits():
+    bucket = AsyncTokenBucket(rate=0, capacity=1)
+
+    async def acquire():
+        for _ in range(100):
+            await bucket.acquire()
+
+    start = time.monotonic()
+    asyncio.run(acquire())
+    assert time.monotonic() - start < 0.1
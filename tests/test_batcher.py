@@ -0,0 +1,121 @@
+import json
+import re
+import time
+
+import pytest
+
+from agents.batcher import ClassificationBatcher
+from agents.fake_chat import FakeChatModel
+from agents.file_agent import FileManagementAgent
+from agents.tokens import estimate_tokens
+
+_BATCH_ROW = re.compile(r'^\s*(\d+): \{"name":"([^"]+)"', re.MULTILINE)
+
+
+def _file(name):
+    return {"name": name, "path": f"/inbox/{name}", "mime_type": "text/plain", "category": "Documents",
+            "size": 10, "created": "2024-01-01", "modified": "2024-01-01", "metadata": {}}
+
+
+def _responder(batches):
+    """Answer batches for every file but those named "*skip*"; single-file prompts for "*bad*" fail."""
+    def respond(messages):
+        prompt = messages[-1].content
+        rows = _BATCH_ROW.findall(prompt)
+        if rows:
+            batches.append([name for _, name in rows])
+            return json.dumps([{"id": int(file_id), "location": name} for file_id, name in rows
+                               if "skip" not in name])
+        name = re.search(r"Name: (\S+)", prompt).group(1)
+        if "bad" in name:
+            raise ConnectionError(f"model unavailable for {name}")
+        return f"single {name}"
+    return respond
+
+
+@pytest.fixture
+def batches():
+    return []
+
+
+@pytest.fixture
+def make(batches):
+    batchers = []
+
+    def make(**kwargs):
+        agent = FileManagementAgent(chat=FakeChatModel(_responder(batches)))
+        batchers.append(ClassificationBatcher(agent, workers=1, **kwargs))
+        return batchers[-1]
+
+    yield make
+    for batcher in batchers:
+        batcher.stop()
+
+
+def test_files_within_the_window_share_one_request(make, batches):
+    batcher = make(window=0.1, max_files=10, max_tokens=10_000)
+    start = time.monotonic()
+
+    futures = [batcher.submit(_file(name)) for name in ["a", "b", "c"]]
+
+    results = [future.result(2) for future in futures]
+    assert time.monotonic() - start >= 0.1
+    assert batches == [["a", "b", "c"]]
+    assert [result["verdict"]["location"] for result in results] == ["a", "b", "c"]
+
+
+def test_full_batch_is_sent_before_the_window_ends(make, batches):
+    batcher = make(window=10, max_files=2, max_tokens=10_000)
+
+    futures = [batcher.submit(_file(name)) for name in ["a", "b"]]
+
+    assert [future.result(2)["file_info"]["name"] for future in futures] == ["a", "b"]
+    assert batches == [["a", "b"]]
+
+
+def test_token_budget_splits_batches(make, batches):
+    batcher = make(window=10, max_files=10, max_tokens=10_000)
+    batcher.max_tokens = int(estimate_tokens(batcher.agent.describe_file(_file("a"))) * 2.5)
+
+    futures = [batcher.submit(_file(name)) for name in ["a", "b", "c"]]
+    batcher.stop()
+
+    assert [future.result(2)["file_info"]["name"] for future in futures] == ["a", "b", "c"]
+    assert batches == [["a", "b"]]
+    assert futures[2].result()["ai_analysis"] == "single c"
+
+
+def test_skipped_files_fall_back_to_single_requests(make, batches):
+    batcher = make(window=0.05, max_files=3, max_tokens=10_000)
+
+    futures = [batcher.submit(_file(name)) for name in ["a", "skip-b", "c"]]
+
+    results = [future.result(2) for future in futures]
+    assert results[1]["ai_analysis"] == "single skip-b" and "verdict" not in results[1]
+    assert results[0]["verdict"]["location"] == "a" and results[2]["verdict"]["location"] == "c"
+
+
+def test_failed_fallback_only_fails_its_own_file(make):
+    batcher = make(window=0.05, max_files=3, max_tokens=10_000)
+
+    futures = [batcher.submit(_file(name)) for name in ["a", "skip-bad", "skip-c"]]
+
+    assert futures[0].result(2)["verdict"]["location"] == "a"
+    with pytest.raises(ConnectionError):
+        futures[1].result(2)
+    assert futures[2].result(2)["ai_analysis"] == "single skip-c"
+
+
+def test_failed_batch_request_fails_every_file(make):
+    batcher = make(window=0.05, max_files=1, max_tokens=10_000)
+
+    with pytest.raises(ConnectionError):
+        batcher.submit(_file("bad")).result(2)
+
+
+def test_stopped_batcher_rejects_files(make):
+    batcher = make(window=0.05)
+    batcher.stop()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(_file("a"))
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from config import FILE_CATEGORIES
+from utils.classification import DEFAULT_CATEGORY, ClassificationIndex, _MimeTrie
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ClassificationIndex(FILE_CATEGORIES)
+
+
+def test_trie_longest_match():
+    trie = _MimeTrie([("image/", "Images"), ("image/svg", "Vector"), ("", "Anything")])
+
+    assert trie.longest_match("image/svg+xml") == "Vector"
+    assert trie.longest_match("image/png") == "Images"
+    assert trie.longest_match("imag") == "Anything"
+    assert _MimeTrie([("text/", "Documents")]).longest_match("video/mp4") is None
+
+
+def test_every_configured_extension_maps_to_its_category(index):
+    for category, info in FILE_CATEGORIES.items():
+        for extension in info["extensions"]:
+            assert index.category_for_extension(extension) == category
+            assert index.category_for_extension(extension.upper()) == category
+
+
+@pytest.mark.parametrize("mime_type, category", [
+    ("image/heic", "Images"),
+    ("video/mp4", "Media"),
+    ("audio/flac", "Media"),
+    ("text/x-log", "Documents"),
+    ("application/pdf", "Documents"),
+    ("application/x-zip", "Archives"),
+    ("application/x-7z-compressed", "Archives"),
+    ("APPLICATION/JSON", "Data"),
+    ("application/octet-stream", None),
+])
+def test_mime_fallbacks(index, mime_type, category):
+    assert index.category_for_mime(mime_type) == category
+
+
+def test_classify_prefers_the_extension(index):
+    assert index.classify(".csv", "text/plain") == "Data"
+    assert index.classify(".unknown", "image/png") == "Images"
+    assert index.classify(".unknown", "application/octet-stream") == DEFAULT_CATEGORY
+    assert index.classify("") == DEFAULT_CATEGORY
+
+
+def test_custom_mime_rules_and_dotless_extensions():
+    index = ClassificationIndex({
+        "Ebooks": {"extensions": ["EPUB", ".mobi"], "mime_prefixes": ["application/epub"],
+                   "mime_suffixes": ["mobipocket-ebook"]},
+    })
+
+    assert index.category_for_extension(".epub") == "Ebooks"
+    assert index.category_for_mime("application/epub+zip") == "Ebooks"
+    assert index.category_for_mime("application/x-mobipocket-ebook") == "Ebooks"
+
+
+def test_index_is_read_only(index):
+    with pytest.raises(TypeError):
+        index.extensions[".new"] = "Other"
+
+
+def test_user_categories_file_extends_the_defaults(tmp_path):
+    categories_file = tmp_path / "categories.json"
+    categories_file.write_text(json.dumps({
+        "Documents": {"extensions": [".md"]},
+        "Fonts": {"extensions": [".ttf", ".otf"], "description": "Font files"},
+    }))
+
+    index = ClassificationIndex.from_config(categories_file)
+
+    assert index.category_for_extension(".md") == "Documents"
+    assert index.category_for_extension(".pdf") == "Documents"
+    assert index.category_for_extension(".otf") == "Fonts"
+    assert index.categories["Fonts"]["description"] == "Font files"
+
+
+def test_user_categories_file_must_be_an_object(tmp_path):
+    categories_file = tmp_path / "categories.json"
+    categories_file.write_text("[]")
+
+    with pytest.raises(ValueError):
+        ClassificationIndex.from_config(categories_file)
@@ -0,0 +1,161 @@
+import os
+
+import pytest
+
+from utils import dedup
+from utils.dedup import DuplicateDetector, find_duplicate_groups, sketch_similarity, text_sketch
+
+BLOCK = 16
+
+
+@pytest.fixture
+def full_hashes(monkeypatch):
+    """Paths given a full content hash, in call order."""
+    calls = []
+    real_hash_file = dedup.hash_file
+
+    def hash_file(file_path):
+        calls.append(file_path.name)
+        return real_hash_file(file_path)
+
+    monkeypatch.setattr(dedup, "hash_file", hash_file)
+    return calls
+
+
+def _write(directory, name, content):
+    path = directory / name
+    path.write_bytes(content)
+    return path
+
+
+def _register(detector, path, analysis=None):
+    return detector.add(path, os.stat(path), analysis)
+
+
+def _find(detector, path):
+    return detector.find(path, os.stat(path))
+
+
+def test_identical_file_matches_its_original(tmp_path, full_hashes):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    content = b"head" + b"x" * 100 + b"tail"
+    original = _write(tmp_path, "original.bin", content)
+    _register(detector, original, {"category": "Data"})
+
+    match = _find(detector, _write(tmp_path, "copy.bin", content))
+
+    assert match.exact and match.record.path == str(original) and match.record.analysis == {"category": "Data"}
+    assert sorted(full_hashes) == ["copy.bin", "original.bin"]
+    assert detector.stats()["exact_matches"] == 1
+
+
+def test_same_size_different_content_does_not_match(tmp_path, full_hashes):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    _register(detector, _write(tmp_path, "a.bin", b"a" * 200))
+
+    assert _find(detector, _write(tmp_path, "b.bin", b"b" * 200)) is None
+    # The head/tail hashes already differ
+    assert full_hashes == []
+
+
+def test_different_middle_is_caught_by_the_full_hash(tmp_path, full_hashes):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    _register(detector, _write(tmp_path, "a.bin", b"h" * BLOCK + b"1" * 100 + b"t" * BLOCK))
+
+    assert _find(detector, _write(tmp_path, "b.bin", b"h" * BLOCK + b"2" * 100 + b"t" * BLOCK)) is None
+    assert sorted(full_hashes) == ["a.bin", "b.bin"]
+
+
+def test_small_files_need_no_full_hash(tmp_path, full_hashes):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    _register(detector, _write(tmp_path, "a.txt", b"short"))
+
+    assert _find(detector, _write(tmp_path, "b.txt", b"short")).exact
+    assert full_hashes == []
+
+
+def test_empty_files_are_never_duplicates(tmp_path):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    _register(detector, _write(tmp_path, "a.txt", b""))
+
+    assert _find(detector, _write(tmp_path, "b.txt", b"")) is None
+
+
+def test_settled_original_is_found_at_its_new_path(tmp_path):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    original = _write(tmp_path, "report.pdf", b"pdf" * 50)
+    _register(detector, original)
+    sorted_dir = tmp_path / "Documents"
+    sorted_dir.mkdir()
+    moved = sorted_dir / "report.pdf"
+    original.rename(moved)
+
+    detector.settle(original, moved, {"location": "Documents"})
+    match = _find(detector, _write(tmp_path, "report (1).pdf", b"pdf" * 50))
+
+    assert match.record.path == str(moved) and match.record.verdict == {"location": "Documents"}
+    assert detector.get(original) is None and detector.get(moved) is match.record
+
+
+def test_vanished_original_is_forgotten(tmp_path):
+    detector = DuplicateDetector(partial_bytes=BLOCK)
+    original = _write(tmp_path, "a.bin", b"x" * 50)
+    _register(detector, original)
+    original.unlink()
+
+    assert _find(detector, _write(tmp_path, "b.bin", b"x" * 50)) is None
+    assert detector.stats()["entries"] == 0
+
+
+def test_oldest_records_are_evicted(tmp_path):
+    detector = DuplicateDetector(partial_bytes=BLOCK, max_entries=2)
+    paths = [_write(tmp_path, f"{name}.bin", name.encode() * 10) for name in "abc"]
+    for path in paths:
+        _register(detector, path)
+
+    assert [detector.get(path) is not None for path in paths] == [False, True, True]
+
+
+_TEXT = " ".join(f"word{index}" for index in range(300))
+
+
+def test_near_duplicate_text_files_match_by_sketch(tmp_path):
+    detector = DuplicateDetector(partial_bytes=BLOCK, near_duplicates=True, near_threshold=0.8)
+    original = _write(tmp_path, "notes.txt", _TEXT.encode())
+    _register(detector, original)
+
+    match = _find(detector, _write(tmp_path, "notes-edited.txt", (_TEXT + " one more line").encode()))
+
+    assert not match.exact and 0.8 <= match.similarity < 1.0
+    assert match.record.path == str(original)
+    assert detector.stats()["near_matches"] == 1
+
+
+def test_dissimilar_or_non_text_files_are_not_near_duplicates(tmp_path):
+    detector = DuplicateDetector(partial_bytes=BLOCK, near_duplicates=True, near_threshold=0.8)
+    _register(detector, _write(tmp_path, "notes.txt", _TEXT.encode()))
+    _register(detector, _write(tmp_path, "notes.bin", _TEXT.encode() + b"!"))
+
+    other = " ".join(f"term{index}" for index in range(300))
+    assert _find(detector, _write(tmp_path, "other.txt", other.encode())) is None
+    assert _find(detector, _write(tmp_path, "copy.bin", _TEXT.encode() + b"?")) is None
+
+
+def test_sketch_similarity_estimates_jaccard(tmp_path):
+    path = _write(tmp_path, "a.txt", _TEXT.encode())
+    sketch = text_sketch(path)
+
+    assert sketch_similarity(sketch, sketch) == 1.0
+    assert sketch_similarity(sketch, ()) == 0.0
+    assert sketch_similarity(sketch, text_sketch(_write(tmp_path, "b.txt", b"nothing alike at all"))) == 0.0
+
+
+def test_find_duplicate_groups(tmp_path):
+    a = _write(tmp_path, "a.bin", b"h" * BLOCK + b"1" * 100 + b"t" * BLOCK)
+    b = _write(tmp_path, "b.bin", b"h" * BLOCK + b"1" * 100 + b"t" * BLOCK)
+    _write(tmp_path, "c.bin", b"h" * BLOCK + b"2" * 100 + b"t" * BLOCK)
+    _write(tmp_path, "empty1", b"")
+    _write(tmp_path, "empty2", b"")
+    os.utime(b, ns=(1, 1))
+
+    assert find_duplicate_groups(sorted(tmp_path.iterdir()), partial_bytes=BLOCK) == [[b, a]]
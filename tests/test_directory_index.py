@@ -0,0 +1,152 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.directory_index import DirectoryIndex
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "downloads"
+    folder.mkdir()
+    return folder
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "index.sqlite3"
+
+
+def _write(path, size=1):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def _paths(entries):
+    return sorted(entry.path for entry in entries)
+
+
+def test_reconcile_indexes_top_level_files(folder, db_path):
+    pdf = _write(folder / "report.pdf", 100)
+    _write(folder / "nested" / "deep.txt")
+    index = DirectoryIndex([folder], db_path)
+
+    changes = index.reconcile()
+
+    assert _paths(changes.added) == [str(pdf)]
+    assert len(index) == 1 and pdf in index
+    entry = index.get(pdf)
+    assert (entry.extension, entry.category, entry.size) == (".pdf", "Documents", 100)
+    index.close()
+
+
+def test_recursive_reconcile_skips_hidden_and_excluded_folders(folder, db_path):
+    deep = _write(folder / "nested" / "deep.txt")
+    _write(folder / ".git" / "HEAD")
+    _write(folder / "logs" / "file_organizer.log")
+    index = DirectoryIndex([folder], db_path, recursive=True, excluded=[folder / "logs"])
+
+    index.reconcile()
+
+    assert _paths(index.query()) == [str(deep)]
+    index.record(folder / "logs" / "file_organizer.log")
+    assert not index.sync()
+    index.close()
+
+
+def test_sync_replays_only_journaled_paths(folder, db_path):
+    kept = _write(folder / "kept.txt")
+    removed = _write(folder / "removed.txt")
+    index = DirectoryIndex([folder], db_path)
+    index.reconcile()
+    version = index.version
+
+    added = _write(folder / "added.txt")
+    unrecorded = _write(folder / "unrecorded.txt")
+    removed.unlink()
+    _write(kept, 10)
+    index.record(added, removed, kept, folder / "elsewhere" / "ignored.txt")
+    assert index.pending == 4
+
+    changes = index.sync()
+
+    assert _paths(changes.added) == [str(added)]
+    assert _paths(changes.updated) == [str(kept)]
+    assert changes.removed == [str(removed)]
+    assert index.pending == 0 and index.version > version
+    assert unrecorded not in index
+    assert not index.sync()
+    index.close()
+
+
+def test_reconcile_after_restart_finds_offline_changes(folder, db_path):
+    kept = _write(folder / "kept.txt")
+    removed = _write(folder / "removed.txt")
+    index = DirectoryIndex([folder], db_path)
+    index.reconcile()
+    index.close()
+
+    removed.unlink()
+    added = _write(folder / "added.txt")
+    # Make sure the directory mtime differs even on coarse-grained filesystems
+    stat = os.stat(folder)
+    os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    index = DirectoryIndex([folder], db_path)
+    assert _paths(index.query()) == [str(kept), str(removed)]
+    changes = index.reconcile()
+
+    assert _paths(changes.added) == [str(added)]
+    assert changes.removed == [str(removed)]
+    assert _paths(index.query()) == [str(added), str(kept)]
+    index.close()
+
+
+def test_reconcile_skips_unchanged_directories(folder, db_path):
+    _write(folder / "a.txt")
+    index = DirectoryIndex([folder], db_path)
+    index.reconcile()
+
+    assert not index.reconcile()
+    index.close()
+
+
+def test_query_filters(folder):
+    small = _write(folder / "small.txt", 10)
+    large = _write(folder / "large.pdf", 5000)
+    image = _write(folder / "photo.PNG", 500)
+    old = time.time() - 30 * 24 * 3600
+    os.utime(image, (old, old))
+    index = DirectoryIndex([folder], db_path=None)
+    index.reconcile()
+
+    assert _paths(index.query(category="Images")) == [str(image)]
+    assert _paths(index.query(extension=".png")) == [str(image)]
+    assert _paths(index.query(min_size=100)) == [str(large), str(image)]
+    assert _paths(index.query(max_size=100)) == [str(small)]
+    assert _paths(index.query(modified_after=datetime.now() - timedelta(days=1))) == [str(large), str(small)]
+    assert _paths(index.query(modified_before=datetime.now() - timedelta(days=1))) == [str(image)]
+    assert _paths(index.query(root=folder, category="Documents")) == [str(large), str(small)]
+    assert [entry.name for entry in index.query()] == ["large.pdf", "photo.PNG", "small.txt"]
+
+
+def test_reconcile_after_restart_finds_files_edited_in_place(folder, db_path):
+    edited = _write(folder / "edited.txt", 10)
+    index = DirectoryIndex([folder], db_path, recursive=True)
+    index.reconcile()
+    index.close()
+
+    dir_stat = os.stat(folder)
+    _write(edited, 5000)
+    # Editing a file in place leaves its directory's mtime alone
+    os.utime(folder, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+    index = DirectoryIndex([folder], db_path, recursive=True)
+    changes = index.reconcile()
+
+    assert _paths(changes.updated) == [str(edited)]
+    assert _paths(index.query(min_size=1000)) == [str(edited)]
+    index.close()
@@ -0,0 +1,134 @@
+import csv
+import json
+
+import pytest
+
+from utils import extractors
+from utils.extractors import read_pdf_info, read_pdf_text, scan_csv, scan_json
+
+
+def _expected(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        records = list(csv.reader(file))
+    return {'headers': records[0], 'row_count': len(records) - 1}
+
+
+@pytest.mark.parametrize("content", [
+    'name,size\na,1\nb,2\n',
+    'name,size\na,1\nb,2',
+    'name,"notes"\na,"line one\nline two"\nb,plain\n',
+    '"first\nheader",second\na,1\nb,2\n',
+    '"first\nheader","sec""ond\n\nheader"\n"x\ny",1\nb,2\n',
+    'only,a,header\n',
+])
+def test_scan_csv_matches_csv_reader(tmp_path, content):
+    path = tmp_path / "data.csv"
+    path.write_text(content, encoding='utf-8')
+    assert scan_csv(path) == _expected(path)
+
+
+def test_scan_csv_multiline_header(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text('id,"description\n(long)",price\n1,widget,2\n2,gadget,3\n', encoding='utf-8')
+    assert scan_csv(path) == {'headers': ['id', 'description\n(long)', 'price'], 'row_count': 2}
+
+
+@pytest.mark.parametrize("document", [
+    {"a": {"b": [1, 2, {"c": "}]"}]}, "d": [], "e": "x,y"},
+    [[1, [2, 3]], {"k": [4, 5]}, "[", "\\\"", None],
+    {},
+    [],
+    [[]],
+    "text",
+    -1.5e3,
+    42,
+    True,
+    None,
+])
+def test_scan_json_counts_top_level_elements(tmp_path, document):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(document, indent=2), encoding='utf-8')
+
+    expected = {'type': type(document).__name__}
+    if isinstance(document, (dict, list)):
+        expected['elements'] = len(document)
+    assert scan_json(path) == expected
+
+
+def test_scan_json_reads_past_one_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(extractors, "READ_CHUNK", 7)
+    path = tmp_path / "data.json"
+    path.write_text('\ufeff  \n  [{"key": "a \\" ] , value"}, [1, 2], 3]', encoding='utf-8')
+
+    assert scan_json(path) == {'type': 'list', 'elements': 3}
+
+
+@pytest.mark.parametrize("content", ['{"a": [1, 2', '["unterminated', '', '   \n'])
+def test_scan_json_rejects_truncated_documents(tmp_path, content):
+    path = tmp_path / "data.json"
+    path.write_text(content, encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        scan_json(path)
+
+
+_PAGE_TEXT = b"BT /F1 12 Tf 72 720 Td (Quarterly report) Tj ET"
+_PDF_OBJECTS = [
+    b"<< /Type /Catalog /Pages 2 0 R >>",
+    b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+    b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+    b"/Resources << /Font << /F1 5 0 R >> >> >>",
+    b"<< /Length %d >>\nstream\n%s\nendstream" % (len(_PAGE_TEXT), _PAGE_TEXT),
+    b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    b"<< /Title (Q1 Report) /Author (Finance) /Keywords (budget\\, 2024) >>",
+]
+_PDF_INFO = {'pages': 1, 'title': 'Q1 Report', 'author': 'Finance', 'subject': '', 'keywords': 'budget, 2024'}
+
+
+def _build_pdf(padding=b""):
+    """A one-page PDF with a classic xref table; ``padding`` after the header leaves the object offsets stale."""
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(_PDF_OBJECTS, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(_PDF_OBJECTS) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 6 0 R >>\n" % (len(_PDF_OBJECTS) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % (xref + len(padding))
+    return bytes(out).replace(b"\n", b"\n" + padding, 1)
+
+
+def test_read_pdf_info_from_xref_table(tmp_path, monkeypatch):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(_build_pdf())
+
+    def pypdf(file_path):
+        raise AssertionError("PyPDF2 fallback used")
+
+    monkeypatch.setattr(extractors, "_read_pdf_info_pypdf", pypdf)
+    assert read_pdf_info(path) == _PDF_INFO
+
+
+def test_read_pdf_info_falls_back_when_the_page_tree_is_not_found(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(_build_pdf(padding=b"%" + b"x" * 40 + b"\n"))
+
+    assert read_pdf_info(path) == _PDF_INFO
+
+
+def test_read_pdf_text(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(_build_pdf())
+
+    assert read_pdf_text(path) == "Quarterly report"
+    assert read_pdf_text(path, max_chars=9) == "Quarterly"
+
+
+def test_read_pdf_text_of_an_unreadable_file_is_empty(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"not a pdf")
+
+    assert read_pdf_text(path) == ""
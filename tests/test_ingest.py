@@ -0,0 +1,132 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from utils.ingest import IngestPipeline
+from utils.metrics import STAGE_SECONDS
+
+
+class Gate:
+    """Processing function that records its files and blocks until opened."""
+
+    def __init__(self):
+        self.opened = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.done = []
+
+    def __call__(self, file_path):
+        self.started.release()
+        self.opened.wait(5)
+        self.done.append(file_path.name)
+        return file_path.name
+
+    def wait_started(self):
+        assert self.started.acquire(timeout=5)
+
+
+def _queue_wait():
+    """(count, sum) of the queue_wait stage so far."""
+    for sample in STAGE_SECONDS.snapshot():
+        if sample["labels"] == {"stage": "queue_wait"}:
+            return sample["count"], sample["sum"]
+    return 0, 0.0
+
+
+@pytest.fixture
+def pipeline():
+    pipelines = []
+
+    def make(**kwargs):
+        kwargs.setdefault("process", lambda path: path.name)
+        pipelines.append(IngestPipeline(**kwargs))
+        return pipelines[-1]
+
+    yield make
+    for pipeline in pipelines:
+        pipeline.stop(drain=False)
+
+
+def test_full_shard_only_blocks_its_own_submitter(pipeline):
+    busy, idle = Gate(), Gate()
+    idle.opened.set()
+    ingest = pipeline(submit_timeout=0.1)
+    ingest.add_shard("busy", busy, workers=1, max_queue=1)
+    ingest.add_shard("idle", idle, workers=1, max_queue=1)
+    ingest.start()
+
+    assert ingest.submit(Path("a1"), "busy")
+    busy.wait_started()
+    assert ingest.submit(Path("a2"), "busy")
+    start = time.monotonic()
+    assert not ingest.submit(Path("a3"), "busy")
+    assert time.monotonic() - start >= 0.1
+
+    start = time.monotonic()
+    assert ingest.submit(Path("b1"), "idle")
+    idle.wait_started()
+    assert time.monotonic() - start < 0.1
+    assert ingest.shard_depths() == {"busy": 1, "idle": 0}
+
+    busy.opened.set()
+    ingest.stop()
+    assert busy.done == ["a1", "a2"] and idle.done == ["b1"]
+
+
+def test_queued_duplicates_are_accepted_once(pipeline):
+    gate = Gate()
+    ingest = pipeline(process=gate, workers=1)
+    ingest.start()
+    ingest.submit(Path("first"))
+    gate.wait_started()
+
+    assert ingest.submit(Path("second")) and ingest.submit(Path("second"))
+    assert ingest.depth == 1
+    gate.opened.set()
+    ingest.stop()
+    assert gate.done == ["first", "second"]
+
+
+@pytest.mark.parametrize("drain", [True, False])
+def test_stop_drains_or_discards_queued_files(pipeline, drain):
+    gate = Gate()
+    results = []
+    ingest = pipeline(process=gate, workers=1, on_result=lambda path, result: results.append(result))
+    ingest.start()
+    for name in ["a", "b", "c"]:
+        ingest.submit(Path(name))
+    gate.wait_started()
+
+    stopper = threading.Thread(target=lambda: results.append(ingest.stop(drain=drain)))
+    stopper.start()
+    time.sleep(0.05)
+    gate.opened.set()
+    stopper.join(5)
+
+    if drain:
+        assert results == ["a", "b", "c", 0]
+    else:
+        assert results == ["a", 2]
+    assert ingest.depth == 0 and not ingest.submit(Path("d"))
+
+
+def test_queue_wait_is_recorded_per_file(pipeline):
+    gate = Gate()
+    depths = []
+    ingest = pipeline(process=gate, workers=1, on_depth=lambda queued, active: depths.append((queued, active)))
+    ingest.start()
+    count, total = _queue_wait()
+
+    ingest.submit(Path("a"))
+    gate.wait_started()
+    ingest.submit(Path("b"))
+    time.sleep(0.1)
+    gate.opened.set()
+    ingest.stop()
+
+    new_count, new_total = _queue_wait()
+    assert new_count - count == 2
+    # "b" waited for "a" to finish
+    assert new_total - total >= 0.1
+    assert (1, 1) in depths and depths[-1] == (0, 0)
@@ -0,0 +1,111 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from agents.local_server import STREAM_CHUNK, LocalChatServer
+
+ANSWER = "The answer is " + "forty-two " * 5
+
+
+@pytest.fixture(scope="module")
+def running_server():
+    # Shared by the module: stopping waits for the serve_forever poll interval
+    server = LocalChatServer(port=0, responder=lambda messages: ANSWER, models=["small", "large"])
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def server(running_server):
+    running_server.requests.clear()
+    return running_server
+
+
+def _request(server, path, body=None):
+    url = server.base_url[:-len("/v1")] + path
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, response.headers["Content-Type"], response.read().decode("utf-8")
+
+
+def _error(server, path, body=None):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _request(server, path, body)
+    return error.value.code, json.loads(error.value.read())["error"]["message"]
+
+
+def test_binds_an_ephemeral_port(server):
+    host, port = server.address
+    assert host == "127.0.0.1" and port > 0
+    assert server.base_url == f"http://127.0.0.1:{port}/v1"
+
+
+def test_lists_models(server):
+    status, _, body = _request(server, "/v1/models")
+
+    assert status == 200
+    assert [model["id"] for model in json.loads(body)["data"]] == ["small", "large"]
+
+
+def test_completion(server):
+    status, content_type, body = _request(server, "/v1/chat/completions", {
+        "model": "large", "messages": [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "Hi"}]
+    })
+
+    completion = json.loads(body)
+    assert status == 200 and content_type == "application/json"
+    assert completion["object"] == "chat.completion" and completion["model"] == "large"
+    assert completion["choices"][0]["message"] == {"role": "assistant", "content": ANSWER}
+    assert completion["choices"][0]["finish_reason"] == "stop"
+    usage = completion["usage"]
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"] > 0
+    assert server.requests == {"large": 1}
+
+
+def test_streamed_completion_ends_with_done(server):
+    status, content_type, body = _request(server, "/v1/chat/completions", {
+        "model": "small", "stream": True, "messages": [{"role": "user", "content": "Hi"}]
+    })
+
+    assert status == 200 and content_type == "text/event-stream"
+    events = [line[len("data: "):] for line in body.split("\n\n") if line]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert len({chunk["id"] for chunk in chunks}) == 1
+    assert chunks[0]["choices"][0]["delta"]["role"] == "assistant"
+    assert chunks[-1]["choices"][0] == {"index": 0, "delta": {}, "finish_reason": "stop"}
+    pieces = [chunk["choices"][0]["delta"].get("content", "") for chunk in chunks]
+    assert "".join(pieces) == ANSWER
+    assert max(len(piece) for piece in pieces) == STREAM_CHUNK
+
+
+def test_default_model_is_the_first_listed(server):
+    _request(server, "/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]})
+
+    assert server.requests == {"small": 1}
+
+
+@pytest.mark.parametrize("body", [{"model": "small"}, {"messages": []}, {"messages": ["not an object"]}, [1, 2]])
+def test_invalid_requests_are_rejected(server, body):
+    assert _error(server, "/v1/chat/completions", body)[0] == 400
+
+
+def test_unknown_paths_are_not_found(server):
+    assert _error(server, "/v1/embeddings", {"input": "x"})[0] == 404
+    assert _error(server, "/v2/models")[0] == 404
+
+
+def test_openai_client_can_talk_to_it(server):
+    openai = pytest.importorskip("openai")
+    client = openai.OpenAI(base_url=server.base_url, api_key="not-needed")
+    messages = [{"role": "user", "content": "Hi"}]
+
+    completion = client.chat.completions.create(model="small", messages=messages)
+    stream = client.chat.completions.create(model="small", messages=messages, stream=True)
+
+    assert completion.choices[0].message.content == ANSWER
+    assert "".join(chunk.choices[0].delta.content or "" for chunk in stream) == ANSWER
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import time
+
+import pytest
+
+from config import LOG_FILE
+from utils.logger import JsonFormatter, RotatingLogFileHandler, log_context, setup_logger, shutdown_logging
+
+
+def _log_lines(marker):
+    """JSON records in the log file whose message contains ``marker``."""
+    shutdown_logging()
+    with open(LOG_FILE, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return [record for record in records if marker in record["message"]]
+
+
+def test_repeated_setup_adds_no_handlers():
+    logger = setup_logger("tests.repeat")
+    setup_logger("tests.repeat")
+    child = setup_logger("tests.repeat.child")
+
+    assert len(logger.handlers) == 1 and child.handlers == []
+    child.info("repeat-marker once")
+    assert len(_log_lines("repeat-marker")) == 1
+
+
+def test_records_carry_the_correlation_id_and_extra_fields():
+    logger = setup_logger("tests.context")
+
+    logger.info("context-marker outside")
+    with log_context("abc123") as correlation_id:
+        logger.info("context-marker %s", "inside", extra={"operation": "move"})
+        with log_context():
+            logger.info("context-marker nested")
+
+    outside, inside, nested = _log_lines("context-marker")
+    assert correlation_id == "abc123"
+    assert "correlation_id" not in outside
+    assert inside["message"] == "context-marker inside"
+    assert (inside["correlation_id"], inside["operation"], inside["logger"]) == ("abc123", "move", "tests.context")
+    assert nested["correlation_id"] not in (None, "abc123")
+
+
+def test_shutdown_writes_out_every_queued_record():
+    logger = setup_logger("tests.flush")
+
+    for index in range(2000):
+        logger.info("flush-marker %d", index)
+
+    assert [record["message"] for record in _log_lines("flush-marker")] == [
+        f"flush-marker {index}" for index in range(2000)]
+
+
+def test_logging_resumes_after_shutdown():
+    logger = setup_logger("tests.resume")
+    shutdown_logging()
+
+    setup_logger("tests.resume").info("resume-marker")
+    assert len(_log_lines("resume-marker")) == 1 and len(logger.handlers) == 1
+
+
+@pytest.fixture
+def file_logger():
+    loggers = []
+
+    def make(handler):
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger(f"tests.rotation.{len(loggers)}.{id(handler)}")
+        logger.propagate = False
+        logger.addHandler(handler)
+        loggers.append((logger, handler))
+        return logger
+
+    yield make
+    for logger, handler in loggers:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_rotation_by_size(tmp_path, file_logger):
+    path = tmp_path / "app.log"
+    logger = file_logger(RotatingLogFileHandler(path, max_bytes=500, interval=0, backup_count=2))
+
+    for index in range(50):
+        logger.warning("size %d", index)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["app.log", "app.log.1", "app.log.2"]
+    assert all(p.stat().st_size <= 500 for p in tmp_path.iterdir())
+
+
+def test_rotation_by_interval(tmp_path, file_logger):
+    path = tmp_path / "app.log"
+    logger = file_logger(RotatingLogFileHandler(path, max_bytes=0, interval=0.05))
+
+    logger.warning("first")
+    time.sleep(0.1)
+    logger.warning("second")
+
+    assert json.loads((tmp_path / "app.log.1").read_text())["message"] == "first"
+    assert json.loads(path.read_text())["message"] == "second"
+
+
+def test_interval_counts_from_the_age_of_an_existing_file(tmp_path, file_logger):
+    path = tmp_path / "app.log"
+    path.write_text('{"message": "yesterday"}\n')
+    day_ago = time.time() - 24 * 3600
+    os.utime(path, (day_ago, day_ago))
+    logger = file_logger(RotatingLogFileHandler(path, max_bytes=0, interval=3600))
+
+    logger.warning("today")
+
+    assert json.loads((tmp_path / "app.log.1").read_text())["message"] == "yesterday"
+    assert json.loads(path.read_text())["message"] == "today"
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+
+from utils.move_executor import MoveExecutor, read_journal, unique_name
+
+
+@pytest.fixture
+def executor(tmp_path):
+    return MoveExecutor(journal_dir=tmp_path / "journals", workers=2)
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    return inbox
+
+
+def _write(path, text=""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text or path.name)
+    return path
+
+
+def _interrupted_journal(executor, operations):
+    """A journal of a run that planned ``operations`` and died before recording any move."""
+    executor.journal_dir.mkdir(parents=True, exist_ok=True)
+    journal_path = executor.journal_dir / "interrupted.jsonl"
+    with open(journal_path, "w", encoding="utf-8") as file:
+        file.write(json.dumps({"type": "start"}) + "\n")
+        for op in operations:
+            file.write(json.dumps({"type": "plan", "op": op.op_id, "source": str(op.source),
+                                   "destination": str(op.destination), "same_device": op.same_device}) + "\n")
+    return journal_path
+
+
+def test_unique_name():
+    assert unique_name("a.txt", set()) == "a.txt"
+    assert unique_name("a.txt", {"a.txt", "a_1.txt"}) == "a_2.txt"
+
+
+def test_plan_settles_collisions(executor, inbox, tmp_path):
+    target = tmp_path / "sorted"
+    _write(target / "report.pdf", "already sorted")
+    first = _write(inbox / "report.pdf")
+    second = _write(inbox / "nested" / "report.pdf")
+    stays = _write(inbox / "notes.txt")
+
+    operations = executor.plan([(first, target / "report.pdf"), (second, target / "report.pdf"),
+                                (stays, stays)])
+
+    assert [op.destination.name for op in operations] == ["report_1.pdf", "report_2.pdf"]
+    assert all(op.same_device for op in operations)
+
+
+def test_execute_moves_and_journals(executor, inbox, tmp_path):
+    sources = [_write(inbox / f"file{i}.txt") for i in range(5)]
+    operations = executor.plan([(source, tmp_path / "sorted" / "Documents" / source.name) for source in sources])
+
+    results = executor.execute(operations)
+
+    assert len(results["successful_moves"]) == 5 and not results["failed_moves"]
+    assert all(not source.exists() for source in sources)
+    assert sorted(path.name for path in (tmp_path / "sorted" / "Documents").iterdir()) == \
+        [source.name for source in sources]
+    state = read_journal(results["journal"])
+    assert state["complete"] and state["done"] == set(range(5))
+    assert executor.interrupted() == []
+
+
+def test_missing_source_fails_on_a_fresh_run(executor, inbox, tmp_path):
+    source = _write(inbox / "report.pdf")
+    destination = tmp_path / "sorted" / "report.pdf"
+    operations = executor.plan([(source, destination)])
+    # Someone else moves the file away and an unrelated file takes the name
+    source.unlink()
+    _write(destination, "someone else's file")
+
+    results = executor.execute(operations)
+
+    assert not results["successful_moves"]
+    assert results["failed_moves"][0]["error"] == "Source file does not exist"
+    assert destination.read_text() == "someone else's file"
+
+
+def test_destination_appearing_after_planning_is_not_overwritten(executor, inbox, tmp_path):
+    source = _write(inbox / "report.pdf", "incoming")
+    destination = tmp_path / "sorted" / "report.pdf"
+    operations = executor.plan([(source, destination)])
+    _write(destination, "appeared meanwhile")
+
+    results = executor.execute(operations)
+
+    assert len(results["failed_moves"]) == 1
+    assert source.read_text() == "incoming"
+    assert destination.read_text() == "appeared meanwhile"
+
+
+def test_undo_restores_files_and_removes_created_folders(executor, inbox, tmp_path):
+    sources = [_write(inbox / "a.txt"), _write(inbox / "b.txt")]
+    target = tmp_path / "sorted" / "Documents" / "2024"
+    results = executor.execute(executor.plan([(source, target / source.name) for source in sources]))
+
+    undone = executor.undo(results["journal"])
+
+    assert len(undone["restored"]) == 2 and not undone["failed"]
+    assert all(source.exists() for source in sources)
+    assert not (tmp_path / "sorted").exists()
+    assert read_journal(results["journal"])["rolled_back"]
+    assert executor.last_journal() is None
+
+
+def test_undo_does_not_overwrite_a_recreated_source(executor, inbox, tmp_path):
+    source = _write(inbox / "a.txt", "original")
+    results = executor.execute(executor.plan([(source, tmp_path / "sorted" / "a.txt")]))
+    _write(source, "new download")
+
+    undone = executor.undo(results["journal"])
+
+    assert len(undone["failed"]) == 1
+    assert source.read_text() == "new download"
+    assert (tmp_path / "sorted" / "a.txt").read_text() == "original"
+    assert not read_journal(results["journal"])["rolled_back"]
+
+
+def test_resume_finishes_an_interrupted_run(executor, inbox, tmp_path):
+    moved = _write(inbox / "moved.txt")
+    pending = _write(inbox / "pending.txt")
+    target = tmp_path / "sorted"
+    target.mkdir()
+    operations = executor.plan([(moved, target / "moved.txt"), (pending, target / "pending.txt")])
+    journal_path = _interrupted_journal(executor, operations)
+    # The first move happened but the crash came before it was journaled
+    moved.rename(target / "moved.txt")
+    assert executor.interrupted() == [journal_path]
+
+    results = executor.resume(journal_path)
+
+    assert sorted(entry["source"] for entry in results["successful_moves"]) == [str(moved), str(pending)]
+    assert (target / "pending.txt").exists() and not pending.exists()
+    state = read_journal(journal_path)
+    assert state["complete"] and state["done"] == {0, 1}
+    assert executor.interrupted() == []
+
+
+def test_undo_of_an_interrupted_run_restores_unjournaled_moves(executor, inbox, tmp_path):
+    moved = _write(inbox / "moved.txt")
+    untouched = _write(inbox / "untouched.txt")
+    target = tmp_path / "sorted"
+    target.mkdir()
+    operations = executor.plan([(moved, target / "moved.txt"), (untouched, target / "untouched.txt")])
+    journal_path = _interrupted_journal(executor, operations)
+    moved.rename(target / "moved.txt")
+
+    undone = executor.undo(journal_path)
+
+    assert [entry["destination"] for entry in undone["restored"]] == [str(moved)]
+    assert moved.exists() and untouched.exists()
+
+
+def test_execute_stream(executor, inbox, tmp_path):
+    sources = [_write(inbox / "same.txt"), _write(inbox / "nested" / "same.txt")]
+    progress = []
+
+    results = executor.execute_stream(((source, tmp_path / "sorted" / "same.txt") for source in sources),
+                                      on_progress=lambda op, error: progress.append(error))
+
+    assert sorted((tmp_path / "sorted").iterdir()) == [tmp_path / "sorted" / "same.txt",
+                                                       tmp_path / "sorted" / "same_1.txt"]
+    assert progress == [None, None] and "error" not in results
+    assert read_journal(results["journal"])["complete"]
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from agents.plan_parser import PlanEntry, PlanStreamParser, merge_streams, validate_entry
+
+
+def _feed_in_pieces(parser, text, size):
+    entries = []
+    for start in range(0, len(text), size):
+        entries.extend(parser.feed(text[start:start + size]))
+    parser.close()
+    return entries
+
+
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+def test_entries_stream_as_they_complete(size):
+    plan = {"moves": [{"id": 1, "folder": "Work/Reports"}, {"id": 2, "folder": "Photos {2024}"}],
+            "notes": "grouped by \"project\""}
+    parser = PlanStreamParser([1, 2])
+
+    entries = _feed_in_pieces(parser, "Here is the plan:\n```json\n" + json.dumps(plan) + "\n```", size)
+
+    assert entries == [PlanEntry(1, "Work/Reports"), PlanEntry(2, "Photos {2024}")]
+    assert parser.complete and parser.notes == 'grouped by "project"'
+    assert parser.pending() == {}
+
+
+def test_entry_is_returned_before_the_response_ends():
+    parser = PlanStreamParser([1, 2])
+
+    assert parser.feed('{"moves": [{"id": 1, "folder": "Docs"}') == [PlanEntry(1, "Docs")]
+    assert parser.feed(', {"id": 2, "fol') == []
+    assert parser.feed('der": "Music"}]}') == [PlanEntry(2, "Music")]
+
+
+def test_invalid_entries_are_kept_for_a_reask():
+    parser = PlanStreamParser([1, 2, 3, 4])
+    text = json.dumps({"moves": [
+        {"id": 1, "folder": "Docs"},
+        {"id": 1, "folder": "Again"},
+        {"id": 2, "folder": "../.."},
+        {"id": 9, "folder": "Unknown"},
+        {"id": "3", "folder": " Music / Live "},
+    ]})
+
+    entries = _feed_in_pieces(parser, text, 5)
+
+    assert entries == [PlanEntry(1, "Docs"), PlanEntry(3, "Music/Live")]
+    assert parser.pending() == {2: "\"folder\" must be a non-empty relative path", 4: "missing from the plan"}
+    assert parser.errors[9] == "unknown id 9"
+
+
+def test_truncated_response_leaves_ids_pending():
+    parser = PlanStreamParser([1, 2])
+
+    entries = _feed_in_pieces(parser, '{"moves": [{"id": 1, "folder": "Docs"}, {"id": 2, "fo', 4)
+
+    assert entries == [PlanEntry(1, "Docs")]
+    assert not parser.complete
+    assert parser.pending() == {2: "missing from the plan"}
+    assert "cut off" in parser.errors[None]
+
+
+def test_text_after_the_plan_is_ignored():
+    parser = PlanStreamParser([1])
+
+    parser.feed('{"moves": [{"id": 1, "folder": "Docs"}]} and also {"id": 1, "folder": "Other"}')
+
+    assert parser.assigned == {1} and not parser.errors
+
+
+@pytest.mark.parametrize("entry, message", [
+    ([1, "Docs"], "entry must be an object"),
+    ({"id": True, "folder": "Docs"}, "\"id\" must be an integer"),
+    ({"id": 1}, "\"folder\" must be a non-empty relative path"),
+])
+def test_validate_entry_errors(entry, message):
+    with pytest.raises(ValueError, match=message):
+        validate_entry(entry, {1}, set())
+
+
+def test_merge_streams_yields_everything_and_reraises():
+    def failing():
+        yield "x"
+        raise RuntimeError("stream failed")
+
+    assert sorted(merge_streams([iter([1, 2]), iter([3]), iter([4, 5])], workers=2)) == [1, 2, 3, 4, 5]
+    assert list(merge_streams([iter([1]), iter([2])], workers=1)) == [1, 2]
+    with pytest.raises(RuntimeError, match="stream failed"):
+        list(merge_streams([iter([1]), failing()], workers=2))
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import re
+
+from agents.async_agent import AsyncFileManagementAgent
+from agents.fake_chat import FakeChatModel
+from agents.file_agent import FileManagementAgent
+from agents.planner import OrganizationPlanner
+
+FILES = [
+    {"path": f"/inbox/{name}", "name": name, "category": category, "size": 10, "modified": "2024-01-01"}
+    for name, category in [("q1.xlsx", "Spreadsheets"), ("q2.xlsx", "Spreadsheets"),
+                           ("cat.jpg", "Images"), ("notes.txt", "Documents")]
+]
+
+_ROW_ID = re.compile(r"^\s*(\d+)\|", re.MULTILINE)
+
+
+def _agent(responder, **kwargs):
+    agent = FileManagementAgent(chat=FakeChatModel(responder, **kwargs))
+    agent.planner = OrganizationPlanner(agent, workers=1)
+    return agent
+
+
+def _reasking_responder(prompts):
+    """Wrap the plan in prose and get id 1 wrong the first time; answer re-asks correctly."""
+    def respond(messages):
+        prompt = messages[-1].content
+        prompts.append(prompt)
+        ids = [int(row_id) for row_id in _ROW_ID.findall(prompt)]
+        if prompt.startswith("Some entries"):
+            moves = [{"id": row_id, "folder": "Finance"} for row_id in ids]
+        else:
+            moves = [{"id": 0, "folder": "Finance/"}, {"id": 1, "folder": "../"},
+                     {"id": 2, "folder": "Pets"}, {"id": 42, "folder": "Elsewhere"}]
+        return "Sure! Here is the plan:\n" + json.dumps({"moves": moves, "notes": "by project"}) + "\nDone."
+    return respond
+
+
+def test_plan_reasks_only_invalid_and_missing_ids():
+    prompts = []
+    plan = _agent(_reasking_responder(prompts)).suggest_organization(FILES)["plan"]
+
+    assert plan["moves"] == {
+        "/inbox/q1.xlsx": "Finance/q1.xlsx",
+        "/inbox/q2.xlsx": "Finance/q2.xlsx",
+        "/inbox/cat.jpg": "Pets/cat.jpg",
+        "/inbox/notes.txt": "Finance/notes.txt",
+    }
+    assert len(prompts) == 2
+    assert sorted(map(int, _ROW_ID.findall(prompts[1]))) == [1, 3]
+    assert plan["notes"] == ["by project"]
+
+
+def test_files_without_a_valid_entry_go_to_their_category():
+    agent = _agent(lambda messages: '{"folders": {"Finance": [0, 1]}}')
+
+    plan = agent.suggest_organization(FILES)["plan"]
+
+    assert agent.chat_for("plan").calls == 3
+    assert plan["moves"]["/inbox/q1.xlsx"] == "Spreadsheets/q1.xlsx"
+    assert plan["moves"]["/inbox/cat.jpg"] == "Images/cat.jpg"
+
+
+def test_folders_differing_in_case_are_merged():
+    agent = _agent(lambda messages: json.dumps({"moves": [
+        {"id": 0, "folder": "Work Files"}, {"id": 1, "folder": "work  files"},
+        {"id": 2, "folder": "Pets"}, {"id": 3, "folder": "WORK FILES/"}]}))
+    agent.planner.max_chunk_tokens = 1
+
+    plan = agent.suggest_organization(FILES)["plan"]
+
+    assert plan["chunks"] == 4
+    assert set(plan["folders"]) == {"Work Files", "Pets"}
+    assert len(plan["folders"]["Work Files"]) == 3
+
+
+def test_async_plan_matches_the_sync_plan():
+    sync_prompts, async_prompts = [], []
+    sync_plan = _agent(_reasking_responder(sync_prompts)).suggest_organization(FILES)["plan"]
+    agent = AsyncFileManagementAgent(_agent(_reasking_responder(async_prompts)), rate_limit=0)
+
+    async_plan = asyncio.run(agent.asuggest_organization(FILES))["plan"]
+
+    assert async_plan == sync_plan
+    assert async_prompts == sync_prompts
@@ -0,0 +1,118 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agents import response_cache
+from agents.response_cache import ResponseCache, make_cache_key
+
+
+def _messages(*contents):
+    return [SimpleNamespace(type="human", content=content) for content in contents]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    yield cache
+    cache.close()
+
+
+def test_keys_ignore_prompt_indentation():
+    indented = make_cache_key(_messages("Classify:\n        report.pdf\n\n"), "model", 0.0)
+    flat = make_cache_key(_messages("Classify:\nreport.pdf"), "model", 0.0)
+
+    assert indented == flat
+    assert flat != make_cache_key(_messages("Classify:\nreport.pdf"), "other-model", 0.0)
+    assert flat != make_cache_key(_messages("Classify:\nphoto.jpg"), "model", 0.0)
+
+
+def test_get_or_call_hits_after_a_miss(cache):
+    calls = []
+    key = make_cache_key(_messages("hello"), "model", 0.0)
+
+    assert cache.get_or_call(key, lambda: calls.append(1) or "hi") == "hi"
+    assert cache.get_or_call(key, lambda: calls.append(1) or "other") == "hi"
+    assert calls == [1]
+    assert cache.stats() == {"hits": 1, "misses": 1, "deduplicated": 0, "entries": 1}
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", ttl=0.05)
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+
+    time.sleep(0.1)
+
+    assert cache.get("key") is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_from_memory():
+    cache = ResponseCache(db_path=None, max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+
+
+def test_concurrent_callers_share_one_call(cache):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "shared"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_call("key", call)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_call("key", call)))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while cache.stats()["deduplicated"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert results == ["shared"] * 4 and calls == [1]
+
+
+def test_failed_calls_are_not_cached(cache):
+    def call():
+        raise TimeoutError("model timed out")
+
+    with pytest.raises(TimeoutError):
+        cache.get_or_call("key", call)
+    assert cache.get("key") is None
+
+
+def test_responses_persist_across_instances(tmp_path):
+    first = ResponseCache(tmp_path / "responses.sqlite3")
+    first.put("key", "value")
+    first.close()
+
+    second = ResponseCache(tmp_path / "responses.sqlite3")
+    assert second.get("key") == "value"
+    second.close()
+
+
+def test_persisted_table_is_trimmed_to_max_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "_EVICT_EVERY", 2)
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_entries=2)
+    for index in range(5):
+        cache.put(f"key{index}", str(index))
+        time.sleep(0.01)
+    cache.close()
+
+    reopened = ResponseCache(tmp_path / "responses.sqlite3", max_entries=2)
+    assert [reopened.get(f"key{index}") for index in range(5)] == [None, None, None, "3", "4"]
+    reopened.close()
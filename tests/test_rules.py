@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from utils.rules import Rule, RuleEngine
+
+
+def _file(name, mime_type="application/octet-stream", size=100, path=None):
+    return {"name": name, "path": path or f"/inbox/{name}", "mime_type": mime_type, "size": size}
+
+
+def test_extension_rules_only_see_their_extensions():
+    engine = RuleEngine([Rule("Images", extensions=["JPG", ".png"]), Rule("Other", extensions=[".txt"])])
+
+    assert engine.match(_file("cat.JPG")).category == "Images"
+    assert engine.match(_file("cat.png")).category == "Images"
+    assert engine.match(_file("cat.gif")) is None
+
+
+def test_generic_rules_apply_to_every_extension():
+    engine = RuleEngine([
+        Rule("Invoices", name_pattern=r"(?i)invoice"),
+        Rule("Large", min_size=1000),
+        Rule("Images", mime="image/*"),
+    ])
+
+    assert engine.match(_file("invoice-42.pdf")).rule == "Invoices"
+    assert engine.match(_file("big.iso", size=5000)).rule == "Large"
+    assert engine.match(_file("scan", mime_type="image/tiff")).rule == "Images"
+    assert engine.match(_file("small.iso")) is None
+
+
+def test_rule_order_wins_across_extension_and_generic_rules():
+    engine = RuleEngine([
+        Rule("Receipts", extensions=[".pdf"], name_pattern="receipt"),
+        Rule("Scans", source_dir="/inbox/scanner"),
+        Rule("Documents", extensions=[".pdf"]),
+        Rule("Anything"),
+    ])
+
+    assert engine.match(_file("receipt.pdf", path="/inbox/scanner/receipt.pdf")).category == "Receipts"
+    assert engine.match(_file("page.pdf", path="/inbox/scanner/deep/page.pdf")).category == "Scans"
+    assert engine.match(_file("page.pdf")).category == "Documents"
+    assert engine.match(_file("page.odt")).category == "Anything"
+
+
+def test_route_skips_the_ai_only_for_confident_matches():
+    engine = RuleEngine([Rule("Documents", extensions=[".pdf"], confidence=0.9),
+                         Rule("Maybe", extensions=[".txt"], confidence=0.5)], threshold=0.8)
+
+    assert engine.route(_file("a.pdf")).category == "Documents"
+    assert engine.route(_file("a.txt")) is None
+    assert engine.match(_file("a.txt")).category == "Maybe"
+    assert engine.route(_file("a.bin")) is None
+    assert engine.route(_file("b.pdf")) is not None
+    assert engine.stats() == {"total": 4, "fast_path": 2, "fast_path_ratio": 0.5}
+
+
+def test_stats_without_traffic():
+    assert RuleEngine([]).stats()["fast_path_ratio"] == 0.0
+
+
+def test_config_rules_come_before_the_category_defaults(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps([
+        {"name": "reports", "category": "Reports", "extensions": [".pdf"], "name_pattern": "^report",
+         "destination": "Work/Reports"},
+        {"category": "Unsure", "extensions": [".csv"], "confidence": 0.5},
+    ]))
+
+    engine = RuleEngine.from_config(rules_file)
+
+    assert engine.route(_file("report-q1.pdf")) == ("reports", "Reports", "Work/Reports", 1.0)
+    assert engine.route(_file("notes.pdf")).rule == "default:Documents"
+    # A low-confidence user rule still shadows the default, sending the file to the AI
+    assert engine.route(_file("data.csv")) is None
+
+
+def test_defaults_without_a_rules_file(tmp_path):
+    engine = RuleEngine.from_config(tmp_path / "missing.json")
+
+    assert engine.route(_file("photo.jpg")).category == "Images"
+    assert engine.route(_file("unknown.xyz")) is None
+
+
+@pytest.mark.parametrize("content", [
+    {"category": "Not a list"},
+    [{"name": "no category"}],
+    [{"category": "Bad", "unknown_condition": 1}],
+    [{"category": "Bad", "name_pattern": "("}],
+])
+def test_invalid_rules_files_are_rejected(tmp_path, content):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps(content))
+
+    with pytest.raises(ValueError):
+        RuleEngine.from_config(rules_file)
@@ -0,0 +1,130 @@
+import os
+import time
+
+import pytest
+
+from utils.stability import WriteCompletionDetector
+
+QUIET = 0.2
+
+
+@pytest.fixture
+def detector():
+    released = []
+    detector = WriteCompletionDetector(released.append, quiet_period=QUIET, partial_suffixes=(".crdownload",))
+    detector.released = released
+    detector.start()
+    yield detector
+    detector.stop()
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_file_is_released_after_the_quiet_period(detector, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"data")
+    start = time.monotonic()
+
+    detector.track(path)
+    detector.track(path)
+
+    assert detector.released == [] and detector.pending == 1
+    assert _wait_for(lambda: detector.released)
+    assert time.monotonic() - start >= QUIET
+    time.sleep(QUIET)
+    assert detector.released == [path] and detector.pending == 0
+
+
+def test_growing_file_rearms_the_quiet_period(detector, tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"x")
+    detector.track(path)
+
+    time.sleep(QUIET / 2)
+    with open(path, "ab") as file:
+        file.write(b"more")
+    grown = time.monotonic()
+    time.sleep(QUIET * 0.75)
+    assert detector.released == []
+
+    assert _wait_for(lambda: detector.released)
+    assert time.monotonic() - grown >= QUIET
+
+
+def test_file_already_at_rest_is_released_at_once(detector, tmp_path):
+    path = tmp_path / "old.txt"
+    path.write_bytes(b"x")
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+
+    detector.track(path)
+
+    assert detector.released == [path] and detector.pending == 0
+
+
+def test_close_after_write_releases_at_once(detector, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"x")
+    detector.track(path)
+
+    detector.closed(path)
+
+    assert detector.released == [path] and detector.pending == 0
+    time.sleep(QUIET * 1.5)
+    assert detector.released == [path]
+
+
+def test_partial_download_is_held_until_renamed(detector, tmp_path):
+    partial = tmp_path / "setup.exe.crdownload"
+    partial.write_bytes(b"x")
+    detector.track(partial)
+    detector.closed(partial)
+    assert detector.pending == 0
+
+    final = tmp_path / "setup.exe"
+    partial.rename(final)
+    detector.moved(partial, final)
+
+    assert detector.released == [final]
+
+
+def test_rename_between_partial_names_is_not_released(detector, tmp_path):
+    first, second = tmp_path / "a.crdownload", tmp_path / "b.crdownload"
+    second.write_bytes(b"x")
+
+    detector.moved(first, second)
+
+    time.sleep(QUIET * 1.5)
+    assert detector.released == []
+
+
+def test_renamed_file_keeps_settling_under_its_new_name(detector, tmp_path):
+    source, destination = tmp_path / "untitled.txt", tmp_path / "named.txt"
+    source.write_bytes(b"x")
+    detector.track(source)
+    source.rename(destination)
+
+    detector.moved(source, destination)
+
+    assert _wait_for(lambda: detector.released)
+    assert detector.released == [destination]
+
+
+@pytest.mark.parametrize("delete", [False, True])
+def test_discarded_or_deleted_files_are_not_released(detector, tmp_path, delete):
+    path = tmp_path / "temp.bin"
+    path.write_bytes(b"x")
+    detector.track(path)
+
+    if delete:
+        path.unlink()
+    else:
+        detector.discard(path)
+
+    time.sleep(QUIET * 1.5)
+    assert detector.released == [] and detector.pending == 0
@@ -0,0 +1,133 @@
+import errno
+import os
+
+import pytest
+
+from utils import transfer
+from utils.transfer import add_move_listener, copy_data, move_file, remove_move_listener
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "inbox" / "report.pdf"
+    path.parent.mkdir()
+    path.write_bytes(b"report contents" * 1000)
+    return path
+
+
+@pytest.fixture
+def destination(tmp_path):
+    (tmp_path / "sorted").mkdir()
+    return tmp_path / "sorted" / "report.pdf"
+
+
+@pytest.fixture
+def cross_device(monkeypatch, source):
+    """Make hard links (and so renames) of ``source`` fail as if it were on another filesystem."""
+    real_link = os.link
+
+    def link(src, dst, **kwargs):
+        if str(src) == str(source):
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        return real_link(src, dst, **kwargs)
+
+    monkeypatch.setattr(transfer.os, "link", link)
+
+
+def _leftovers(directory):
+    return sorted(path.name for path in directory.iterdir() if path.name.endswith(".part"))
+
+
+def test_same_filesystem_move_is_a_rename(source, destination):
+    moves = []
+
+    def listener(src, dest):
+        moves.append((src, dest))
+
+    add_move_listener(listener)
+    try:
+        result = move_file(source, destination)
+    finally:
+        remove_move_listener(listener)
+
+    assert result.method == "rename" and result.size == 15000
+    assert not source.exists() and destination.read_bytes() == b"report contents" * 1000
+    assert moves == [(source, destination)]
+
+
+@pytest.mark.parametrize("try_rename", [True, False])
+def test_existing_destination_is_never_replaced(source, destination, try_rename):
+    destination.write_bytes(b"keep me")
+
+    with pytest.raises(FileExistsError):
+        move_file(source, destination, try_rename=try_rename)
+
+    assert destination.read_bytes() == b"keep me" and source.exists()
+    assert _leftovers(destination.parent) == []
+
+
+def test_filesystems_without_hard_links_still_refuse_to_overwrite(source, destination, monkeypatch):
+    def link(src, dst, **kwargs):
+        raise OSError(errno.EPERM, os.strerror(errno.EPERM))
+
+    monkeypatch.setattr(transfer.os, "link", link)
+    destination.write_bytes(b"keep me")
+    with pytest.raises(FileExistsError):
+        move_file(source, destination)
+
+    destination.unlink()
+    assert move_file(source, destination).method == "rename"
+    assert not source.exists() and destination.exists()
+
+
+def test_cross_device_move_copies_and_verifies(source, destination, cross_device):
+    result = move_file(source, destination, verify=True)
+
+    assert result.method != "rename" and result.verified and result.size == 15000
+    assert not source.exists() and destination.read_bytes() == b"report contents" * 1000
+    assert _leftovers(destination.parent) == []
+
+
+def test_cross_device_move_onto_an_existing_file(source, destination, cross_device):
+    destination.write_bytes(b"keep me")
+
+    with pytest.raises(FileExistsError):
+        move_file(source, destination)
+
+    assert destination.read_bytes() == b"keep me" and source.exists()
+    assert _leftovers(destination.parent) == []
+
+
+def test_failed_verification_removes_the_partial_copy(source, destination, cross_device, monkeypatch):
+    hashes = iter(["source-hash", "corrupted-hash"])
+    monkeypatch.setattr(transfer, "hash_file", lambda path: next(hashes))
+
+    with pytest.raises(IOError, match="Verification failed"):
+        move_file(source, destination, verify=True)
+
+    assert source.exists() and not destination.exists()
+    assert _leftovers(destination.parent) == []
+
+
+def _failing_method(error):
+    def copy(source_fd, dest_fd, size):
+        os.write(dest_fd, b"garbage from a failed attempt")
+        raise OSError(error, os.strerror(error))
+    return copy
+
+
+@pytest.mark.parametrize("error", [errno.EXDEV, errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL])
+def test_unsupported_copy_methods_fall_through(tmp_path, source, monkeypatch, error):
+    monkeypatch.setattr(transfer, "_ZERO_COPY_METHODS", [("broken", _failing_method(error))])
+    copy = tmp_path / "copy.pdf"
+
+    assert copy_data(source, copy) == "copy"
+    assert copy.read_bytes() == source.read_bytes()
+
+
+def test_real_copy_errors_are_raised(tmp_path, source, monkeypatch):
+    monkeypatch.setattr(transfer, "_ZERO_COPY_METHODS", [("broken", _failing_method(errno.EIO))])
+
+    with pytest.raises(OSError) as error:
+        copy_data(source, tmp_path / "copy.pdf")
+    assert error.value.errno == errno.EIO
@@ -0,0 +1,131 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from utils.directory_index import DirectoryIndex
+from utils.stability import WriteCompletionDetector
+from utils.watcher import (
+    CHANGED, CLOSED, DELETED, MOVED, EventCoalescer, FolderWatcher, SelfEventFilter, WatchRoot
+)
+
+INBOX = Path("/inbox")
+
+
+def _coalesced(*events, window=60.0):
+    """Dispatched (kind, path, source, stale) tuples for raw events added within one window."""
+    dispatched = []
+    coalescer = EventCoalescer(lambda *event: dispatched.append(event), window,
+                               is_partial=lambda path: path.suffix == ".crdownload")
+    coalescer.start()
+    for event in events:
+        coalescer.add(*event)
+    # stop() dispatches whatever is still being folded
+    coalescer.stop()
+    return dispatched, coalescer
+
+
+def test_create_modify_rename_fold_into_one_event():
+    dispatched, coalescer = _coalesced(
+        (CHANGED, INBOX / "untitled.txt"),
+        (CHANGED, INBOX / "untitled.txt"),
+        (CHANGED, INBOX / "untitled.txt"),
+        (MOVED, INBOX / "untitled.txt", INBOX / "notes.txt"),
+    )
+
+    assert dispatched == [(CHANGED, INBOX / "notes.txt", None, {INBOX / "untitled.txt"})]
+    assert (coalescer.received, coalescer.dispatched) == (4, 1)
+
+
+def test_finished_partial_download_becomes_closed():
+    dispatched, _ = _coalesced(
+        (CHANGED, INBOX / "report.pdf.crdownload"),
+        (CHANGED, INBOX / "report.pdf.crdownload"),
+        (MOVED, INBOX / "report.pdf.crdownload", INBOX / "report.pdf"),
+    )
+
+    assert dispatched == [(CLOSED, INBOX / "report.pdf", None, {INBOX / "report.pdf.crdownload"})]
+
+
+def test_rename_without_earlier_events_stays_a_move():
+    dispatched, _ = _coalesced((MOVED, INBOX / "a.txt", INBOX / "b.txt"))
+
+    assert dispatched == [(MOVED, INBOX / "b.txt", INBOX / "a.txt", set())]
+
+
+def test_delete_wins_over_earlier_changes():
+    dispatched, _ = _coalesced((CHANGED, INBOX / "a.txt"), (CLOSED, INBOX / "a.txt"), (DELETED, INBOX / "a.txt"))
+
+    assert dispatched == [(DELETED, INBOX / "a.txt", None, set())]
+
+
+def test_window_of_zero_dispatches_every_event():
+    dispatched, _ = _coalesced((CHANGED, INBOX / "a.txt"), (CHANGED, INBOX / "a.txt"), window=0)
+
+    assert [event[0] for event in dispatched] == [CHANGED, CHANGED]
+
+
+def test_self_events_are_suppressed_once():
+    events = SelfEventFilter(ttl=60)
+    events.expect(INBOX / "a.txt", Path("/sorted/a.txt"))
+
+    assert events.is_self(Path("/sorted/a.txt"), INBOX / "a.txt")
+    assert not events.is_self(Path("/sorted/a.txt"))
+    assert not events.is_self(INBOX / "other.txt", None)
+    assert events.suppressed == 1
+
+
+def test_self_events_expire_after_ttl():
+    events = SelfEventFilter(ttl=0.05)
+    events.expect(INBOX / "a.txt")
+    time.sleep(0.1)
+
+    assert not events.is_self(INBOX / "a.txt")
+
+
+def test_unconsumed_self_events_match_until_ttl():
+    events = SelfEventFilter(ttl=0.2, consume=False)
+    events.expect(INBOX / "a.txt")
+
+    assert events.is_self(INBOX / "a.txt") and events.is_self(INBOX / "a.txt")
+    time.sleep(0.3)
+    assert not events.is_self(INBOX / "a.txt")
+
+
+@pytest.fixture
+def watched(tmp_path):
+    """A FolderWatcher without coalescing or an observer; raw events are fed to it directly."""
+    released = []
+    root = WatchRoot(tmp_path)
+    detector = WriteCompletionDetector(released.append, quiet_period=60)
+    watcher = FolderWatcher([root], DirectoryIndex([tmp_path], db_path=None), detector,
+                            coalesce_window=0, excluded=())
+    return watcher, root, released
+
+
+def test_uncoalesced_events_of_an_own_move_are_all_suppressed(watched, tmp_path):
+    watcher, root, released = watched
+    source, destination = tmp_path / "sorted.txt", tmp_path / "renamed.txt"
+    destination.write_text("x")
+    watcher.self_events.expect(source, destination)
+
+    watcher.event(root, MOVED, str(source), str(destination))
+    watcher.event(root, CHANGED, str(destination))
+    watcher.event(root, CLOSED, str(destination))
+
+    assert released == [] and watcher.write_detector.pending == 0
+
+
+def test_new_files_reach_the_detector(watched, tmp_path):
+    watcher, root, released = watched
+    new_file = tmp_path / "download.txt"
+    new_file.write_text("x")
+    nested = tmp_path / "Documents" / "sorted.txt"
+    nested.parent.mkdir()
+    nested.write_text("x")
+
+    watcher.event(root, CLOSED, str(new_file))
+    # The default "top" policy only indexes files deeper than the folder itself
+    watcher.event(root, CLOSED, str(nested))
+
+    assert released == [new_file]
@@ -0,0 +1,224 @@
+import bisect
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from config import FILE_LIST_FETCH_BATCH, FILE_LIST_RESET_THRESHOLD
+from utils.directory_index import IndexChanges, IndexEntry
+
+COLUMNS = ["Name", "Category", "Size", "Modified"]
+
+_SORT_KEYS: List[Callable[[IndexEntry], Any]] = [
+    lambda entry: entry.name.lower(),
+    lambda entry: entry.category,
+    lambda entry: entry.size,
+    lambda entry: entry.mtime_ns,
+]
+
+
+def format_size(size: int) -> str:
+    """Format a byte count for display, e.g. ``1.5 MB``."""
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class FileListModel(QAbstractTableModel):
+    """
+    Sortable, filterable table of directory index entries.
+
+    Visible entries are kept in one list in ascending sort order, so a
+    descending sort only flips how rows are addressed. Rows are handed to the
+    view in batches through ``fetchMore`` as the user scrolls, and
+    ``apply_changes`` inserts or removes only the affected rows; formatting
+    happens in ``data`` for the rows actually painted.
+    """
+
+    def __init__(self, parent=None, fetch_batch: int = FILE_LIST_FETCH_BATCH,
+                 reset_threshold: int = FILE_LIST_RESET_THRESHOLD):
+        super().__init__(parent)
+        self.fetch_batch = fetch_batch
+        self.reset_threshold = reset_threshold
+
+        self._entries: Dict[str, IndexEntry] = {}
+        self._visible: List[IndexEntry] = []
+        self._keys: List[tuple] = []
+        self._loaded = 0
+        self._sort_column = 0
+        self._descending = False
+        self._filter_text = ""
+        self._filter_category: Optional[str] = None
+
+    # Qt model interface
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._loaded < len(self._visible)
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        count = min(self.fetch_batch, len(self._visible) - self._loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        entry = self.entry(index.row())
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return entry.name
+            if column == 1:
+                return entry.category
+            if column == 2:
+                return format_size(entry.size)
+            return datetime.fromtimestamp(entry.mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M")
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return entry.path
+        if role == Qt.ItemDataRole.UserRole:
+            return entry.path
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == 2:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        self.beginResetModel()
+        self._sort_column = column
+        self._descending = order == Qt.SortOrder.DescendingOrder
+        self._rebuild(keep_loaded=True)
+        self.endResetModel()
+
+    # Updates from the directory index
+
+    def entry(self, row: int) -> IndexEntry:
+        """Return the entry shown in a row."""
+        return self._visible[self._position(row)]
+
+    def set_entries(self, entries: Iterable[IndexEntry]) -> None:
+        """Replace the contents of the model."""
+        self.beginResetModel()
+        self._entries = {entry.path: entry for entry in entries}
+        self._rebuild()
+        self.endResetModel()
+
+    def set_filter(self, text: str = "", category: Optional[str] = None) -> None:
+        """Show only entries whose name contains ``text`` and, if given, of ``category``."""
+        self.beginResetModel()
+        self._filter_text = text.lower()
+        self._filter_category = category
+        self._rebuild()
+        self.endResetModel()
+
+    def apply_changes(self, changes: IndexChanges) -> None:
+        """
+        Apply directory index changes, emitting row inserts and removals.
+
+        Large change sets reset the model instead, which is cheaper than
+        thousands of individual row signals.
+        """
+        if len(changes.added) + len(changes.updated) + len(changes.removed) > self.reset_threshold:
+            self.beginResetModel()
+            for path in changes.removed:
+                self._entries.pop(path, None)
+            for entry in changes.added + changes.updated:
+                self._entries[entry.path] = entry
+            self._rebuild(keep_loaded=True)
+            self.endResetModel()
+            return
+
+        for path in changes.removed:
+            self._remove(path)
+        for entry in changes.updated:
+            previous = self._entries.get(entry.path)
+            if previous is not None and self._key(previous) == self._key(entry) and self._accepts(entry):
+                self._entries[entry.path] = entry
+                position = bisect.bisect_left(self._keys, self._key(entry))
+                self._visible[position] = entry
+                row = self._row(position)
+                if row < self._loaded:
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+            else:
+                self._remove(entry.path)
+                self._insert(entry)
+        for entry in changes.added:
+            self._remove(entry.path)
+            self._insert(entry)
+
+    # Internals
+
+    def _key(self, entry: IndexEntry) -> tuple:
+        return (_SORT_KEYS[self._sort_column](entry), entry.path)
+
+    def _accepts(self, entry: IndexEntry) -> bool:
+        if self._filter_category is not None and entry.category != self._filter_category:
+            return False
+        return not self._filter_text or self._filter_text in entry.name.lower()
+
+    def _position(self, row: int) -> int:
+        # Row shown in the view -> position in the ascending list
+        return len(self._visible) - 1 - row if self._descending else row
+
+    def _row(self, position: int) -> int:
+        return len(self._visible) - 1 - position if self._descending else position
+
+    def _rebuild(self, keep_loaded: bool = False) -> None:
+        # Caller wraps this in beginResetModel/endResetModel
+        visible = [entry for entry in self._entries.values() if self._accepts(entry)]
+        pairs = sorted(((self._key(entry), entry) for entry in visible), key=lambda pair: pair[0])
+        self._keys = [key for key, _ in pairs]
+        self._visible = [entry for _, entry in pairs]
+        loaded = max(self._loaded, self.fetch_batch) if keep_loaded else self.fetch_batch
+        self._loaded = min(loaded, len(self._visible))
+
+    def _insert(self, entry: IndexEntry) -> None:
+        self._entries[entry.path] = entry
+        if not self._accepts(entry):
+            return
+        key = self._key(entry)
+        position = bisect.bisect_left(self._keys, key)
+        row = len(self._visible) - position if self._descending else position
+        # Rows past the loaded range are materialized later by fetchMore
+        if row <= self._loaded and (row < self._loaded or not self.canFetchMore()):
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._keys.insert(position, key)
+            self._visible.insert(position, entry)
+            self._loaded += 1
+            self.endInsertRows()
+        else:
+            self._keys.insert(position, key)
+            self._visible.insert(position, entry)
+
+    def _remove(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is None or not self._accepts(entry):
+            return
+        position = bisect.bisect_left(self._keys, self._key(entry))
+        if position >= len(self._keys) or self._visible[position].path != path:
+            return
+        row = self._row(position)
+        if row < self._loaded:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._keys[position]
+            del self._visible[position]
+            self._loaded -= 1
+            self.endRemoveRows()
+        else:
+            del self._keys[position]
+            del self._visible[position]
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from config import (
+    ANALYSIS_CACHE_FILE, ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_MAX_AGE, ANALYSIS_CACHE_HASH_FALLBACK
+)
+from utils.metrics import CACHE_REQUESTS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    content_hash TEXT,
+    analysis TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_by_content ON analyses (size, content_hash);
+CREATE INDEX IF NOT EXISTS analyses_by_access ON analyses (accessed);
+"""
+
+# Only refresh the access time of a hit once per interval so repeat scans stay read-only
+_TOUCH_INTERVAL = 3600
+_EVICT_EVERY = 500
+_HASH_CHUNK = 1024 * 1024
+# Content hashes computed by missed lookups, kept for the ``put`` that follows
+_MISS_HASHES = 1024
+
+
+def hash_file(file_path: Path) -> str:
+    """Return a streaming BLAKE2b digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def retarget_analysis(analysis: Dict[str, Any], file_path: Path, stat: os.stat_result) -> Dict[str, Any]:
+    """Copy an analysis of identical content, updating the fields that describe the file itself."""
+    analysis = dict(analysis)
+    analysis["name"] = Path(file_path).name
+    analysis["path"] = str(file_path)
+    analysis["extension"] = Path(file_path).suffix.lower()
+    analysis["created"] = datetime.fromtimestamp(stat.st_ctime).isoformat()
+    analysis["modified"] = datetime.fromtimestamp(stat.st_mtime).isoformat()
+    return analysis
+
+
+class AnalysisCache:
+    """
+    On-disk cache of ``FileAnalyzer`` results.
+
+    Entries are keyed by (path, size, mtime_ns, inode), so looking up an
+    unchanged file only needs the ``stat`` result the analyzer already has and
+    never opens the file. With ``hash_fallback`` enabled, a miss on the stat
+    key (e.g. a file that was renamed or re-downloaded) is retried against a
+    content hash before the file is analyzed from scratch. That hash is kept
+    until the analysis is ``put``, so a miss reads the file only once.
+    """
+
+    def __init__(self, db_path: Path = ANALYSIS_CACHE_FILE,
+                 max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+                 max_age: float = ANALYSIS_CACHE_MAX_AGE,
+                 hash_fallback: bool = ANALYSIS_CACHE_HASH_FALLBACK):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hash_fallback = hash_fallback
+        self.hits = 0
+        self.misses = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._miss_hashes: Dict[Tuple[str, int, int, int], str] = {}
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.evict()
+
+    def get(self, file_path: Path, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """
+        Look up the cached analysis of a file.
+
+        Args:
+            file_path (Path): Path to the file
+            stat (os.stat_result): Current stat of the file
+
+        Returns:
+            Optional[Dict[str, Any]]: Cached analysis, or None on a miss
+        """
+        key = str(file_path)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, analysis, accessed FROM analyses WHERE path = ?",
+                (key,)
+            ).fetchone()
+            if row and (row[0], row[1], row[2]) == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                if now - row[4] > _TOUCH_INTERVAL:
+                    self._conn.execute("UPDATE analyses SET accessed = ? WHERE path = ?", (now, key))
+                    self._conn.commit()
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache="analysis", result="hit")
+                return json.loads(row[3])
+
+        if self.hash_fallback:
+            try:
+                content_hash = hash_file(file_path)
+            except OSError:
+                content_hash = None
+            if content_hash:
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT analysis FROM analyses WHERE size = ? AND content_hash = ? LIMIT 1",
+                        (stat.st_size, content_hash)
+                    ).fetchone()
+                if row:
+                    analysis = retarget_analysis(json.loads(row[0]), file_path, stat)
+                    self._store(key, stat, content_hash, analysis)
+                    with self._lock:
+                        self.hits += 1
+                    CACHE_REQUESTS.inc(cache="analysis", result="hit")
+                    return analysis
+                with self._lock:
+                    if len(self._miss_hashes) >= _MISS_HASHES:
+                        # Lookups that were never followed by a put; drop the oldest
+                        del self._miss_hashes[next(iter(self._miss_hashes))]
+                    self._miss_hashes[self._stat_key(key, stat)] = content_hash
+
+        with self._lock:
+            self.misses += 1
+        CACHE_REQUESTS.inc(cache="analysis", result="miss")
+        return None
+
+    def put(self, file_path: Path, stat: os.stat_result, analysis: Dict[str, Any]) -> None:
+        """Store the analysis of a file under its current stat key."""
+        key = str(file_path)
+        content_hash = None
+        if self.hash_fallback:
+            with self._lock:
+                content_hash = self._miss_hashes.pop(self._stat_key(key, stat), None)
+            if content_hash is None:
+                try:
+                    content_hash = hash_file(file_path)
+                except OSError:
+                    pass
+        self._store(key, stat, content_hash, analysis)
+
+    def invalidate(self, file_path: Path) -> None:
+        """Drop the cached analysis of a file."""
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses WHERE path = ?", (str(file_path),))
+            self._conn.commit()
+
+    def evict(self) -> int:
+        """
+        Drop entries older than ``max_age`` and trim the cache to ``max_entries``.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            removed = 0
+            if self.max_age:
+                cursor = self._conn.execute(
+                    "DELETE FROM analyses WHERE accessed < ?", (time.time() - self.max_age,)
+                )
+                removed += cursor.rowcount
+            if self.max_entries:
+                cursor = self._conn.execute(
+                    "DELETE FROM analyses WHERE path IN ("
+                    "SELECT path FROM analyses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+            return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _stat_key(key: str, stat: os.stat_result) -> Tuple[str, int, int, int]:
+        return key, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    def _store(self, key: str, stat: os.stat_result, content_hash: Optional[str],
+               analysis: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses "
+                "(path, size, mtime_ns, inode, content_hash, analysis, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, stat.st_ino, content_hash,
+                 json.dumps(analysis, default=str), time.time())
+            )
+            self._conn.commit()
+            self._puts += 1
+            evict = self._puts % _EVICT_EVERY == 0
+        if evict:
+            self.evict()
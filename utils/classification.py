@@ -0,0 +1,136 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from config import FILE_CATEGORIES, CATEGORIES_FILE
+
+DEFAULT_CATEGORY = "Other"
+
+# MIME fallbacks for files whose extension is unknown
+DEFAULT_MIME_PREFIXES = {
+    "image/": "Images",
+    "video/": "Media",
+    "audio/": "Media",
+    "text/": "Documents",
+    "application/pdf": "Documents",
+}
+DEFAULT_MIME_SUFFIXES = {
+    "zip": "Archives",
+    "rar": "Archives",
+    "compressed": "Archives",
+    "x-tar": "Archives",
+    "bzip2": "Archives",
+    "json": "Data",
+    "xml": "Data",
+    "yaml": "Data",
+    "sql": "Data",
+}
+
+
+class _MimeTrie:
+    """Character trie returning the category of the longest matching key."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        self._root: Dict[str, Any] = {}
+        for key, category in entries:
+            node = self._root
+            for char in key:
+                node = node.setdefault(char, {})
+            node[None] = category
+
+    def longest_match(self, text: str) -> Optional[str]:
+        node = self._root
+        found = node.get(None)
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+class ClassificationIndex:
+    """
+    Compiled extension and MIME lookups shared by every classifier.
+
+    Extensions map to categories through a frozen dict; unknown extensions fall
+    back to the longest matching MIME prefix (e.g. ``image/``) and then the
+    longest matching MIME suffix (e.g. ``zip`` for ``application/x-zip``).
+    Category definitions may list ``mime_prefixes``/``mime_suffixes`` next to
+    their ``extensions``.
+    """
+
+    def __init__(self, categories: Mapping[str, Dict[str, Any]]):
+        extensions: Dict[str, str] = {}
+        prefixes = dict(DEFAULT_MIME_PREFIXES)
+        suffixes = dict(DEFAULT_MIME_SUFFIXES)
+        for category, info in categories.items():
+            for extension in info.get("extensions", []):
+                extension = extension.lower()
+                extensions[extension if extension.startswith(".") else f".{extension}"] = category
+            for prefix in info.get("mime_prefixes", []):
+                prefixes[prefix.lower()] = category
+            for suffix in info.get("mime_suffixes", []):
+                suffixes[suffix.lower()] = category
+
+        self.categories = MappingProxyType({name: dict(info) for name, info in categories.items()})
+        self.extensions: Mapping[str, str] = MappingProxyType(extensions)
+        self._prefixes = _MimeTrie(prefixes.items())
+        self._suffixes = _MimeTrie((suffix[::-1], category) for suffix, category in suffixes.items())
+
+    @classmethod
+    def from_config(cls, categories_file: Path = CATEGORIES_FILE) -> "ClassificationIndex":
+        """
+        Build the index from ``FILE_CATEGORIES`` extended by the optional user file.
+
+        User categories add to (or override the extensions of) the built-in ones.
+        """
+        categories = {name: dict(info) for name, info in FILE_CATEGORIES.items()}
+        categories_file = Path(categories_file)
+        if categories_file.exists():
+            with open(categories_file, 'r') as file:
+                user_categories = json.load(file)
+            if not isinstance(user_categories, dict):
+                raise ValueError(f"{categories_file} must contain a JSON object of categories")
+            for name, info in user_categories.items():
+                merged = categories.setdefault(name, {})
+                for key, value in info.items():
+                    if isinstance(value, list):
+                        merged[key] = list(merged.get(key, [])) + value
+                    else:
+                        merged[key] = value
+        return cls(categories)
+
+    def category_for_extension(self, extension: str) -> Optional[str]:
+        """Return the category of an extension such as ``.pdf``, or None if unknown."""
+        return self.extensions.get(extension.lower())
+
+    def category_for_mime(self, mime_type: str) -> Optional[str]:
+        """Return the category implied by a MIME type, or None if unknown."""
+        mime_type = mime_type.lower()
+        return self._prefixes.longest_match(mime_type) or self._suffixes.longest_match(mime_type[::-1])
+
+    def classify(self, extension: str, mime_type: Optional[str] = None) -> str:
+        """
+        Classify a file by extension, falling back to its MIME type.
+
+        Args:
+            extension (str): File extension including the dot
+            mime_type (Optional[str]): MIME type, if known
+
+        Returns:
+            str: Category name
+        """
+        return (
+            self.extensions.get(extension.lower())
+            or (self.category_for_mime(mime_type) if mime_type else None)
+            or DEFAULT_CATEGORY
+        )
+
+
+@lru_cache(maxsize=None)
+def get_classification_index() -> ClassificationIndex:
+    """Return the process-wide classification index, built on first use."""
+    return ClassificationIndex.from_config()
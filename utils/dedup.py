@@ -0,0 +1,301 @@
+import hashlib
+import heapq
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from config import (
+    DEDUP_PARTIAL_BYTES, DEDUP_MAX_ENTRIES, DEDUP_NEAR_ENABLED,
+    DEDUP_NEAR_THRESHOLD, DEDUP_SKETCH_SIZE, DEDUP_SHINGLE_WORDS, DEDUP_SHINGLE_BYTES
+)
+from utils.analysis_cache import hash_file
+
+# Extensions whose text content is compared for near-duplicates
+TEXT_EXTENSIONS = frozenset({
+    ".txt", ".md", ".rtf", ".csv", ".json", ".xml", ".yaml", ".yml", ".html", ".htm",
+    ".py", ".js", ".ts", ".java", ".c", ".cpp", ".h", ".go", ".rs", ".sql", ".log", ".tex"
+})
+
+_WORD = re.compile(rb"\w+")
+
+
+def partial_hash(file_path: Path, size: int, block: int = DEDUP_PARTIAL_BYTES) -> str:
+    """Hash the first and last ``block`` bytes of a file (the whole file if it is small)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(block))
+        if size > 2 * block:
+            file.seek(size - block)
+        digest.update(file.read(block))
+    return digest.hexdigest()
+
+
+def text_sketch(file_path: Path, words: int = DEDUP_SHINGLE_WORDS,
+                max_bytes: int = DEDUP_SHINGLE_BYTES, size: int = DEDUP_SKETCH_SIZE) -> Tuple[int, ...]:
+    """
+    Bottom-k MinHash sketch of the word shingles at the start of a text file.
+
+    Returns:
+        Tuple[int, ...]: The ``size`` smallest shingle hashes, sorted
+    """
+    with open(file_path, 'rb') as file:
+        tokens = _WORD.findall(file.read(max_bytes).lower())
+    shingles = {
+        b" ".join(tokens[i:i + words]) for i in range(max(1, len(tokens) - words + 1))
+    } if tokens else set()
+    hashes = {int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big") for shingle in shingles}
+    return tuple(heapq.nsmallest(size, hashes))
+
+
+def sketch_similarity(a: Tuple[int, ...], b: Tuple[int, ...], size: int = DEDUP_SKETCH_SIZE) -> float:
+    """Estimate the Jaccard similarity of two bottom-k sketches."""
+    if not a or not b:
+        return 0.0
+    union = heapq.nsmallest(size, set(a) | set(b))
+    both = set(a) & set(b)
+    return sum(1 for value in union if value in both) / len(union)
+
+
+class DuplicateRecord:
+    """A file seen by the detector; hashes are computed only when needed."""
+
+    __slots__ = ("path", "size", "mtime_ns", "partial", "full", "sketch", "analysis", "verdict")
+
+    def __init__(self, path: str, size: int, mtime_ns: int, analysis: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.partial: Optional[str] = None
+        self.full: Optional[str] = None
+        self.sketch: Optional[Tuple[int, ...]] = None
+        self.analysis = analysis
+        self.verdict: Optional[Dict[str, Any]] = None
+
+
+class DuplicateMatch(NamedTuple):
+    record: DuplicateRecord
+    exact: bool
+    similarity: float
+
+
+class DuplicateDetector:
+    """
+    Finds files that duplicate one already analyzed.
+
+    Candidates are narrowed cheaply: first by size (no I/O), then by a hash of
+    the head and tail of the file, and only then by a full streaming hash.
+    Each file is hashed at most once per stage and only when another file of
+    the same size turns up. With ``near_duplicates`` enabled, text files
+    without an exact match are compared by MinHash sketches of their word
+    shingles. Canonical records carry the analysis and the AI verdict that
+    their duplicates reuse.
+    """
+
+    def __init__(self, partial_bytes: int = DEDUP_PARTIAL_BYTES,
+                 near_duplicates: bool = DEDUP_NEAR_ENABLED,
+                 near_threshold: float = DEDUP_NEAR_THRESHOLD,
+                 max_entries: int = DEDUP_MAX_ENTRIES):
+        self.partial_bytes = partial_bytes
+        self.near_duplicates = near_duplicates
+        self.near_threshold = near_threshold
+        self.max_entries = max_entries
+        self.exact_matches = 0
+        self.near_matches = 0
+
+        self._lock = threading.Lock()
+        self._records: "OrderedDict[str, DuplicateRecord]" = OrderedDict()
+        self._by_size: Dict[int, List[DuplicateRecord]] = {}
+
+    def find(self, file_path: Path, stat: os.stat_result) -> Optional[DuplicateMatch]:
+        """
+        Look for an earlier file with the same (or, optionally, similar) content.
+
+        Args:
+            file_path (Path): File to check
+            stat (os.stat_result): Its current stat
+
+        Returns:
+            Optional[DuplicateMatch]: The canonical record, or None
+        """
+        key = str(file_path)
+        if stat.st_size == 0:
+            return None
+        with self._lock:
+            candidates = [record for record in self._by_size.get(stat.st_size, ()) if record.path != key]
+
+        if candidates:
+            probe = DuplicateRecord(key, stat.st_size, stat.st_mtime_ns)
+            for candidate in candidates:
+                if self._same_content(probe, candidate):
+                    with self._lock:
+                        self.exact_matches += 1
+                        self._touch(candidate)
+                    return DuplicateMatch(candidate, True, 1.0)
+
+        if self.near_duplicates and Path(file_path).suffix.lower() in TEXT_EXTENSIONS:
+            return self._find_near(file_path, stat)
+        return None
+
+    def add(self, file_path: Path, stat: os.stat_result,
+            analysis: Optional[Dict[str, Any]] = None) -> DuplicateRecord:
+        """Register a canonical file (or attach its analysis once it is known)."""
+        key = str(file_path)
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or (record.size, record.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                if record is not None:
+                    self._drop(record)
+                record = DuplicateRecord(key, stat.st_size, stat.st_mtime_ns)
+                self._records[key] = record
+                self._by_size.setdefault(stat.st_size, []).append(record)
+                while len(self._records) > self.max_entries:
+                    self._drop(next(iter(self._records.values())))
+            if analysis is not None:
+                record.analysis = analysis
+            self._touch(record)
+            return record
+
+    def get(self, file_path: Union[str, Path]) -> Optional[DuplicateRecord]:
+        """Return the record of a registered file."""
+        with self._lock:
+            return self._records.get(str(file_path))
+
+    def settle(self, file_path: Path, new_path: Path, verdict: Dict[str, Any]) -> None:
+        """Store the verdict for a file and follow it to where it was moved."""
+        with self._lock:
+            record = self._records.pop(str(file_path), None)
+            if record is None:
+                return
+            record.path = str(new_path)
+            record.verdict = verdict
+            self._records[record.path] = record
+
+    def forget(self, file_path: Union[str, Path]) -> None:
+        """Drop a file that no longer exists."""
+        with self._lock:
+            record = self._records.get(str(file_path))
+            if record is not None:
+                self._drop(record)
+
+    def stats(self) -> Dict[str, int]:
+        """Return match counters."""
+        with self._lock:
+            return {
+                "entries": len(self._records),
+                "exact_matches": self.exact_matches,
+                "near_matches": self.near_matches
+            }
+
+    def _same_content(self, probe: DuplicateRecord, candidate: DuplicateRecord) -> bool:
+        if self._hash(probe, "partial") is None or self._hash(candidate, "partial") != probe.partial:
+            return False
+        # Small files are covered entirely by the head/tail hash
+        if probe.size <= 2 * self.partial_bytes:
+            return True
+        return self._hash(probe, "full") is not None and self._hash(candidate, "full") == probe.full
+
+    def _hash(self, record: DuplicateRecord, kind: str) -> Optional[str]:
+        value = getattr(record, kind)
+        if value is None:
+            try:
+                if kind == "partial":
+                    value = partial_hash(Path(record.path), record.size, self.partial_bytes)
+                else:
+                    value = hash_file(Path(record.path))
+            except OSError:
+                # The file is gone; it can no longer be anyone's canonical copy
+                self.forget(record.path)
+                return None
+            setattr(record, kind, value)
+        return value
+
+    def _find_near(self, file_path: Path, stat: os.stat_result) -> Optional[DuplicateMatch]:
+        try:
+            sketch = text_sketch(file_path)
+        except OSError:
+            return None
+        extension = Path(file_path).suffix.lower()
+        low, high = stat.st_size * 0.5, stat.st_size * 2
+        with self._lock:
+            candidates = [
+                record for record in self._records.values()
+                if record.path != str(file_path) and low <= record.size <= high
+                and Path(record.path).suffix.lower() == extension
+            ]
+
+        best: Optional[DuplicateMatch] = None
+        for candidate in candidates:
+            if candidate.sketch is None:
+                try:
+                    candidate.sketch = text_sketch(Path(candidate.path))
+                except OSError:
+                    self.forget(candidate.path)
+                    continue
+            similarity = sketch_similarity(sketch, candidate.sketch)
+            if similarity >= self.near_threshold and (best is None or similarity > best.similarity):
+                best = DuplicateMatch(candidate, False, similarity)
+        if best is not None:
+            with self._lock:
+                self.near_matches += 1
+        return best
+
+    def _touch(self, record: DuplicateRecord) -> None:
+        # Caller holds self._lock
+        if record.path in self._records:
+            self._records.move_to_end(record.path)
+
+    def _drop(self, record: DuplicateRecord) -> None:
+        # Caller holds self._lock
+        self._records.pop(record.path, None)
+        same_size = self._by_size.get(record.size)
+        if same_size is not None:
+            same_size[:] = [other for other in same_size if other is not record]
+            if not same_size:
+                del self._by_size[record.size]
+
+
+def find_duplicate_groups(paths: Iterable[Union[Path, Tuple[Path, os.stat_result]]],
+                          partial_bytes: int = DEDUP_PARTIAL_BYTES) -> List[List[Path]]:
+    """
+    Group a set of files into exact-duplicate groups.
+
+    Args:
+        paths (Iterable): Paths, or (path, stat) pairs as produced by ``iter_files``
+        partial_bytes (int): Bytes hashed at each end of a file before a full hash
+
+    Returns:
+        List[List[Path]]: Groups of two or more identical files, oldest first
+    """
+    by_size: Dict[int, List[Tuple[Path, os.stat_result]]] = {}
+    for item in paths:
+        file_path, stat = item if isinstance(item, tuple) else (item, None)
+        try:
+            stat = stat or os.stat(file_path)
+        except OSError:
+            continue
+        if stat.st_size:
+            by_size.setdefault(stat.st_size, []).append((Path(file_path), stat))
+
+    groups = []
+    for size, files in by_size.items():
+        if len(files) < 2:
+            continue
+        candidates = _split(files, lambda file_path: partial_hash(file_path, size, partial_bytes))
+        if size > 2 * partial_bytes:
+            candidates = [group for candidate in candidates for group in _split(candidate, hash_file)]
+        for group in candidates:
+            groups.append([file_path for file_path, stat in sorted(group, key=lambda item: item[1].st_mtime_ns)])
+    return groups
+
+
+def _split(files: List[Tuple[Path, os.stat_result]], digest) -> List[List[Tuple[Path, os.stat_result]]]:
+    buckets: Dict[str, List[Tuple[Path, os.stat_result]]] = {}
+    for file_path, stat in files:
+        try:
+            buckets.setdefault(digest(file_path), []).append((file_path, stat))
+        except OSError:
+            continue
+    return [bucket for bucket in buckets.values() if len(bucket) > 1]
@@ -0,0 +1,351 @@
+import os
+import sqlite3
+import stat as stat_module
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+from config import DIRECTORY_INDEX_FILE
+from utils.classification import get_classification_index
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+def _stat_file(path: str) -> Optional[os.stat_result]:
+    """Stat a path, returning None unless it is an existing regular file."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat if stat_module.S_ISREG(stat.st_mode) else None
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    name: str
+    parent: str
+    extension: str
+    category: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Describe the entry with the field names ``FileAnalyzer`` uses."""
+        return {
+            "name": self.name,
+            "path": self.path,
+            "extension": self.extension,
+            "category": self.category,
+            "size": self.size,
+            "modified": datetime.fromtimestamp(self.mtime_ns / 1e9).isoformat()
+        }
+
+
+class IndexChanges(NamedTuple):
+    added: List[IndexEntry]
+    updated: List[IndexEntry]
+    removed: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+class DirectoryIndex:
+    """
+    Incrementally maintained index of the files in the watched folders.
+
+    Filesystem events are recorded into a journal of dirty paths from the
+    observer thread; ``sync`` replays the journal by re-stating only those
+    paths, so keeping the index current costs work proportional to the number
+    of changes. The index is mirrored to SQLite together with each directory's
+    mtime, which lets ``reconcile`` skip listing directories whose entries have
+    not changed since the last run. ``version`` increases whenever the
+    contents change so readers can skip redundant refreshes. Files under the
+    ``excluded`` directories (the organizer's own logs and caches) are never
+    indexed.
+    """
+
+    def __init__(self, roots: Iterable[Path], db_path: Optional[Path] = DIRECTORY_INDEX_FILE,
+                 recursive: bool = False, excluded: Iterable[Path] = ()):
+        self.roots = [Path(root) for root in roots]
+        self.recursive = recursive
+        self.excluded = {os.path.abspath(str(directory)) for directory in excluded}
+        self.version = 0
+
+        self._classification = get_classification_index()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, IndexEntry] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_extension: Dict[str, Set[str]] = {}
+        self._by_parent: Dict[str, Set[str]] = {}
+        self._dir_mtimes: Dict[str, int] = {}
+        self._journal: Set[str] = set()
+
+        self._conn = None
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._load()
+
+    # Event journal (safe to call from the observer thread)
+
+    def record(self, *paths: Union[str, Path]) -> None:
+        """Mark paths as changed; they are re-stated on the next ``sync``."""
+        with self._lock:
+            self._journal.update(str(path) for path in paths)
+
+    @property
+    def pending(self) -> int:
+        """Number of journaled paths waiting for ``sync``."""
+        with self._lock:
+            return len(self._journal)
+
+    def sync(self) -> IndexChanges:
+        """
+        Replay the event journal into the index.
+
+        Returns:
+            IndexChanges: Entries added, updated and removed by the replay
+        """
+        with self._lock:
+            journal, self._journal = self._journal, set()
+
+        stats = {path: _stat_file(path) for path in journal if self._covers(Path(path))}
+        return self._apply(stats)
+
+    def reconcile(self) -> IndexChanges:
+        """
+        Bring the index in line with the filesystem.
+
+        Directories whose mtime matches the stored one have had no entries
+        added, removed or renamed, so only changed directories are listed.
+        The files already indexed in unchanged directories are re-stated
+        (one ``stat`` each), since a file edited in place does not change
+        its directory's mtime.
+
+        Returns:
+            IndexChanges: Differences found
+        """
+        with self._lock:
+            journal, self._journal = self._journal, set()
+            known_dirs = dict(self._dir_mtimes)
+
+        stats: Dict[str, Optional[os.stat_result]] = {}
+        seen_dirs: Dict[str, int] = {}
+        directories = [str(root) for root in self.roots]
+        while directories:
+            directory = directories.pop()
+            try:
+                dir_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            seen_dirs[directory] = dir_mtime
+            unchanged = known_dirs.get(directory) == dir_mtime
+            if unchanged:
+                with self._lock:
+                    children = self._children(directory)
+                stats.update((path, _stat_file(path)) for path in children)
+                if not self.recursive:
+                    continue
+
+            listed: Set[str] = set()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file():
+                                if not unchanged:
+                                    stats[entry.path] = entry.stat()
+                                    listed.add(entry.path)
+                            elif (self.recursive and entry.is_dir(follow_symlinks=False)
+                                  and not entry.name.startswith('.')
+                                  and os.path.abspath(entry.path) not in self.excluded):
+                                directories.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            if not unchanged:
+                with self._lock:
+                    gone = [path for path in self._children(directory) if path not in listed]
+                stats.update((path, None) for path in gone)
+
+        for path in journal:
+            if path not in stats and self._covers(Path(path)):
+                stats[path] = _stat_file(path)
+
+        with self._lock:
+            for directory in set(self._dir_mtimes) - set(seen_dirs):
+                stats.update((path, None) for path in self._children(directory))
+            self._dir_mtimes = seen_dirs
+        changes = self._apply(stats)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM directories")
+                self._conn.executemany("INSERT INTO directories (path, mtime_ns) VALUES (?, ?)",
+                                       seen_dirs.items())
+                self._conn.commit()
+        return changes
+
+    # Queries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, path: Union[str, Path]) -> bool:
+        with self._lock:
+            return str(path) in self._entries
+
+    def get(self, path: Union[str, Path]) -> Optional[IndexEntry]:
+        """Return the entry for a path, or None if it is not indexed."""
+        with self._lock:
+            return self._entries.get(str(path))
+
+    def query(self, category: Optional[str] = None, extension: Optional[str] = None,
+              min_size: Optional[int] = None, max_size: Optional[int] = None,
+              modified_after: Optional[datetime] = None,
+              modified_before: Optional[datetime] = None,
+              root: Optional[Path] = None) -> List[IndexEntry]:
+        """
+        Return indexed files matching every given condition.
+
+        Args:
+            category (Optional[str]): Category from the classification index
+            extension (Optional[str]): Extension including the dot, e.g. ``.pdf``
+            min_size (Optional[int]): Minimum size in bytes
+            max_size (Optional[int]): Maximum size in bytes
+            modified_after (Optional[datetime]): Earliest modification time
+            modified_before (Optional[datetime]): Latest modification time
+            root (Optional[Path]): Only files directly inside this directory
+
+        Returns:
+            List[IndexEntry]: Matching entries sorted by name
+        """
+        after = int(modified_after.timestamp() * 1e9) if modified_after else None
+        before = int(modified_before.timestamp() * 1e9) if modified_before else None
+
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+            if category is not None:
+                candidates = set(self._by_category.get(category, ()))
+            if extension is not None:
+                by_extension = self._by_extension.get(extension.lower(), set())
+                candidates = by_extension if candidates is None else candidates & by_extension
+            if root is not None:
+                by_parent = self._by_parent.get(str(root), set())
+                candidates = by_parent if candidates is None else candidates & by_parent
+            entries = [self._entries[path] for path in candidates] if candidates is not None \
+                else list(self._entries.values())
+
+        results = []
+        for entry in entries:
+            if min_size is not None and entry.size < min_size:
+                continue
+            if max_size is not None and entry.size > max_size:
+                continue
+            if after is not None and entry.mtime_ns < after:
+                continue
+            if before is not None and entry.mtime_ns > before:
+                continue
+            results.append(entry)
+        results.sort(key=lambda entry: entry.name.lower())
+        return results
+
+    def close(self) -> None:
+        """Close the persistent backend."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Internals
+
+    def _covers(self, path: Path) -> bool:
+        if self.excluded and any(str(folder) in self.excluded for folder in path.parents):
+            return False
+        for root in self.roots:
+            if path.parent == root or (self.recursive and root in path.parents):
+                return True
+        return False
+
+    def _children(self, directory: str) -> List[str]:
+        # Caller holds self._lock
+        return list(self._by_parent.get(directory, ()))
+
+    def _make_entry(self, path: str, size: int, mtime_ns: int, inode: int) -> IndexEntry:
+        file_path = Path(path)
+        extension = file_path.suffix.lower()
+        return IndexEntry(path, file_path.name, str(file_path.parent), extension,
+                          self._classification.classify(extension), size, mtime_ns, inode)
+
+    def _load(self) -> None:
+        self._dir_mtimes = dict(self._conn.execute("SELECT path, mtime_ns FROM directories"))
+        for row in self._conn.execute("SELECT path, size, mtime_ns, inode FROM files"):
+            self._insert(self._make_entry(*row))
+
+    def _insert(self, entry: IndexEntry) -> None:
+        # Caller holds self._lock (or is the constructor)
+        self._entries[entry.path] = entry
+        self._by_category.setdefault(entry.category, set()).add(entry.path)
+        self._by_extension.setdefault(entry.extension, set()).add(entry.path)
+        self._by_parent.setdefault(entry.parent, set()).add(entry.path)
+
+    def _remove(self, path: str) -> Optional[IndexEntry]:
+        # Caller holds self._lock
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._by_category[entry.category].discard(path)
+            self._by_extension[entry.extension].discard(path)
+            self._by_parent[entry.parent].discard(path)
+        return entry
+
+    def _apply(self, stats: Dict[str, Optional[os.stat_result]]) -> IndexChanges:
+        added, updated, removed = [], [], []
+        upserts, deletes = [], []
+        with self._lock:
+            for path, stat in stats.items():
+                previous = self._entries.get(path)
+                if stat is None:
+                    if previous is not None:
+                        self._remove(path)
+                        removed.append(path)
+                        deletes.append((path,))
+                    continue
+                entry = self._make_entry(path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+                if previous == entry:
+                    continue
+                if previous is not None:
+                    self._remove(path)
+                self._insert(entry)
+                (updated if previous is not None else added).append(entry)
+                upserts.append((path, entry.parent, entry.size, entry.mtime_ns, entry.inode))
+
+            if upserts or deletes:
+                self.version += 1
+                if self._conn is not None:
+                    self._conn.executemany("DELETE FROM files WHERE path = ?", deletes)
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO files (path, parent, size, mtime_ns, inode) "
+                        "VALUES (?, ?, ?, ?, ?)", upserts
+                    )
+                    self._conn.commit()
+        return IndexChanges(added, updated, removed)
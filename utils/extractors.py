@@ -0,0 +1,465 @@
+"""
+Streaming metadata extractors with bounded memory use.
+
+Each extractor reads the file in fixed-size chunks (or, for PDFs, only the
+trailer, cross-reference entries and the handful of objects it needs), so
+peak memory does not grow with the size of the file.
+"""
+import csv
+import io
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+READ_CHUNK = 1024 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+PDF_TAIL_BYTES = 4096
+PDF_OBJECT_BYTES = 16 * 1024
+PDF_MAX_XREF_SECTIONS = 64
+
+_JSON_STRUCTURAL = re.compile(rb'["\\\[\]{},]')
+_JSON_STRING_SPECIAL = re.compile(rb'["\\]')
+_JSON_WHITESPACE = b" \t\r\n"
+
+
+def scan_json(file_path: Path) -> Dict[str, Any]:
+    """
+    Find the top-level type of a JSON document and how many elements it has.
+
+    The document is scanned incrementally for structural characters; values
+    are never materialized.
+
+    Returns:
+        Dict[str, Any]: ``type`` (Python type name as ``json.load`` would
+        produce) and, for arrays and objects, ``elements``
+    """
+    with open(file_path, 'rb') as file:
+        chunk = file.read(READ_CHUNK)
+        if chunk.startswith(b'\xef\xbb\xbf'):
+            chunk = chunk[3:]
+        start = len(chunk) - len(chunk.lstrip(_JSON_WHITESPACE))
+        while start == len(chunk):
+            chunk = file.read(READ_CHUNK)
+            if not chunk:
+                raise ValueError("Empty JSON document")
+            start = len(chunk) - len(chunk.lstrip(_JSON_WHITESPACE))
+
+        first = chunk[start:start + 1]
+        if first not in (b'{', b'['):
+            return {'type': _json_scalar_type(first, chunk[start:start + 64])}
+
+        depth = 0
+        in_string = False
+        escaped = False
+        commas = 0
+        has_content = False
+        position = start
+        while chunk:
+            while position < len(chunk):
+                if in_string:
+                    if escaped:
+                        escaped = False
+                        position += 1
+                        continue
+                    match = _JSON_STRING_SPECIAL.search(chunk, position)
+                    if match is None:
+                        position = len(chunk)
+                        break
+                    position = match.end()
+                    if match.group() == b'\\':
+                        escaped = True
+                    else:
+                        in_string = False
+                    continue
+
+                match = _JSON_STRUCTURAL.search(chunk, position)
+                # Any non-whitespace at depth 1 means the container is not empty
+                if depth == 1 and not has_content:
+                    end = match.start() if match else len(chunk)
+                    if chunk[position:end].strip(_JSON_WHITESPACE):
+                        has_content = True
+                if match is None:
+                    position = len(chunk)
+                    break
+                token = match.group()
+                position = match.end()
+                if token == b'"':
+                    in_string = True
+                    if depth == 1:
+                        has_content = True
+                elif token in (b'{', b'['):
+                    if depth == 1:
+                        has_content = True
+                    depth += 1
+                elif token in (b'}', b']'):
+                    depth -= 1
+                    if depth == 0:
+                        return {
+                            'type': 'dict' if first == b'{' else 'list',
+                            'elements': commas + 1 if has_content else 0
+                        }
+                elif token == b',' and depth == 1:
+                    commas += 1
+            chunk = file.read(READ_CHUNK)
+            position = 0
+
+    raise ValueError("Truncated JSON document")
+
+
+def _json_scalar_type(first: bytes, head: bytes) -> str:
+    if first == b'"':
+        return 'str'
+    if first in (b't', b'f'):
+        return 'bool'
+    if first == b'n':
+        return 'NoneType'
+    if first == b'-' or first.isdigit():
+        number = re.match(rb'-?[0-9.eE+-]+', head).group()
+        return 'float' if re.search(rb'[.eE]', number) else 'int'
+    raise ValueError("Invalid JSON document")
+
+
+def scan_csv(file_path: Path) -> Dict[str, Any]:
+    """
+    Read a CSV header and count its data rows without parsing every record.
+
+    Newlines inside quoted fields, in the header as well as in the rows, are
+    skipped by tracking quote parity, so the results match ``csv.reader`` for
+    well-formed files.
+
+    Returns:
+        Dict[str, Any]: ``headers`` and ``row_count``
+    """
+    with open(file_path, 'rb') as file:
+        # A quoted header field may span lines; read until its quotes balance
+        header = b''
+        while len(header) < MAX_HEADER_BYTES:
+            line = file.readline(MAX_HEADER_BYTES - len(header))
+            header += line
+            if not line or header.count(b'"') % 2 == 0:
+                break
+        headers = next(csv.reader(io.StringIO(header.decode('utf-8', errors='replace'), newline='')), [])
+
+        rows = 0
+        in_quotes = header.count(b'"') % 2 == 1
+        last = b'\n'
+        for chunk in iter(lambda: file.read(READ_CHUNK), b''):
+            if not in_quotes and b'"' not in chunk:
+                rows += chunk.count(b'\n')
+            else:
+                for part in chunk.split(b'"'):
+                    if not in_quotes:
+                        rows += part.count(b'\n')
+                    in_quotes = not in_quotes
+                # split() yields one more part than there are quotes
+                in_quotes = not in_quotes
+            last = chunk[-1:]
+
+        # A final record without a trailing newline still counts
+        if last and last != b'\n':
+            rows += 1
+
+    return {'headers': headers, 'row_count': rows}
+
+
+class _PdfParser:
+    """Just enough of the PDF object syntax to read dictionaries, numbers, names, strings and references."""
+
+    _DELIMITERS = b'()<>[]{}/% \t\r\n\x00\x0c'
+
+    def __init__(self, data: bytes, position: int = 0):
+        self.data = data
+        self.position = position
+
+    def skip_whitespace(self) -> None:
+        data = self.data
+        while self.position < len(data):
+            char = data[self.position:self.position + 1]
+            if char in b' \t\r\n\x00\x0c' and char:
+                self.position += 1
+            elif char == b'%':
+                end = data.find(b'\n', self.position)
+                self.position = len(data) if end < 0 else end + 1
+            else:
+                break
+
+    def parse(self) -> Any:
+        self.skip_whitespace()
+        data = self.data
+        if self.position >= len(data):
+            raise ValueError("Unexpected end of PDF object")
+        char = data[self.position:self.position + 1]
+
+        if data.startswith(b'<<', self.position):
+            self.position += 2
+            result = {}
+            while True:
+                self.skip_whitespace()
+                if data.startswith(b'>>', self.position):
+                    self.position += 2
+                    return result
+                key = self.parse()
+                if not isinstance(key, _Name):
+                    raise ValueError("Malformed PDF dictionary")
+                result[str(key)] = self.parse()
+        if char == b'[':
+            self.position += 1
+            items = []
+            while True:
+                self.skip_whitespace()
+                if data.startswith(b']', self.position):
+                    self.position += 1
+                    return items
+                items.append(self.parse())
+        if char == b'(':
+            return self._literal_string()
+        if char == b'<':
+            end = data.index(b'>', self.position)
+            hex_digits = re.sub(rb'\s', b'', data[self.position + 1:end])
+            self.position = end + 1
+            if len(hex_digits) % 2:
+                hex_digits += b'0'
+            return bytes.fromhex(hex_digits.decode('ascii'))
+        if char == b'/':
+            start = self.position + 1
+            self.position = start
+            while self.position < len(data) and data[self.position:self.position + 1] not in self._DELIMITERS:
+                self.position += 1
+            return _Name(data[start:self.position].decode('latin-1'))
+
+        token = self._token()
+        if not token:
+            raise ValueError(f"Unexpected {char!r} in PDF object")
+        if re.fullmatch(rb'[+-]?\d+', token):
+            # Possibly the start of an indirect reference "n g R"
+            saved = self.position
+            self.skip_whitespace()
+            generation = self._token()
+            self.skip_whitespace()
+            if re.fullmatch(rb'\d+', generation) and self._token() == b'R':
+                return _Ref(int(token), int(generation))
+            self.position = saved
+            return int(token)
+        if re.fullmatch(rb'[+-]?\d*\.\d*', token):
+            return float(token)
+        return token.decode('latin-1')
+
+    def _token(self) -> bytes:
+        start = self.position
+        data = self.data
+        while self.position < len(data) and data[self.position:self.position + 1] not in self._DELIMITERS:
+            self.position += 1
+        return data[start:self.position]
+
+    def _literal_string(self) -> bytes:
+        data = self.data
+        self.position += 1
+        depth = 1
+        out = bytearray()
+        escapes = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+        while self.position < len(data):
+            char = data[self.position:self.position + 1]
+            self.position += 1
+            if char == b'\\':
+                following = data[self.position:self.position + 1]
+                self.position += 1
+                if following in escapes:
+                    out += escapes[following]
+                elif following.isdigit():
+                    octal = re.match(rb'[0-7]{1,3}', data[self.position - 1:self.position + 2]).group()
+                    self.position += len(octal) - 1
+                    out.append(int(octal, 8) & 0xFF)
+                elif following in b'\r\n':
+                    if following == b'\r' and data[self.position:self.position + 1] == b'\n':
+                        self.position += 1
+                else:
+                    out += following
+            elif char == b'(':
+                depth += 1
+                out += char
+            elif char == b')':
+                depth -= 1
+                if depth == 0:
+                    return bytes(out)
+                out += char
+            else:
+                out += char
+        raise ValueError("Unterminated PDF string")
+
+
+class _Name(str):
+    pass
+
+
+class _Ref(tuple):
+    def __new__(cls, number: int, generation: int):
+        return super().__new__(cls, (number, generation))
+
+
+def _decode_pdf_text(value: Any) -> str:
+    if isinstance(value, bytes):
+        if value.startswith(b'\xfe\xff'):
+            return value[2:].decode('utf-16-be', errors='replace')
+        if value.startswith(b'\xff\xfe'):
+            return value[2:].decode('utf-16-le', errors='replace')
+        return value.decode('latin-1')
+    return '' if value is None else str(value)
+
+
+class _PdfFile:
+    """Random-access reader resolving objects through classic cross-reference tables."""
+
+    def __init__(self, file):
+        self.file = file
+        self.sections: List[Tuple[int, int, int]] = []  # (first object, count, offset of entries)
+        self.trailer: Dict[str, Any] = {}
+
+    def load_xref(self) -> None:
+        file = self.file
+        file.seek(0, 2)
+        size = file.tell()
+        file.seek(max(0, size - PDF_TAIL_BYTES))
+        tail = file.read()
+        marker = tail.rfind(b'startxref')
+        if marker < 0:
+            raise ValueError("PDF has no startxref")
+        offset = int(re.match(rb'\s*(\d+)', tail[marker + 9:]).group(1))
+
+        seen = set()
+        while offset is not None and offset not in seen and len(seen) < PDF_MAX_XREF_SECTIONS:
+            seen.add(offset)
+            trailer = self._read_section(offset)
+            for key, value in trailer.items():
+                # Newer sections (read first) take precedence
+                self.trailer.setdefault(key, value)
+            offset = trailer.get('Prev')
+
+    def _read_section(self, offset: int) -> Dict[str, Any]:
+        file = self.file
+        file.seek(offset)
+        if file.read(4) != b'xref':
+            # Cross-reference streams (PDF 1.5+) are compressed; leave them to PyPDF2
+            raise _Unsupported("PDF uses a cross-reference stream")
+        position = offset + 4
+        while True:
+            file.seek(position)
+            line = file.read(64)
+            match = re.match(rb'\s*(\d+)\s+(\d+)[ \t]*\r?\n?', line)
+            if not match:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            entries = position + match.end()
+            self.sections.append((first, count, entries))
+            position = entries + count * 20
+
+        file.seek(position)
+        data = file.read(PDF_OBJECT_BYTES)
+        marker = data.find(b'trailer')
+        if marker < 0:
+            raise ValueError("PDF has no trailer")
+        return _PdfParser(data, marker + 7).parse()
+
+    def object_offset(self, number: int) -> Optional[int]:
+        for first, count, entries in self.sections:
+            if first <= number < first + count:
+                self.file.seek(entries + (number - first) * 20)
+                entry = self.file.read(20)
+                if entry[17:18] == b'n':
+                    return int(entry[:10])
+                return None
+        return None
+
+    def resolve(self, value: Any, depth: int = 0) -> Any:
+        if not isinstance(value, _Ref) or depth > 8:
+            return value
+        offset = self.object_offset(value[0])
+        if offset is None:
+            return None
+        self.file.seek(offset)
+        data = self.file.read(PDF_OBJECT_BYTES)
+        match = re.match(rb'\s*\d+\s+\d+\s+obj', data)
+        if not match:
+            return None
+        return self.resolve(_PdfParser(data, match.end()).parse(), depth + 1)
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def read_pdf_info(file_path: Path) -> Dict[str, Any]:
+    """
+    Read a PDF's page count and document info from its trailer and xref table.
+
+    Only the file tail, the cross-reference entries of the needed objects and
+    those objects themselves are read. PDFs using cross-reference streams or
+    encryption, and PDFs whose page tree cannot be resolved this way, fall
+    back to PyPDF2.
+
+    Returns:
+        Dict[str, Any]: ``pages``, ``title``, ``author``, ``subject`` and ``keywords``
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            pdf = _PdfFile(file)
+            pdf.load_xref()
+            if 'Encrypt' in pdf.trailer:
+                raise _Unsupported("Encrypted PDF")
+
+            root = pdf.resolve(pdf.trailer.get('Root'))
+            pages = pdf.resolve(root.get('Pages')) if isinstance(root, dict) else None
+            count = pdf.resolve(pages.get('Count')) if isinstance(pages, dict) else None
+            if not isinstance(count, int):
+                # Stale xref offsets or objects inside object streams; PyPDF2 can repair or decode those
+                raise _Unsupported("PDF page tree not found")
+            info = pdf.resolve(pdf.trailer.get('Info')) or {}
+            if not isinstance(info, dict):
+                info = {}
+            return {
+                'pages': count,
+                'title': _decode_pdf_text(pdf.resolve(info.get('Title', ''))),
+                'author': _decode_pdf_text(pdf.resolve(info.get('Author', ''))),
+                'subject': _decode_pdf_text(pdf.resolve(info.get('Subject', ''))),
+                'keywords': _decode_pdf_text(pdf.resolve(info.get('Keywords', '')))
+            }
+    except (_Unsupported, ValueError, IndexError, AttributeError):
+        return _read_pdf_info_pypdf(file_path)
+
+
+def _read_pdf_info_pypdf(file_path: Path) -> Dict[str, Any]:
+    import PyPDF2
+
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        info = pdf_reader.metadata or {}
+        return {
+            'pages': len(pdf_reader.pages),
+            'title': info.get('/Title', ''),
+            'author': info.get('/Author', ''),
+            'subject': info.get('/Subject', ''),
+            'keywords': info.get('/Keywords', '')
+        }
+
+
+def read_pdf_text(file_path: Path, max_chars: int = 2000) -> str:
+    """
+    Extract up to ``max_chars`` characters of text from the first pages of a PDF.
+
+    Text extraction needs PyPDF2's content stream decoding; unreadable PDFs
+    yield an empty string.
+    """
+    text = []
+    length = 0
+    try:
+        import PyPDF2
+
+        with open(file_path, 'rb') as file:
+            for page in PyPDF2.PdfReader(file).pages:
+                page_text = page.extract_text() or ""
+                text.append(page_text)
+                length += len(page_text)
+                if length >= max_chars:
+                    break
+    except Exception:
+        return ""
+    return "".join(text)[:max_chars]
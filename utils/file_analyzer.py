@@ -1,120 +1,308 @@
+import os
 import magic
-import PyPDF2
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, Any, Optional
-import json
-import csv
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+import threading
 from datetime import datetime
-from config import FILE_CATEGORIES, MAX_FILE_SIZE
+from config import MAX_FILE_SIZE, SCAN_WORKERS, SCAN_BATCH_SIZE, SCAN_PARALLEL_THRESHOLD
+from utils.analysis_cache import AnalysisCache, retarget_analysis
+from utils.dedup import DuplicateDetector, DuplicateMatch
+from utils.classification import get_classification_index
+from utils.extractors import read_pdf_info, scan_csv, scan_json
+from utils.metrics import EXTRACT_SECONDS, STAGE_SECONDS
+
+PathWithStat = Tuple[Path, Optional[os.stat_result]]
+
+
+def iter_files(root: Path, recursive: bool = False,
+               excluded: Iterable[Path] = ()) -> Iterator[Tuple[Path, os.stat_result]]:
+    """
+    Yield (path, stat) for the files under ``root`` using ``os.scandir``.
+    
+    Hidden directories (such as the organizer's own ``.cache``) and the
+    ``excluded`` directories (such as its ``LOG_DIR``) are skipped when
+    recursing.
+    """
+    skipped = {os.path.abspath(str(directory)) for directory in excluded}
+    directories = [str(root)]
+    while directories:
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            yield Path(entry.path), entry.stat()
+                        elif (recursive and entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.')
+                              and os.path.abspath(entry.path) not in skipped):
+                            directories.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+# One analyzer (and libmagic handle) per pool worker process
+_worker_analyzer = None
+
+
+def _init_worker() -> None:
+    global _worker_analyzer
+    _worker_analyzer = FileAnalyzer()
+
+
+def _analyze_batch(batch: List[Tuple[str, os.stat_result]]) -> List[Tuple[str, os.stat_result, Dict[str, Any]]]:
+    return [(path, stat, _worker_analyzer.analyze_file(Path(path), stat)) for path, stat in batch]
+
 
 class FileAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: Optional[AnalysisCache] = None,
+                 dedup: Optional[DuplicateDetector] = None):
+        self.cache = cache
+        self.dedup = dedup
+        self.index = get_classification_index()
         self.mime = magic.Magic(mime=True)
+        # libmagic handles are not thread-safe; the ingest workers share one analyzer
+        self._mime_lock = threading.Lock()
         
-    def analyze_file(self, file_path: Path) -> Dict[str, Any]:
+    def analyze_file(self, file_path: Path, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
         Analyze a file and return detailed information about it.
         
         Args:
             file_path (Path): Path to the file
+            stat (Optional[os.stat_result]): Stat of the file if the caller already has it
             
         Returns:
             Dict[str, Any]: Dictionary containing file analysis results
         """
         try:
-            file_size = file_path.stat().st_size
-            if file_size > MAX_FILE_SIZE:
-                return {
-                    "error": "File too large",
-                    "size": file_size,
-                    "max_size": MAX_FILE_SIZE
-                }
-            
-            mime_type = self.mime.from_file(str(file_path))
+            with STAGE_SECONDS.time(stage="analyze"):
+                return self._analyze(file_path, stat)
+        except Exception as e:
+            return {
+                "error": str(e),
+                "path": str(file_path)
+            }
+    
+    def _analyze(self, file_path: Path, stat: Optional[os.stat_result]) -> Dict[str, Any]:
+        """``analyze_file`` without the timing and error handling."""
+        if stat is None:
+            stat = os.stat(file_path)
+        file_size = stat.st_size
+        if file_size > MAX_FILE_SIZE:
+            return {
+                "error": "File too large",
+                "path": str(file_path),
+                "size": file_size,
+                "max_size": MAX_FILE_SIZE
+            }
+        
+        # Unchanged files are answered from the cache without being opened
+        cached = self._cached(file_path, stat)
+        if cached is not None:
+            return cached
+        
+        # Copies of an analyzed file reuse its analysis
+        match = self.dedup.find(file_path, stat) if self.dedup is not None else None
+        if match is not None and match.exact and match.record.analysis is not None:
+            return self._reuse(match, file_path, stat)
+        
+        analysis = self._analyze_uncached(file_path, stat)
+        if match is not None and not match.exact and "error" not in analysis:
+            analysis.update(near_duplicate_of=match.record.path, similarity=round(match.similarity, 3))
+        self._remember(file_path, stat, analysis)
+        return analysis
+    
+    def _analyze_uncached(self, file_path: Path, stat: os.stat_result) -> Dict[str, Any]:
+        """Sniff the MIME type and extract metadata, without consulting the cache."""
+        try:
+            with self._mime_lock, STAGE_SECONDS.time(stage="mime"):
+                mime_type = self.mime.from_file(str(file_path))
             category = self._determine_category(file_path, mime_type)
+            with EXTRACT_SECONDS.time(mime_type=mime_type):
+                metadata = self._extract_metadata(file_path, mime_type)
             
-            analysis = {
+            return {
                 "name": file_path.name,
                 "path": str(file_path),
-                "size": file_size,
+                "size": stat.st_size,
                 "mime_type": mime_type,
                 "category": category,
-                "created": datetime.fromtimestamp(file_path.stat().st_ctime).isoformat(),
-                "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
+                "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
+                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 "extension": file_path.suffix.lower(),
-                "metadata": self._extract_metadata(file_path, mime_type)
+                "metadata": metadata
             }
-            
-            return analysis
-            
         except Exception as e:
             return {
                 "error": str(e),
                 "path": str(file_path)
             }
     
-    def _determine_category(self, file_path: Path, mime_type: str) -> str:
-        """Determine the category of a file based on its extension and mime type."""
-        extension = file_path.suffix.lower()
+    def scan_directory(self, root: Path, recursive: bool = False,
+                       workers: int = SCAN_WORKERS, excluded: Iterable[Path] = ()) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze every file under a directory (see ``analyze_many``).
         
-        # First try to match by extension
-        for category, info in FILE_CATEGORIES.items():
-            if extension in info["extensions"]:
-                return category
+        Args:
+            root (Path): Directory to scan
+            recursive (bool): Whether to descend into subdirectories
+            workers (int): Worker processes for files missing from the cache
+            excluded (Iterable[Path]): Subdirectories not to descend into
+            
+        Returns:
+            Iterator[Dict[str, Any]]: Analyses in completion order
+        """
+        return self.analyze_many(iter_files(root, recursive, excluded), workers=workers)
+    
+    def analyze_many(self, paths: Iterable[Union[Path, PathWithStat]],
+                     workers: int = SCAN_WORKERS) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze many files, yielding results as they complete.
         
-        # Then try to match by mime type
-        mime_prefix = mime_type.split('/')[0]
-        if mime_prefix == 'image':
-            return "Images"
-        elif mime_prefix == 'video' or mime_prefix == 'audio':
-            return "Media"
-        elif mime_prefix == 'text':
-            if any(ext in extension for ext in ['.py', '.js', '.java', '.cpp', '.c', '.h', '.html', '.css', '.php', '.rb']):
-                return "Code"
-            return "Documents"
-        elif mime_prefix == 'application':
-            if 'pdf' in mime_type:
-                return "Documents"
-            elif 'zip' in mime_type or 'rar' in mime_type or '7z' in mime_type:
-                return "Archives"
-            elif any(ext in extension for ext in ['.csv', '.json', '.xml', '.yaml', '.yml', '.sql', '.db']):
-                return "Data"
+        Cached files are answered in this process without opening them. Once
+        more than ``SCAN_PARALLEL_THRESHOLD`` files need real analysis, they are
+        sent in batches to a process pool with one libmagic handle per worker;
+        smaller sets are analyzed inline to avoid the pool start-up cost.
         
-        return "Other"
+        Args:
+            paths (Iterable[Union[Path, PathWithStat]]): Paths, or (path, stat)
+                pairs as produced by ``iter_files``
+            workers (int): Maximum worker processes
+            
+        Returns:
+            Iterator[Dict[str, Any]]: Analyses in completion order
+        """
+        pending: List[Tuple[str, os.stat_result]] = []
+        followers: Dict[str, List[Tuple[Path, os.stat_result]]] = {}
+        near: Dict[str, DuplicateMatch] = {}
+        executor = None
+        futures = set()
+        try:
+            for item in paths:
+                file_path, stat = item if isinstance(item, tuple) else (item, None)
+                file_path = Path(file_path)
+                try:
+                    if stat is None:
+                        stat = os.stat(file_path)
+                except OSError as e:
+                    yield {"error": str(e), "path": str(file_path)}
+                    continue
+                
+                if stat.st_size > MAX_FILE_SIZE:
+                    yield self.analyze_file(file_path, stat)
+                    continue
+                cached = self._cached(file_path, stat)
+                if cached is not None:
+                    yield cached
+                    continue
+                
+                if self.dedup is not None:
+                    match = self.dedup.find(file_path, stat)
+                    if match is not None and match.exact:
+                        if match.record.analysis is not None:
+                            yield self._reuse(match, file_path, stat)
+                        else:
+                            # The original is still being analyzed; answer the copy with it
+                            followers.setdefault(match.record.path, []).append((file_path, stat))
+                        continue
+                    if match is not None:
+                        near[str(file_path)] = match
+                    self.dedup.add(file_path, stat)
+                
+                pending.append((str(file_path), stat))
+                if executor is None and workers > 1 and len(pending) > SCAN_PARALLEL_THRESHOLD:
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                if executor is not None:
+                    while len(pending) >= SCAN_BATCH_SIZE:
+                        batch, pending = pending[:SCAN_BATCH_SIZE], pending[SCAN_BATCH_SIZE:]
+                        futures.add(executor.submit(_analyze_batch, batch))
+                    # Keep a bounded number of batches in flight
+                    while len(futures) >= workers * 2:
+                        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                        yield from self._collect(done, followers, near)
+            
+            if executor is None:
+                for path, stat in pending:
+                    analysis = self._analyze_uncached(Path(path), stat)
+                    yield from self._finish(path, stat, analysis, followers, near)
+                return
+            
+            if pending:
+                futures.add(executor.submit(_analyze_batch, pending))
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                yield from self._collect(done, followers, near)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _collect(self, done, followers, near) -> Iterator[Dict[str, Any]]:
+        for future in done:
+            for path, stat, analysis in future.result():
+                yield from self._finish(path, stat, analysis, followers, near)
+    
+    def _finish(self, path: str, stat: os.stat_result, analysis: Dict[str, Any],
+                followers: Dict[str, List[Tuple[Path, os.stat_result]]],
+                near: Dict[str, DuplicateMatch]) -> Iterator[Dict[str, Any]]:
+        match = near.pop(path, None)
+        if match is not None and "error" not in analysis:
+            analysis.update(near_duplicate_of=match.record.path, similarity=round(match.similarity, 3))
+        self._remember(Path(path), stat, analysis)
+        yield analysis
+        record = self.dedup.get(path) if self.dedup is not None else None
+        for file_path, file_stat in followers.pop(path, ()):
+            if record is None or record.analysis is None:
+                yield self.analyze_file(file_path, file_stat)
+            else:
+                yield self._reuse(DuplicateMatch(record, True, 1.0), file_path, file_stat)
+    
+    def _cached(self, file_path: Path, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(file_path, stat)
+        if cached is not None and self.dedup is not None and "duplicate_of" not in cached:
+            self.dedup.add(file_path, stat, cached)
+        return cached
+    
+    def _remember(self, file_path: Path, stat: os.stat_result, analysis: Dict[str, Any]) -> None:
+        if "error" in analysis:
+            if self.dedup is not None:
+                self.dedup.forget(file_path)
+            return
+        if self.cache is not None:
+            self.cache.put(file_path, stat, analysis)
+        if self.dedup is not None:
+            self.dedup.add(file_path, stat, analysis)
+    
+    def _reuse(self, match: DuplicateMatch, file_path: Path, stat: os.stat_result) -> Dict[str, Any]:
+        analysis = retarget_analysis(match.record.analysis, file_path, stat)
+        analysis.pop("near_duplicate_of", None)
+        analysis.pop("similarity", None)
+        analysis["duplicate_of"] = match.record.path
+        if self.cache is not None:
+            self.cache.put(file_path, stat, analysis)
+        return analysis
+    
+    def _determine_category(self, file_path: Path, mime_type: str) -> str:
+        """Determine the category of a file based on its extension and mime type."""
+        return self.index.classify(file_path.suffix, mime_type)
     
     def _extract_metadata(self, file_path: Path, mime_type: str) -> Dict[str, Any]:
-        """Extract metadata from files based on their type."""
+        """Extract metadata from files based on their type, streaming so memory stays bounded."""
         metadata = {}
         
         try:
             if mime_type == 'application/pdf':
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    metadata = {
-                        'pages': len(pdf_reader.pages),
-                        'title': pdf_reader.metadata.get('/Title', ''),
-                        'author': pdf_reader.metadata.get('/Author', ''),
-                        'subject': pdf_reader.metadata.get('/Subject', ''),
-                        'keywords': pdf_reader.metadata.get('/Keywords', '')
-                    }
+                metadata = read_pdf_info(file_path)
             
             elif mime_type == 'text/csv':
-                with open(file_path, 'r') as file:
-                    csv_reader = csv.reader(file)
-                    headers = next(csv_reader, [])
-                    row_count = sum(1 for row in csv_reader)
-                    metadata = {
-                        'headers': headers,
-                        'row_count': row_count
-                    }
+                metadata = scan_csv(file_path)
             
             elif mime_type == 'application/json':
-                with open(file_path, 'r') as file:
-                    data = json.load(file)
-                    metadata = {
-                        'type': type(data).__name__,
-                        'size': len(str(data))
-                    }
+                metadata = scan_json(file_path)
         
         except Exception as e:
             metadata['error'] = str(e)
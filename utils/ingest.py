@@ -0,0 +1,225 @@
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from config import INGEST_QUEUE_SIZE, INGEST_WORKERS, INGEST_SUBMIT_TIMEOUT
+from utils.logger import log_context
+from utils.metrics import INGEST_QUEUE_DEPTH, STAGE_SECONDS
+
+_STOP = object()
+
+
+class _Shard:
+    """One queue and the worker threads draining it."""
+
+    __slots__ = ("key", "process", "workers", "queue", "threads")
+
+    def __init__(self, key: Optional[Hashable], process: Callable[[Path], Any], workers: int, max_queue: int):
+        self.key = key
+        self.process = process
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self.threads: List[threading.Thread] = []
+
+
+class IngestPipeline:
+    """
+    Bounded work queues feeding pools of worker threads.
+
+    The watchdog observer thread calls ``submit`` for every new file. When the
+    queue is full the observer blocks (up to ``submit_timeout`` seconds), which
+    applies backpressure instead of letting pending work grow without bound.
+    Results and errors are reported through callbacks, which run on the worker
+    threads; GUI code should forward them through Qt signals.
+
+    Work can be split into shards (one per watched folder) with
+    ``add_shard``; each shard has its own queue, workers and process
+    function, so a burst of files in one folder does not hold up the others.
+    Without shards, one queue with ``workers`` threads takes everything.
+    """
+
+    def __init__(self, process: Callable[[Path], Any],
+                 workers: int = INGEST_WORKERS,
+                 max_queue: int = INGEST_QUEUE_SIZE,
+                 submit_timeout: Optional[float] = INGEST_SUBMIT_TIMEOUT,
+                 on_result: Optional[Callable[[Path, Any], None]] = None,
+                 on_error: Optional[Callable[[Path, Exception], None]] = None,
+                 on_depth: Optional[Callable[[int, int], None]] = None):
+        self.process = process
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.submit_timeout = submit_timeout
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_depth = on_depth
+
+        self._shards: Dict[Optional[Hashable], _Shard] = {}
+        self._pending: Dict[Path, Optional[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._running = False
+
+    def add_shard(self, key: Hashable, process: Optional[Callable[[Path], Any]] = None,
+                  workers: Optional[int] = None, max_queue: Optional[int] = None) -> None:
+        """
+        Add a shard with its own queue and workers; call before ``start``.
+
+        Args:
+            key (Hashable): Shard key passed to ``submit``, e.g. the watched folder
+            process (Optional[Callable]): Processing function (default: the pipeline's)
+            workers (Optional[int]): Worker threads of the shard (default: ``workers``)
+            max_queue (Optional[int]): Queue size of the shard (default: ``max_queue``)
+        """
+        if self._running:
+            raise RuntimeError("Shards must be added before the pipeline starts")
+        self._shards[key] = _Shard(key, process or self.process, workers or self.workers,
+                                   max_queue or self.max_queue)
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        if self._running:
+            return
+        if not self._shards:
+            self._shards[None] = _Shard(None, self.process, self.workers, self.max_queue)
+        self._running = True
+        for shard in self._shards.values():
+            for index in range(shard.workers):
+                name = f"ingest-worker-{index}" if shard.key is None else f"ingest-{shard.key}-{index}"
+                thread = threading.Thread(target=self._worker, args=(shard,), name=name, daemon=True)
+                thread.start()
+                shard.threads.append(thread)
+
+    def submit(self, file_path: Path, shard: Optional[Hashable] = None) -> bool:
+        """
+        Queue a file for processing.
+
+        Args:
+            file_path (Path): Path to the file
+            shard (Optional[Hashable]): Shard to queue it on; unknown keys use the first shard
+
+        Returns:
+            bool: False if the pipeline is stopped or the queue stayed full
+            for longer than ``submit_timeout``; True otherwise (including when
+            the file is already waiting in the queue)
+        """
+        if not self._running:
+            return False
+
+        file_path = Path(file_path)
+        target = self._shards.get(shard) or next(iter(self._shards.values()))
+        with self._lock:
+            if file_path in self._pending:
+                return True
+            self._pending[file_path] = target.key
+
+        try:
+            target.queue.put((file_path, time.perf_counter()), timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(file_path, None)
+            return False
+
+        self._notify_depth()
+        return True
+
+    def stop(self, wait: bool = True, drain: bool = True) -> int:
+        """
+        Stop the workers.
+
+        Args:
+            wait (bool): Wait for the worker threads to exit
+            drain (bool): Process the files already queued first; otherwise
+                they are discarded and only the files being processed finish
+
+        Returns:
+            int: Number of queued files discarded
+        """
+        if not self._running:
+            return 0
+        self._running = False
+        discarded = 0
+        for shard in self._shards.values():
+            if not drain:
+                discarded += self._discard(shard)
+            for _ in shard.threads:
+                shard.queue.put(_STOP)
+        if wait:
+            for shard in self._shards.values():
+                for thread in shard.threads:
+                    thread.join()
+        for shard in self._shards.values():
+            shard.threads = []
+        if discarded:
+            self._notify_depth()
+        return discarded
+
+    @property
+    def depth(self) -> int:
+        """Number of files waiting in the queues."""
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def active(self) -> int:
+        """Number of files currently being processed."""
+        with self._lock:
+            return self._active
+
+    def shard_depths(self) -> Dict[str, int]:
+        """Files waiting per shard."""
+        with self._lock:
+            depths = {str(key): 0 for key in self._shards}
+            for key in self._pending.values():
+                depths[str(key)] += 1
+        return depths
+
+    def _discard(self, shard: _Shard) -> int:
+        discarded = 0
+        while True:
+            try:
+                item = shard.queue.get_nowait()
+            except queue.Empty:
+                return discarded
+            shard.queue.task_done()
+            if item is not _STOP:
+                with self._lock:
+                    self._pending.pop(item[0], None)
+                discarded += 1
+
+    def _worker(self, shard: _Shard) -> None:
+        while True:
+            item = shard.queue.get()
+            if item is _STOP:
+                shard.queue.task_done()
+                return
+            item, queued_at = item
+            STAGE_SECONDS.observe(time.perf_counter() - queued_at, stage="queue_wait")
+
+            with self._lock:
+                self._pending.pop(item, None)
+                self._active += 1
+            self._notify_depth()
+
+            # Everything logged about this file shares one correlation id
+            with log_context():
+                try:
+                    result = shard.process(item)
+                    if self.on_result:
+                        self.on_result(item, result)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(item, e)
+                finally:
+                    with self._lock:
+                        self._active -= 1
+                    shard.queue.task_done()
+                    self._notify_depth()
+
+    def _notify_depth(self) -> None:
+        with self._lock:
+            queued, active = len(self._pending), self._active
+        INGEST_QUEUE_DEPTH.set(queued)
+        if self.on_depth:
+            self.on_depth(queued, active)
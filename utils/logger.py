@@ -1,41 +1,200 @@
+"""
+Logging setup.
+
+Records are put on an in-memory queue by the calling thread and written by
+a single background listener, so logging never waits on the disk in the
+watchdog, ingest or GUI threads. Messages are formatted by the listener as
+well; pass arguments ``%``-style (``logger.info("Moved %s", path)``) so
+disabled levels cost nothing. The log file is JSON lines, rotated by size
+and age, and every record made inside ``log_context`` carries its
+correlation id, so all lines about one file can be grouped.
+"""
+import atexit
+import contextvars
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from config import LOG_FILE, LOG_FORMAT, LOG_LEVEL
+from typing import Any, Dict, Iterator, Optional
+
+from config import (
+    LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_JSON, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL,
+    LOG_BACKUP_COUNT, ensure_directories
+)
+
+# Correlation id of the work the current thread (or task) is doing
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_setup_lock = threading.Lock()
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def current_correlation_id() -> Optional[str]:
+    return _correlation_id.get()
+
+
+@contextmanager
+def log_context(correlation_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Tag every record logged inside the block with a correlation id.
+
+    Args:
+        correlation_id (Optional[str]): Id to reuse, e.g. one captured before
+            handing work to another thread; a new one is made if omitted
+
+    Returns:
+        Iterator[str]: The correlation id in effect
+    """
+    correlation_id = correlation_id or new_correlation_id()
+    token = _correlation_id.set(correlation_id)
+    try:
+        yield correlation_id
+    finally:
+        _correlation_id.reset(token)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Queues records without formatting them; the caller's correlation id is captured here."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.correlation_id = _correlation_id.get()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, correlation id and ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id:
+            entry["correlation_id"] = correlation_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key != "correlation_id":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RotatingLogFileHandler(RotatingFileHandler):
+    """
+    Rotates when the file reaches ``max_bytes`` or is ``interval`` seconds old, whichever is first.
+
+    Like ``TimedRotatingFileHandler``, the age of a file left by an earlier
+    run counts from its last modification, so short-lived processes (the
+    CLI) still rotate it.
+    """
+
+    def __init__(self, filename: Path, max_bytes: int = LOG_MAX_BYTES, interval: float = LOG_ROTATE_INTERVAL,
+                 backup_count: int = LOG_BACKUP_COUNT):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.rollover_at = None
+        if interval:
+            try:
+                started = os.stat(self.baseFilename).st_mtime
+            except OSError:
+                started = time.time()
+            self.rollover_at = started + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
 
 def setup_logger(name: str) -> logging.Logger:
     """
-    Set up a logger with both file and console handlers.
-    
+    Set up a logger writing to the log file and the console.
+
+    Safe to call repeatedly and for several names: one queue listener owns
+    the file and console handlers, and each logger gets one queue handler.
+    Child loggers (``FileOrganizer.daemon``) use their parent's handler.
+
     Args:
         name (str): Name of the logger
-        
+
     Returns:
         logging.Logger: Configured logger instance
     """
+    global _listener, _queue_handler
     logger = logging.getLogger(name)
-    logger.setLevel(LOG_LEVEL)
-    
-    # Create formatters
-    formatter = logging.Formatter(LOG_FORMAT)
-    
-    # File handler
-    file_handler = logging.FileHandler(LOG_FILE)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+    with _setup_lock:
+        if _listener is None:
+            ensure_directories()
+            file_handler = RotatingLogFileHandler(LOG_FILE)
+            file_handler.setFormatter(JsonFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT))
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+            if _queue_handler is None:
+                _queue_handler = _LazyQueueHandler(queue.SimpleQueue())
+            _listener = QueueListener(_queue_handler.queue, file_handler, console_handler,
+                                      respect_handler_level=True)
+            _listener.start()
+        if not _reaches_queue(logger):
+            logger.setLevel(LOG_LEVEL)
+            logger.addHandler(_queue_handler)
     return logger
 
-def log_file_operation(logger: logging.Logger, operation: str, file_path: Path, 
+
+def _reaches_queue(logger: logging.Logger) -> bool:
+    """Whether the logger or an ancestor it propagates to already has the queue handler."""
+    current: Optional[logging.Logger] = logger
+    while current is not None:
+        if _queue_handler in current.handlers:
+            return True
+        if not current.propagate:
+            return False
+        current = current.parent
+    return False
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """Write out the queued records and close the log file (also run at exit)."""
+    global _listener
+    with _setup_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def log_file_operation(logger: logging.Logger, operation: str, file_path: Path,
                       success: bool, error: Exception = None) -> None:
     """
     Log file operations with consistent formatting.
-    
+
     Args:
         logger (logging.Logger): Logger instance
         operation (str): Type of operation (e.g., "move", "copy", "delete")
@@ -43,10 +202,9 @@ def log_file_operation(logger: logging.Logger, operation: str, file_path: Path,
         success (bool): Whether the operation was successful
         error (Exception, optional): Exception if operation failed
     """
-    status = "SUCCESS" if success else "FAILED"
-    message = f"File {operation.upper()} - {status} - {file_path}"
-    
+    extra = {"operation": operation, "path": str(file_path), "success": success}
     if success:
-        logger.info(message)
+        logger.info("File %s - SUCCESS - %s", operation.upper(), file_path, extra=extra)
     else:
-        logger.error(f"{message} - Error: {str(error)}") 
\ No newline at end of file
+        logger.error("File %s - FAILED - %s - Error: %s", operation.upper(), file_path, error,
+                     extra=dict(extra, error=str(error)))
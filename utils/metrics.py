@@ -0,0 +1,393 @@
+"""
+In-process metrics for the organizer pipeline.
+
+Stages record into module-level histograms and counters (``STAGE_SECONDS``,
+``LLM_TOKENS``, ...) held by ``REGISTRY``. ``MetricsServer`` serves them
+locally as Prometheus text (``/metrics``) or JSON (``/metrics.json``), and
+an opt-in ``SamplingProfiler`` adds collapsed stacks at ``/profile``.
+Recording is a lock and a few additions, cheap enough for every file.
+Files analyzed in ``analyze_many``'s worker processes are not recorded.
+"""
+import bisect
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import METRICS_HOST, METRICS_PORT, PROFILER_ENABLED, PROFILER_INTERVAL, PROFILER_MAX_DEPTH
+
+# Seconds; spans libmagic sniffs (sub-millisecond) to slow model requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labels, key))
+
+    def samples(self) -> List[Sample]:
+        """Return (name suffix, labels, value) for every label combination."""
+        with self._lock:
+            return [("", self._labels(key), value) for key, value in self._values.items()]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [{"labels": labels, "value": value} for _, labels, value in self.samples()]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label combination."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; ``set_function`` reads it at export time instead."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[Sample]:
+        if self._function is not None:
+            return [("", {}, float(self._function()))]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds unless stated) in fixed buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the ``with`` block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            states = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in states:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", dict(labels, le=_format(bound)), cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            states = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        return [
+            {"labels": self._labels(key), "count": sum(counts), "sum": total,
+             "mean": total / sum(counts) if sum(counts) else 0.0,
+             "p50": self._quantile(counts, 0.5), "p95": self._quantile(counts, 0.95),
+             "p99": self._quantile(counts, 0.99)}
+            for key, counts, total in states
+        ]
+
+    def _quantile(self, counts: List[int], q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the largest bound for the +Inf bucket)."""
+        rank = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return 0.0
+
+
+class MetricsRegistry:
+    """Named metrics, created once and shared by every module that records into them."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def counter(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, description, labels)
+
+    def gauge(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._get(Gauge, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Histogram:
+        return self._get(Histogram, name, description, labels)
+
+    def _get(self, kind: type, name: str, description: str, labels: Tuple[str, ...]) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(name, description, labels)
+            elif not isinstance(metric, kind):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                rendered = ",".join(f'{name}="{_escape(label)}"' for name, label in labels.items())
+                lines.append(f"{metric.name}{suffix}{{{rendered}}} {_format(value)}" if rendered
+                             else f"{metric.name}{suffix} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return every metric as JSON-serializable data; histograms carry count, mean and bucket quantiles."""
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "metrics": {
+                metric.name: {"type": metric.kind, "help": metric.description, "values": metric.snapshot()}
+                for metric in list(self._metrics.values())
+            }
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "organizer_stage_seconds",
+    "Time spent per pipeline stage (analyze, mime, process, queue_wait, plan_parse, move)", ("stage",))
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "organizer_extract_metadata_seconds", "Metadata extraction time by MIME type", ("mime_type",))
+LLM_SECONDS = REGISTRY.histogram(
+    "organizer_llm_request_seconds", "Chat model request latency", ("mode",))
+FILES_PROCESSED = REGISTRY.counter(
+    "organizer_files_processed_total", "New downloads processed, by outcome", ("outcome",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "organizer_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+LLM_TOKENS = REGISTRY.counter(
+    "organizer_llm_tokens_total", "Estimated chat model tokens sent (in) and received (out)", ("direction",))
+LLM_RETRIES = REGISTRY.counter(
+    "organizer_llm_retries_total", "Chat model requests retried after an error")
+MOVED_BYTES = REGISTRY.counter(
+    "organizer_moved_bytes_total", "Bytes moved, by transfer method", ("method",))
+INGEST_QUEUE_DEPTH = REGISTRY.gauge(
+    "organizer_ingest_queue_depth", "Files waiting in the ingest queue")
+REGISTRY.gauge("organizer_uptime_seconds", "Seconds since the process started").set_function(
+    lambda: time.time() - REGISTRY.started)
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler for finding the throughput ceiling.
+
+    A background thread records the stack of every other thread each
+    ``interval`` seconds. ``collapsed`` returns the counts in the collapsed
+    stack format read by flamegraph.pl and speedscope; ``top`` lists the
+    functions most often on top of a stack. Nothing is traced between samples.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_depth: int = PROFILER_MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: Tally = Tally()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def collapsed(self) -> str:
+        """Return ``thread;outer;...;inner count`` lines, most frequent first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def top(self, count: int = 20) -> List[Tuple[str, float]]:
+        """Return the functions most often executing when sampled, with their share of samples."""
+        with self._lock:
+            leaves: Tally = Tally()
+            for stack, hits in self._stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += hits
+            total = sum(leaves.values())
+        return [(function, hits / total) for function, hits in leaves.most_common(count)]
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                functions = []
+                while frame is not None and len(functions) < self.max_depth:
+                    code = frame.f_code
+                    functions.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                functions.append(names.get(ident, str(ident)))
+                sampled.append(";".join(reversed(functions)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint for the metrics.
+
+    ``GET /metrics`` returns Prometheus text, ``/metrics.json`` the JSON
+    snapshot and ``/profile`` (``?top=1`` for the hottest functions) the
+    profiler's samples when a profiler is attached. Binds to localhost by default.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = METRICS_HOST,
+                 port: int = METRICS_PORT, profiler: Optional[SamplingProfiler] = None):
+        from http.server import ThreadingHTTPServer
+
+        self.registry = registry
+        self.profiler = profiler
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port actually bound (useful with port 0)."""
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        if self.profiler is not None:
+            self.profiler.start()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def _handler(self) -> type:
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                path, _, query = self.path.partition("?")
+                if path == "/metrics":
+                    self._send(server.registry.render_prometheus(), "text/plain; version=0.0.4")
+                elif path == "/metrics.json":
+                    self._send(json.dumps(server.registry.snapshot()), "application/json")
+                elif path == "/profile" and server.profiler is not None:
+                    if "top" in query:
+                        body = "".join(f"{share:6.1%}  {function}\n" for function, share in server.profiler.top())
+                    else:
+                        body = server.profiler.collapsed()
+                    self._send(body, "text/plain")
+                else:
+                    self.send_error(404)
+
+            def _send(self, body: str, content_type: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def start_metrics_server(profile: bool = PROFILER_ENABLED) -> MetricsServer:
+    """Start a ``MetricsServer`` for ``REGISTRY``, with a running profiler if ``profile`` is set."""
+    server = MetricsServer(profiler=SamplingProfiler() if profile else None)
+    server.start()
+    host, port = server.address
+    logging.getLogger("FileOrganizer.metrics").info(
+        f"Serving metrics at http://{host}:{port}/metrics" + (" (profiling)" if profile else ""))
+    return server
@@ -0,0 +1,465 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import MOVE_JOURNAL_DIR, MOVE_WORKERS
+from utils.transfer import move_file
+
+
+class MoveOperation:
+    """A planned move with its collision-free destination."""
+
+    __slots__ = ("op_id", "source", "destination", "same_device")
+
+    def __init__(self, op_id: int, source: Path, destination: Path, same_device: bool):
+        self.op_id = op_id
+        self.source = Path(source)
+        self.destination = Path(destination)
+        self.same_device = same_device
+
+    def __repr__(self) -> str:
+        return f"MoveOperation({self.op_id}, {str(self.source)!r} -> {str(self.destination)!r})"
+
+
+def unique_name(name: str, taken: Set[str]) -> str:
+    """Return ``name``, or ``stem_N.suffix`` with the first N that is not in ``taken``."""
+    if name not in taken:
+        return name
+    path = Path(name)
+    counter = 1
+    while f"{path.stem}_{counter}{path.suffix}" in taken:
+        counter += 1
+    return f"{path.stem}_{counter}{path.suffix}"
+
+
+def free_path(directory: Path, name: str) -> Path:
+    """Return ``directory / name``, or the ``unique_name`` variant of it if that is taken."""
+    path = directory / name
+    if not os.path.lexists(path):
+        return path
+    return directory / unique_name(name, set(os.listdir(directory)))
+
+
+class _Journal:
+    """Append-only JSON-lines record of a move run."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a+", encoding="utf-8")
+        # Terminate a line torn by a crash so the next record starts cleanly
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record: Dict[str, Any], sync: bool = False) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def read_journal(journal_path: Path) -> Dict[str, Any]:
+    """
+    Replay a journal into the state of its run.
+
+    Returns:
+        Dict[str, Any]: ``operations`` (op id -> MoveOperation), ``done``,
+        ``failed`` and ``undone`` op id sets, ``directories`` created by the
+        run, and the ``complete``/``rolled_back`` flags
+    """
+    state = {
+        "operations": {}, "done": set(), "failed": {}, "undone": set(),
+        "directories": [], "complete": False, "rolled_back": False
+    }
+    with open(journal_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write
+                continue
+            kind = record.get("type")
+            if kind == "plan":
+                state["operations"][record["op"]] = MoveOperation(
+                    record["op"], Path(record["source"]), Path(record["destination"]),
+                    record.get("same_device", True)
+                )
+            elif kind == "mkdir":
+                state["directories"].append(record["path"])
+            elif kind == "done":
+                state["done"].add(record["op"])
+                state["failed"].pop(record["op"], None)
+            elif kind == "failed":
+                state["failed"][record["op"]] = record.get("error", "")
+            elif kind == "undone":
+                state["undone"].add(record["op"])
+            elif kind == "complete":
+                state["complete"] = True
+            elif kind == "rolled_back":
+                state["rolled_back"] = True
+    return state
+
+
+class MoveExecutor:
+    """
+    Plans and executes batches of file moves with a journal for resume and undo.
+
+    ``plan`` resolves every destination up front: each destination directory
+    is listed once and name collisions are settled in memory, and moves that
+    stay on one filesystem are marked for a plain rename. ``execute`` creates
+    the directories in one pass, runs the moves on a thread pool and records
+    each step in an append-only journal, so a run that dies halfway can be
+    finished with ``resume`` or reverted with ``undo``.
+    """
+
+    def __init__(self, journal_dir: Path = MOVE_JOURNAL_DIR, workers: int = MOVE_WORKERS):
+        self.journal_dir = Path(journal_dir)
+        self.workers = workers
+
+    def plan(self, moves: Iterable[Tuple[Path, Path]]) -> List[MoveOperation]:
+        """
+        Resolve a set of moves into collision-free operations.
+
+        Args:
+            moves (Iterable[Tuple[Path, Path]]): (source, requested destination) pairs
+
+        Returns:
+            List[MoveOperation]: Operations in input order; moves onto themselves are dropped
+        """
+        resolver = _DestinationResolver()
+        operations = []
+        for source, destination in moves:
+            op = resolver.resolve(len(operations), source, destination)
+            if op is not None:
+                operations.append(op)
+        return operations
+
+    def execute(self, operations: List[MoveOperation],
+                on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        Execute planned moves.
+
+        Args:
+            operations (List[MoveOperation]): Operations from ``plan``
+            on_progress (Optional[Callable]): Called with each operation and its
+                error (None on success), from the worker threads
+
+        Returns:
+            Dict[str, Any]: ``successful_moves``/``failed_moves`` as returned by
+            ``FileManagementAgent.execute_organization`` plus the ``journal`` path
+        """
+        journal = self._new_journal()
+        try:
+            journal.write({"type": "start", "timestamp": datetime.now().isoformat()})
+            for op in operations:
+                journal.write({
+                    "type": "plan", "op": op.op_id, "source": str(op.source),
+                    "destination": str(op.destination), "same_device": op.same_device
+                })
+            journal.write({"type": "planned", "count": len(operations)}, sync=True)
+            return self._run(journal, operations, on_progress)
+        finally:
+            journal.close()
+
+    def execute_stream(self, moves: Iterable[Tuple[Path, Path]],
+                       on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        Plan and execute moves as they arrive, e.g. while a plan is still being streamed.
+
+        Each move is resolved against the destinations planned so far,
+        journaled and handed to the thread pool right away, so the first
+        files move before the last ones are known.
+
+        Args:
+            moves (Iterable[Tuple[Path, Path]]): (source, requested destination) pairs
+            on_progress (Optional[Callable]): As for ``execute``
+
+        Returns:
+            Dict[str, Any]: As for ``execute``
+        """
+        journal = self._new_journal()
+        results = self._results(journal)
+        results_lock = threading.Lock()
+        resolver = _DestinationResolver()
+        created: Set[Path] = set()
+        count = 0
+        try:
+            journal.write({"type": "start", "timestamp": datetime.now().isoformat()})
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                try:
+                    for source, destination in moves:
+                        op = resolver.resolve(count, source, destination)
+                        if op is None:
+                            continue
+                        count += 1
+                        # The plan record must be durable before the move can happen
+                        journal.write({
+                            "type": "plan", "op": op.op_id, "source": str(op.source),
+                            "destination": str(op.destination), "same_device": op.same_device
+                        }, sync=True)
+                        directory = op.destination.parent
+                        if directory not in created:
+                            created.add(directory)
+                            if not directory.exists():
+                                for made in _makedirs(directory):
+                                    journal.write({"type": "mkdir", "path": str(made)})
+                        pool.submit(self._move, journal, op, results, results_lock, on_progress)
+                except Exception as e:
+                    # The moves already submitted still finish and stay undoable
+                    results["error"] = str(e)
+            journal.write({"type": "planned", "count": count})
+            journal.write({"type": "complete"}, sync=True)
+            return results
+        finally:
+            journal.close()
+
+    def resume(self, journal_path: Path,
+               on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        Finish an interrupted run, skipping moves that already happened.
+
+        A planned move whose source is gone and whose destination exists
+        happened before the crash could journal it; its destination was free
+        when the run was planned, so it counts as done.
+
+        Args:
+            journal_path (Path): Journal of the interrupted run
+
+        Returns:
+            Dict[str, Any]: Results of the remaining moves
+        """
+        state = read_journal(journal_path)
+        remaining = [
+            op for op_id, op in sorted(state["operations"].items())
+            if op_id not in state["done"] and op_id not in state["failed"]
+        ]
+        journal = _Journal(Path(journal_path))
+        try:
+            return self._run(journal, remaining, on_progress, resuming=True)
+        finally:
+            journal.close()
+
+    def undo(self, journal_path: Path) -> Dict[str, Any]:
+        """
+        Move every file of a run back to where it came from.
+
+        Moves that happened but were not journaled before an interruption are
+        detected by the destination existing while the source does not.
+
+        Args:
+            journal_path (Path): Journal of the run to revert
+
+        Returns:
+            Dict[str, Any]: ``restored`` and ``failed`` moves
+        """
+        state = read_journal(journal_path)
+        results = {"timestamp": datetime.now().isoformat(), "restored": [], "failed": [],
+                   "journal": str(journal_path)}
+        journal = _Journal(Path(journal_path))
+        try:
+            for op_id, op in sorted(state["operations"].items(), reverse=True):
+                if op_id in state["undone"]:
+                    continue
+                moved = op_id in state["done"] or (op.destination.exists() and not op.source.exists())
+                if not moved:
+                    continue
+                try:
+                    if op.source.exists():
+                        raise FileExistsError(f"{op.source} exists again, not overwriting it")
+                    op.source.parent.mkdir(parents=True, exist_ok=True)
+                    move_file(op.destination, op.source, try_rename=op.same_device)
+                    journal.write({"type": "undone", "op": op_id})
+                    results["restored"].append({"source": str(op.destination), "destination": str(op.source)})
+                except Exception as e:
+                    results["failed"].append({
+                        "source": str(op.destination), "destination": str(op.source), "error": str(e)
+                    })
+
+            # Remove directories the run created, deepest first, if they are empty again
+            for directory in sorted(state["directories"], key=lambda path: path.count(os.sep), reverse=True):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+            if not results["failed"]:
+                journal.write({"type": "rolled_back"})
+        finally:
+            journal.close()
+        return results
+
+    def journals(self) -> List[Path]:
+        """Return all journals, oldest first."""
+        if not self.journal_dir.exists():
+            return []
+        return sorted(self.journal_dir.glob("*.jsonl"))
+
+    def last_journal(self) -> Optional[Path]:
+        """Return the most recent journal that has not been rolled back."""
+        for journal_path in reversed(self.journals()):
+            if not read_journal(journal_path)["rolled_back"]:
+                return journal_path
+        return None
+
+    def interrupted(self) -> List[Path]:
+        """Return journals of runs that never completed and were not rolled back."""
+        found = []
+        for journal_path in self.journals():
+            state = read_journal(journal_path)
+            if not state["complete"] and not state["rolled_back"]:
+                found.append(journal_path)
+        return found
+
+    def _new_journal(self) -> _Journal:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        return _Journal(self.journal_dir / f"{datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}.jsonl")
+
+    @staticmethod
+    def _results(journal: _Journal) -> Dict[str, Any]:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "successful_moves": [],
+            "failed_moves": [],
+            "journal": str(journal.path)
+        }
+
+    def _run(self, journal: _Journal, operations: List[MoveOperation],
+             on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]],
+             resuming: bool = False) -> Dict[str, Any]:
+        results = self._results(journal)
+        results_lock = threading.Lock()
+
+        # Create every destination directory in one pass before any move starts
+        for directory in sorted({op.destination.parent for op in operations}):
+            if not directory.exists():
+                for created in _makedirs(directory):
+                    journal.write({"type": "mkdir", "path": str(created)})
+
+        if operations:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(operations)))) as pool:
+                list(pool.map(lambda op: self._move(journal, op, results, results_lock, on_progress, resuming),
+                              operations))
+        journal.write({"type": "complete"}, sync=True)
+        return results
+
+    @staticmethod
+    def _move(journal: _Journal, op: MoveOperation, results: Dict[str, Any], results_lock: threading.Lock,
+              on_progress: Optional[Callable[[MoveOperation, Optional[str]], None]],
+              resuming: bool = False) -> None:
+        error = None
+        try:
+            if not op.source.exists():
+                # Already moved by the interrupted attempt, which died before journaling it
+                if resuming and op.destination.exists():
+                    journal.write({"type": "done", "op": op.op_id})
+                    with results_lock:
+                        results["successful_moves"].append(
+                            {"source": str(op.source), "destination": str(op.destination)}
+                        )
+                    return
+                raise FileNotFoundError("Source file does not exist")
+            if os.path.lexists(op.destination):
+                raise FileExistsError(f"{op.destination} appeared after planning")
+            transfer = move_file(op.source, op.destination, try_rename=op.same_device)
+            journal.write({"type": "done", "op": op.op_id, "method": transfer.method})
+        except Exception as e:
+            transfer = None
+            error = str(e)
+            journal.write({"type": "failed", "op": op.op_id, "error": error})
+
+        entry = {"source": str(op.source), "destination": str(op.destination)}
+        if transfer is not None:
+            entry.update(method=transfer.method, bytes=transfer.size, throughput=transfer.throughput)
+        with results_lock:
+            if error is None:
+                results["successful_moves"].append(entry)
+            else:
+                entry["error"] = error
+                results["failed_moves"].append(entry)
+        if on_progress is not None:
+            on_progress(op, error)
+
+
+class _DestinationResolver:
+    """
+    Settles destination name collisions in memory.
+
+    Each destination directory is listed once, the first time a move targets it.
+    """
+
+    def __init__(self):
+        self._taken: Dict[Path, Set[str]] = {}
+        self._devices: Dict[Path, Optional[int]] = {}
+
+    def resolve(self, op_id: int, source: Path, destination: Path) -> Optional[MoveOperation]:
+        """Return the operation for a move, or None if it would move a file onto itself."""
+        source, destination = Path(source), Path(destination)
+        if source == destination:
+            return None
+        directory = destination.parent
+        if directory not in self._taken:
+            self._taken[directory] = _list_names(directory)
+            self._devices[directory] = _device_of(directory)
+        names = self._taken[directory]
+        # The source leaving its own directory frees its name for later moves
+        if source.parent == directory:
+            names.discard(source.name)
+        name = unique_name(destination.name, names)
+        names.add(name)
+
+        try:
+            source_device = os.stat(source).st_dev
+        except OSError:
+            source_device = None
+        same_device = source_device is not None and source_device == self._devices[directory]
+        return MoveOperation(op_id, source, directory / name, same_device)
+
+
+def _list_names(directory: Path) -> Set[str]:
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return set()
+
+
+def _device_of(directory: Path) -> Optional[int]:
+    # The directory may not exist yet: use its closest existing ancestor
+    for candidate in (directory, *directory.parents):
+        try:
+            return os.stat(candidate).st_dev
+        except OSError:
+            continue
+    return None
+
+
+def _makedirs(directory: Path) -> List[Path]:
+    """Create a directory and its missing parents, returning the ones created (outermost first)."""
+    missing = []
+    for candidate in (directory, *directory.parents):
+        if candidate.exists():
+            break
+        missing.append(candidate)
+    created = []
+    for candidate in reversed(missing):
+        try:
+            candidate.mkdir()
+            created.append(candidate)
+        except FileExistsError:
+            pass
+    return created
+
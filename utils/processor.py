@@ -0,0 +1,208 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from config import SORTED_FOLDER, DEDUP_HARDLINK, MAX_RETRIES
+from utils.file_analyzer import FileAnalyzer
+from utils.dedup import DuplicateDetector
+from utils.logger import current_correlation_id, log_context, log_file_operation
+from utils.metrics import FILES_PROCESSED, STAGE_SECONDS
+from utils.move_executor import free_path
+from utils.rules import RuleEngine
+from utils.transfer import announce_move, move_file
+
+logger = logging.getLogger("FileOrganizer.processor")
+
+
+class FileProcessor:
+    """
+    Classifies and files away a single new download.
+
+    Shared by the GUI and the headless daemon: copies of an already sorted
+    file follow the original, rule matches are routed without an AI call, and
+    everything else is classified by the agent (batched if a batcher is set)
+    and moved into ``sorted_folder``. Nothing here touches widgets, so
+    ``process`` can run on ingest worker threads.
+    """
+
+    def __init__(self, file_analyzer: FileAnalyzer, rule_engine: RuleEngine, file_agent,
+                 duplicates: Optional[DuplicateDetector] = None, batcher=None,
+                 ai_slots: Optional[threading.BoundedSemaphore] = None,
+                 sorted_folder: Path = SORTED_FOLDER, hardlink_duplicates: bool = DEDUP_HARDLINK,
+                 on_batched: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            file_analyzer (FileAnalyzer): Analyzer for new files
+            rule_engine (RuleEngine): Rules checked before the AI
+            file_agent (FileManagementAgent): Agent classifying the remaining files
+            duplicates (Optional[DuplicateDetector]): Detector whose verdicts copies reuse
+            batcher (Optional[ClassificationBatcher]): Batches AI classification requests
+            ai_slots (Optional[threading.BoundedSemaphore]): Bounds concurrent unbatched AI calls
+            sorted_folder (Path): Root of the category folders
+            hardlink_duplicates (bool): Hard-link exact copies to their original
+            on_batched (Optional[Callable]): Receives results of batched files when their batch completes
+        """
+        self.file_analyzer = file_analyzer
+        self.rule_engine = rule_engine
+        self.file_agent = file_agent
+        self.duplicates = duplicates
+        self.batcher = batcher
+        self.ai_slots = ai_slots
+        self.sorted_folder = Path(sorted_folder)
+        self.hardlink_duplicates = hardlink_duplicates
+        self.on_batched = on_batched
+
+    def process(self, file_path: Path, sorted_folder: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+        """
+        Process a newly downloaded file.
+
+        Args:
+            file_path (Path): Path to the new file
+            sorted_folder (Optional[Path]): Root of the category folders for this
+                file (default: ``self.sorted_folder``), e.g. from its watched folder's policy
+
+        Returns:
+            Optional[Dict[str, Any]]: Processing result, with an "error" key on
+            failure, or None when the file was handed to the batcher
+        """
+        with STAGE_SECONDS.time(stage="process"):
+            result = self._process(file_path, Path(sorted_folder) if sorted_folder else self.sorted_folder)
+        if result is not None:
+            self._count(result)
+        return result
+
+    def _process(self, file_path: Path, sorted_folder: Path) -> Optional[Dict[str, Any]]:
+        try:
+            # Analyze file
+            file_info = self.file_analyzer.analyze_file(file_path)
+
+            if "error" in file_info:
+                return {"name": file_path.name, "error": f"Error analyzing file: {file_info['error']}"}
+
+            # Copies of an already sorted file follow the original
+            original = self.duplicate_verdict(file_info)
+            if original is not None:
+                file_info['category'] = original['category']
+                analysis = {
+                    "ai_analysis": f"Duplicate of {Path(original['path']).name}, reused its classification",
+                    "destination": original.get('destination'),
+                    "link_to": original['path'] if self.hardlink_duplicates and 'duplicate_of' in file_info else None
+                }
+                return self.move(file_path, file_info, analysis, sorted_folder)
+
+            # Obvious files are routed by rules without an AI call
+            match = self.rule_engine.route(file_info)
+            if match is not None:
+                file_info['category'] = match.category
+                analysis = {
+                    "ai_analysis": f"Routed by rule '{match.rule}' without AI (confidence {match.confidence:.0%})",
+                    "destination": match.destination
+                }
+                return self.move(file_path, file_info, analysis, sorted_folder)
+
+            if self.batcher is not None:
+                future = self.batcher.submit(file_info)
+                correlation_id = current_correlation_id()
+                future.add_done_callback(
+                    lambda done: self._finish_batched(file_path, file_info, done, correlation_id, sorted_folder)
+                )
+                return None
+
+            # Get AI analysis, bounded separately from the analysis workers
+            if self.ai_slots is not None:
+                with self.ai_slots:
+                    analysis = self.file_agent.analyze_file(file_info)
+            else:
+                analysis = self.file_agent.analyze_file(file_info)
+
+            return self.move(file_path, file_info, analysis, sorted_folder)
+
+        except Exception as e:
+            log_file_operation(logger, "process", file_path, False, e)
+            return {"name": file_path.name, "error": f"Error processing file: {str(e)}"}
+
+    def _finish_batched(self, file_path: Path, file_info: Dict[str, Any], future: Future,
+                        correlation_id: Optional[str], sorted_folder: Path) -> None:
+        with log_context(correlation_id):
+            try:
+                result = self.move(file_path, file_info, future.result(), sorted_folder)
+            except Exception as e:
+                log_file_operation(logger, "process", file_path, False, e)
+                result = {"name": file_path.name, "error": f"Error processing file: {str(e)}"}
+            self._count(result)
+            if self.on_batched is not None:
+                self.on_batched(result)
+
+    @staticmethod
+    def _count(result: Dict[str, Any]) -> None:
+        FILES_PROCESSED.inc(outcome="failed" if "error" in result else "moved")
+
+    def duplicate_verdict(self, file_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the verdict of the file this one duplicates, if it has been sorted."""
+        original = file_info.get('duplicate_of') or file_info.get('near_duplicate_of')
+        if self.duplicates is None or not original:
+            return None
+        record = self.duplicates.get(original)
+        if record is None or record.verdict is None:
+            return None
+        return dict(record.verdict, path=record.path)
+
+    def move(self, file_path: Path, file_info: Dict[str, Any], analysis: Dict[str, Any],
+             sorted_folder: Optional[Path] = None) -> Dict[str, Any]:
+        """Move an analyzed file into its category folder under ``sorted_folder`` and describe the result."""
+        try:
+            # Move file to the rule's destination or its category folder
+            destination = analysis.get('destination')
+            category_folder = (sorted_folder or self.sorted_folder) / (destination or file_info['category'])
+            category_folder.mkdir(parents=True, exist_ok=True)
+
+            new_path = self._place(file_path, category_folder, analysis.get('link_to'))
+
+            log_file_operation(logger, "move", file_path, True)
+            if self.duplicates is not None:
+                self.duplicates.settle(file_path, new_path,
+                                       {"category": file_info['category'], "destination": destination})
+            return {
+                "name": file_path.name,
+                "category": file_info['category'],
+                "ai_analysis": analysis['ai_analysis'],
+                "new_path": str(new_path)
+            }
+
+        except Exception as e:
+            log_file_operation(logger, "process", file_path, False, e)
+            return {"name": file_path.name, "error": f"Error processing file: {str(e)}"}
+
+    def _place(self, file_path: Path, category_folder: Path, link_to: Optional[str]) -> Path:
+        """Move (or link) a file into ``category_folder`` under a free name and return its new path."""
+        attempt = 1
+        while True:
+            # A file of the same name already there keeps it; this one gets a numbered name
+            new_path = free_path(category_folder, file_path.name)
+            try:
+                if not self._link_duplicate(file_path, new_path, link_to):
+                    transfer = move_file(file_path, new_path)
+                    if transfer.method != "rename":
+                        logger.info("%s", transfer.describe(), extra={"transfer": transfer._asdict()})
+                return new_path
+            except FileExistsError:
+                # Another file took the name between choosing and moving
+                if attempt >= MAX_RETRIES:
+                    raise
+                attempt += 1
+
+    @staticmethod
+    def _link_duplicate(file_path: Path, new_path: Path, original: Optional[str]) -> bool:
+        """Replace an exact duplicate with a hard link to the original instead of moving its bytes."""
+        if not original:
+            return False
+        announce_move(file_path, new_path)
+        try:
+            os.link(original, new_path)
+        except OSError:
+            return False
+        file_path.unlink()
+        return True
@@ -0,0 +1,167 @@
+import fnmatch
+import heapq
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import RULES_FILE, RULES_CONFIDENCE_THRESHOLD, DEFAULT_RULE_CONFIDENCE
+from utils.classification import get_classification_index
+
+
+class Rule:
+    """
+    A deterministic routing rule.
+
+    Every condition that is set must hold for the rule to match: extension,
+    MIME glob (e.g. ``image/*``), filename regex, size bounds and the
+    directory the file arrived in.
+    """
+
+    def __init__(self, category: str, name: Optional[str] = None,
+                 destination: Optional[str] = None,
+                 extensions: Optional[List[str]] = None,
+                 mime: Optional[str] = None,
+                 name_pattern: Optional[str] = None,
+                 min_size: Optional[int] = None,
+                 max_size: Optional[int] = None,
+                 source_dir: Optional[str] = None,
+                 confidence: float = 1.0):
+        self.category = category
+        self.name = name or category
+        self.destination = destination
+        self.extensions = frozenset(
+            ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions or []
+        )
+        self.mime = mime
+        self._mime_regex = re.compile(fnmatch.translate(mime)) if mime else None
+        self.name_pattern = name_pattern
+        self._name_regex = re.compile(name_pattern) if name_pattern else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.source_dir = Path(source_dir).expanduser() if source_dir else None
+        self.confidence = confidence
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        """Build a rule from its JSON representation."""
+        if "category" not in data:
+            raise ValueError(f"Rule {data.get('name', data)!r} has no category")
+        try:
+            return cls(**data)
+        except (TypeError, re.error) as e:
+            raise ValueError(f"Invalid rule {data.get('name', data['category'])!r}: {e}")
+
+    def matches(self, file_info: Dict[str, Any]) -> bool:
+        """Check the conditions other than the extension, which the engine dispatches on."""
+        if self._mime_regex and not self._mime_regex.match(file_info.get('mime_type', '')):
+            return False
+        if self._name_regex and not self._name_regex.search(file_info['name']):
+            return False
+        size = file_info.get('size', 0)
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        if self.source_dir is not None:
+            parent = Path(file_info['path']).parent
+            if parent != self.source_dir and self.source_dir not in parent.parents:
+                return False
+        return True
+
+
+class RuleMatch(NamedTuple):
+    rule: str
+    category: str
+    destination: Optional[str]
+    confidence: float
+
+
+class RuleEngine:
+    """
+    Rules-first classifier that lets obvious files skip the AI call.
+
+    Rules are compiled into a dispatch table keyed by extension; rules without
+    an extension condition are checked for every file. Earlier rules win, and
+    user rules come before the per-category extension defaults.
+    """
+
+    def __init__(self, rules: List[Rule], threshold: float = RULES_CONFIDENCE_THRESHOLD):
+        self.rules = list(rules)
+        self.threshold = threshold
+        self.total = 0
+        self.fast_path = 0
+        self._lock = threading.Lock()
+
+        self._by_extension: Dict[str, List[tuple]] = {}
+        self._generic: List[tuple] = []
+        for index, rule in enumerate(self.rules):
+            if rule.extensions:
+                for extension in rule.extensions:
+                    self._by_extension.setdefault(extension, []).append((index, rule))
+            else:
+                self._generic.append((index, rule))
+
+    @classmethod
+    def from_config(cls, rules_file: Path = RULES_FILE) -> "RuleEngine":
+        """
+        Load user rules from ``rules_file`` (a JSON list, optional) followed by
+        one default rule per category of the classification index.
+
+        Returns:
+            RuleEngine: Compiled rule engine
+        """
+        rules = []
+        rules_file = Path(rules_file)
+        if rules_file.exists():
+            with open(rules_file, 'r') as file:
+                data = json.load(file)
+            if not isinstance(data, list):
+                raise ValueError(f"{rules_file} must contain a JSON list of rules")
+            rules.extend(Rule.from_dict(item) for item in data)
+
+        extensions_by_category: Dict[str, List[str]] = {}
+        for extension, category in get_classification_index().extensions.items():
+            extensions_by_category.setdefault(category, []).append(extension)
+        for category, extensions in extensions_by_category.items():
+            rules.append(Rule(category, name=f"default:{category}",
+                              extensions=extensions, confidence=DEFAULT_RULE_CONFIDENCE))
+        return cls(rules)
+
+    def match(self, file_info: Dict[str, Any]) -> Optional[RuleMatch]:
+        """Return the first rule matching the file, whatever its confidence."""
+        extension = file_info.get('extension') or Path(file_info['name']).suffix.lower()
+        candidates = heapq.merge(self._by_extension.get(extension, ()), self._generic, key=lambda item: item[0])
+        for _, rule in candidates:
+            if rule.matches(file_info):
+                return RuleMatch(rule.name, rule.category, rule.destination, rule.confidence)
+        return None
+
+    def route(self, file_info: Dict[str, Any]) -> Optional[RuleMatch]:
+        """
+        Route a file without the AI if a confident rule matches.
+
+        Args:
+            file_info (Dict[str, Any]): Analysis from ``FileAnalyzer``
+
+        Returns:
+            Optional[RuleMatch]: The match if its confidence reaches the
+            threshold, otherwise None (the file needs the AI)
+        """
+        match = self.match(file_info)
+        confident = match is not None and match.confidence >= self.threshold
+        with self._lock:
+            self.total += 1
+            if confident:
+                self.fast_path += 1
+        return match if confident else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how much traffic took the fast path."""
+        with self._lock:
+            return {
+                "total": self.total,
+                "fast_path": self.fast_path,
+                "fast_path_ratio": self.fast_path / self.total if self.total else 0.0
+            }
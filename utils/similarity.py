@@ -0,0 +1,276 @@
+"""
+Local content-similarity index.
+
+Files are described by short text snippets (filename words, metadata, the
+start of text and PDF content), vectorized with signed feature hashing and
+TF-IDF weighting, and compared by cosine similarity. Everything runs on the
+CPU with NumPy; no model or network access is involved.
+"""
+import math
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config import (
+    SIMILARITY_DIMENSIONS, SIMILARITY_THRESHOLD, SIMILARITY_NEIGHBORS, SIMILARITY_SNIPPET_CHARS
+)
+from utils.dedup import TEXT_EXTENSIONS
+from utils.extractors import read_pdf_text
+
+_CAMEL = re.compile(r"([a-z])([A-Z])")
+_TOKEN = re.compile(r"[a-z]{2,}|(?:19|20)\d{2}")
+_STOPWORDS = frozenset({
+    "the", "and", "for", "with", "from", "this", "that", "are", "was", "were", "not", "but",
+    "you", "your", "all", "any", "can", "has", "have", "had", "its", "our", "out", "into",
+    "pdf", "txt", "csv", "json", "doc", "docx", "copy", "final", "new", "file", "download",
+})
+_BLOCK_ROWS = 1024
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text (including ``camelCase`` and ``snake_case`` names) into lowercase words."""
+    text = _CAMEL.sub(r"\1 \2", text).lower()
+    return [token for token in _TOKEN.findall(text) if token not in _STOPWORDS]
+
+
+def document_text(file_info: Dict[str, Any], max_chars: int = SIMILARITY_SNIPPET_CHARS) -> str:
+    """
+    Build the text that represents a file in the index.
+
+    Uses the filename, category and metadata (e.g. CSV headers, PDF title and
+    keywords), plus the first ``max_chars`` characters of text files and PDFs.
+    """
+    path = Path(file_info['path'])
+    parts = [path.stem, path.stem, file_info.get('category', '')]
+    for value in file_info.get('metadata', {}).values():
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(item) for item in value[:50])
+        elif isinstance(value, str):
+            parts.append(value)
+
+    extension = file_info.get('extension') or path.suffix.lower()
+    try:
+        if extension in TEXT_EXTENSIONS:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+                parts.append(file.read(max_chars))
+        elif extension == '.pdf':
+            parts.append(read_pdf_text(path, max_chars))
+    except OSError:
+        pass
+    return "\n".join(parts)
+
+
+class HashingVectorizer:
+    """Signed feature hashing of word unigrams and bigrams with sublinear term frequency."""
+
+    def __init__(self, dimensions: int = SIMILARITY_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def features(self, tokens: List[str]) -> Counter:
+        features = Counter(tokens)
+        features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def bucket(self, feature: str) -> Tuple[int, float]:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        return digest % self.dimensions, -1.0 if digest & 0x80000000 else 1.0
+
+    def transform(self, text: str) -> Tuple[np.ndarray, Dict[int, str]]:
+        """
+        Vectorize text.
+
+        Returns:
+            Tuple[np.ndarray, Dict[int, str]]: Term-frequency vector and one
+            readable unigram per non-zero bucket (used to describe clusters)
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        terms: Dict[int, str] = {}
+        for feature, count in self.features(tokenize(text)).items():
+            index, sign = self.bucket(feature)
+            vector[index] += sign * (1.0 + math.log(count))
+            if " " not in feature:
+                terms.setdefault(index, feature)
+        return vector, terms
+
+
+class SimilarityIndex:
+    """
+    Incremental TF-IDF index with nearest-neighbour search and clustering.
+
+    Term-frequency rows live in a growable matrix and document frequencies
+    are kept as running counts, so adding or removing a file touches one row
+    and IDF weights are applied at query time. Entries carry a ``stamp``
+    (e.g. size and mtime) so unchanged files are not re-read.
+    """
+
+    def __init__(self, dimensions: int = SIMILARITY_DIMENSIONS):
+        self.vectorizer = HashingVectorizer(dimensions)
+        self.dimensions = dimensions
+        self.version = 0
+
+        self._rows = np.zeros((64, dimensions), dtype=np.float32)
+        self._keys: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._stamps: Dict[str, Any] = {}
+        self._free: List[int] = []
+        self._df = np.zeros(dimensions, dtype=np.float64)
+        self._terms: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    def add(self, key: str, text: str, stamp: Any = None) -> bool:
+        """
+        Add or replace a document.
+
+        Returns:
+            bool: False if the document was already indexed with the same stamp
+        """
+        if stamp is not None and key in self._slots and self._stamps.get(key) == stamp:
+            return False
+        self.remove(key)
+
+        vector, terms = self.vectorizer.transform(text)
+        for index, term in terms.items():
+            self._terms.setdefault(index, term)
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+        else:
+            slot = len(self._keys)
+            if slot == len(self._rows):
+                grown = np.zeros((len(self._rows) * 2, self.dimensions), dtype=np.float32)
+                grown[:slot] = self._rows
+                self._rows = grown
+            self._keys.append(key)
+        self._rows[slot] = vector
+        self._df += vector != 0
+        self._slots[key] = slot
+        self._stamps[key] = stamp
+        self.version += 1
+        return True
+
+    def add_file(self, file_info: Dict[str, Any]) -> bool:
+        """Index a ``FileAnalyzer`` result, skipping files whose size and mtime are unchanged."""
+        stamp = (file_info.get('size'), file_info.get('modified'))
+        if file_info['path'] in self._slots and self._stamps.get(file_info['path']) == stamp:
+            return False
+        return self.add(file_info['path'], document_text(file_info), stamp)
+
+    def remove(self, key: str) -> None:
+        """Drop a document if it is indexed."""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._df -= self._rows[slot] != 0
+        self._rows[slot] = 0
+        self._keys[slot] = None
+        self._stamps.pop(key, None)
+        self._free.append(slot)
+        self.version += 1
+
+    def vectors(self, keys: List[str]) -> np.ndarray:
+        """Return L2-normalized TF-IDF vectors for the given keys."""
+        matrix = self._rows[[self._slots[key] for key in keys]] * self._idf()
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def neighbors(self, query: Union[str, Dict[str, Any]], k: int = SIMILARITY_NEIGHBORS,
+                  keys: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the documents most similar to an indexed key or a file analysis.
+
+        Args:
+            query (Union[str, Dict[str, Any]]): Indexed key, or a file analysis to vectorize
+            k (int): Number of neighbours
+            keys (Optional[List[str]]): Restrict the search to these keys
+
+        Returns:
+            List[Tuple[str, float]]: (key, cosine similarity), most similar first
+        """
+        keys = [key for key in (keys if keys is not None else self._slots) if key in self._slots]
+        if isinstance(query, str):
+            exclude = query
+            vector = self.vectors([query])[0]
+        else:
+            exclude = query.get('path')
+            vector = self.vectorizer.transform(document_text(query))[0] * self._idf()
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+        keys = [key for key in keys if key != exclude]
+        if not keys:
+            return []
+        scores = self.vectors(keys) @ vector
+        order = np.argsort(-scores)[:k]
+        return [(keys[i], float(scores[i])) for i in order]
+
+    def cluster(self, keys: Optional[Iterable[str]] = None, threshold: float = SIMILARITY_THRESHOLD,
+                k: int = SIMILARITY_NEIGHBORS) -> List[List[str]]:
+        """
+        Group documents whose similarity to one of their ``k`` nearest neighbours reaches ``threshold``.
+
+        Args:
+            keys (Optional[Iterable[str]]): Documents to cluster (default: all)
+            threshold (float): Minimum cosine similarity of a link
+            k (int): Neighbours considered per document
+
+        Returns:
+            List[List[str]]: Clusters of two or more keys, largest first;
+            documents without a close neighbour are left out
+        """
+        keys = [key for key in (keys if keys is not None else list(self._slots)) if key in self._slots]
+        if len(keys) < 2:
+            return []
+        matrix = self.vectors(keys)
+        parent = list(range(len(keys)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        k = min(k, len(keys) - 1)
+        # Similarities are computed a block of rows at a time to bound memory
+        for start in range(0, len(keys), _BLOCK_ROWS):
+            block = matrix[start:start + _BLOCK_ROWS] @ matrix.T
+            rows = np.arange(block.shape[0])
+            block[rows, rows + start] = -1.0
+            nearest = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            for row, candidates in enumerate(nearest):
+                for j in candidates:
+                    if block[row, j] >= threshold:
+                        a, b = find(start + row), find(int(j))
+                        if a != b:
+                            parent[max(a, b)] = min(a, b)
+
+        groups: Dict[int, List[str]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(find(i), []).append(key)
+        clusters = [sorted(group) for group in groups.values() if len(group) > 1]
+        clusters.sort(key=lambda group: (-len(group), group[0]))
+        return clusters
+
+    def top_terms(self, keys: List[str], count: int = 5) -> List[str]:
+        """Return the most characteristic words of a group of documents."""
+        weights = np.abs(self._rows[[self._slots[key] for key in keys]]).sum(axis=0) * self._idf()
+        terms = []
+        for index in np.argsort(-weights):
+            if weights[index] <= 0 or len(terms) >= count:
+                break
+            term = self._terms.get(int(index))
+            if term and term not in terms:
+                terms.append(term)
+        return terms
+
+    def _idf(self) -> np.ndarray:
+        count = len(self._slots)
+        return (np.log((1.0 + count) / (1.0 + self._df)) + 1.0).astype(np.float32)
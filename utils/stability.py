@@ -0,0 +1,194 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import PARTIAL_DOWNLOAD_SUFFIXES, STABILITY_QUIET_PERIOD
+
+
+class _Observation:
+    __slots__ = ("size", "mtime_ns", "changed_at")
+
+    def __init__(self, size: int, mtime_ns: int, changed_at: float):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.changed_at = changed_at
+
+
+class WriteCompletionDetector:
+    """
+    Release files to the pipeline once they have stopped changing.
+
+    Every tracked file keeps its last observed size/mtime and the moment it
+    last changed. A single scheduler thread re-checks files when their quiet
+    period expires, so waiting costs a heap entry per file rather than a
+    sleeping worker. Files that are already complete when first seen (their
+    mtime is older than the quiet period, a close-write event arrived, or a
+    partial download was renamed to its final name) are released immediately.
+    """
+
+    def __init__(self, on_ready: Callable[[Path], None],
+                 quiet_period: float = STABILITY_QUIET_PERIOD,
+                 partial_suffixes: Tuple[str, ...] = PARTIAL_DOWNLOAD_SUFFIXES):
+        self.on_ready = on_ready
+        self.quiet_period = quiet_period
+        self.partial_suffixes = tuple(suffix.lower() for suffix in partial_suffixes)
+
+        self._entries: Dict[Path, _Observation] = {}
+        self._schedule: List[Tuple[float, int, Path]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self) -> None:
+        """Start the scheduler thread."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="write-completion", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the scheduler thread; files still being written are dropped."""
+        with self._condition:
+            self._running = False
+            self._entries.clear()
+            self._schedule.clear()
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def is_partial(self, file_path: Path) -> bool:
+        """Whether the path is an in-progress download (e.g. ``.crdownload``)."""
+        return Path(file_path).suffix.lower() in self.partial_suffixes
+
+    @property
+    def pending(self) -> int:
+        """Number of files still waiting to settle."""
+        with self._condition:
+            return len(self._entries)
+
+    def track(self, file_path: Path) -> None:
+        """Handle a created/modified event for a file."""
+        file_path = Path(file_path)
+        if self.is_partial(file_path):
+            return
+
+        stat = self._stat(file_path)
+        if stat is None:
+            self.discard(file_path)
+            return
+
+        now = time.monotonic()
+        with self._condition:
+            entry = self._entries.get(file_path)
+            if entry is None:
+                # Files whose last write is already older than the quiet period
+                # (copied in with preserved mtimes, or written before we looked)
+                # need no waiting at all.
+                if time.time_ns() - stat.st_mtime_ns >= self.quiet_period * 1e9:
+                    release = True
+                else:
+                    release = False
+                    self._entries[file_path] = _Observation(stat.st_size, stat.st_mtime_ns, now)
+                    self._schedule_check(file_path, now + self.quiet_period)
+            else:
+                release = False
+                if (stat.st_size, stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+                    entry.size, entry.mtime_ns, entry.changed_at = stat.st_size, stat.st_mtime_ns, now
+
+        if release:
+            self.on_ready(file_path)
+
+    def closed(self, file_path: Path) -> None:
+        """Handle a close-after-write event: the writer is done with the file."""
+        file_path = Path(file_path)
+        if self.is_partial(file_path):
+            return
+        self._release_now(file_path)
+
+    def moved(self, src_path: Path, dest_path: Path) -> None:
+        """Handle a rename, such as ``report.pdf.crdownload`` -> ``report.pdf``."""
+        src_path, dest_path = Path(src_path), Path(dest_path)
+        with self._condition:
+            entry = self._entries.pop(src_path, None)
+
+        if self.is_partial(dest_path):
+            return
+        if self.is_partial(src_path):
+            # Browsers only rename the temp file once the download has finished
+            self._release_now(dest_path)
+        elif entry is not None:
+            self.track(dest_path)
+
+    def discard(self, file_path: Path) -> None:
+        """Stop tracking a file (e.g. it was deleted)."""
+        with self._condition:
+            self._entries.pop(Path(file_path), None)
+
+    def _release_now(self, file_path: Path) -> None:
+        with self._condition:
+            self._entries.pop(file_path, None)
+        if self._stat(file_path) is not None:
+            self.on_ready(file_path)
+
+    def _schedule_check(self, file_path: Path, due: float) -> None:
+        # Caller holds self._condition
+        heapq.heappush(self._schedule, (due, next(self._counter), file_path))
+        if self._schedule[0][2] == file_path:
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and (
+                    not self._schedule or self._schedule[0][0] > time.monotonic()
+                ):
+                    timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+
+                now = time.monotonic()
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    due.append(heapq.heappop(self._schedule)[2])
+
+            ready = [file_path for file_path in due if self._check(file_path, now)]
+            for file_path in ready:
+                self.on_ready(file_path)
+
+    def _check(self, file_path: Path, now: float) -> bool:
+        """Re-examine a due file; returns True when it should be released."""
+        stat = self._stat(file_path)
+        with self._condition:
+            entry = self._entries.get(file_path)
+            if entry is None:
+                return False
+            if stat is None:
+                del self._entries[file_path]
+                return False
+
+            if (stat.st_size, stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+                entry.size, entry.mtime_ns, entry.changed_at = stat.st_size, stat.st_mtime_ns, now
+
+            settle_at = entry.changed_at + self.quiet_period
+            if settle_at <= now:
+                del self._entries[file_path]
+                return True
+
+            self._schedule_check(file_path, settle_at)
+            return False
+
+    @staticmethod
+    def _stat(file_path: Path) -> Optional[os.stat_result]:
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
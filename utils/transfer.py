@@ -0,0 +1,247 @@
+import errno
+import os
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, List, NamedTuple
+
+from config import TRANSFER_VERIFY, TRANSFER_FSYNC
+from utils.analysis_cache import hash_file
+from utils.metrics import MOVED_BYTES, STAGE_SECONDS
+
+# ioctl(dest_fd, FICLONE, src_fd) shares the source's extents on btrfs/XFS
+_FICLONE = 0x40049409
+_COPY_CHUNK = 64 * 1024 * 1024
+_BUFFER_SIZE = 1024 * 1024
+
+# Told about every move before it happens, so folder watchers can ignore the organizer's own moves
+_move_listeners: List[Callable[..., None]] = []
+
+# Errors meaning "this copy method is not available here", so the next one is tried
+_UNSUPPORTED = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.ETXTBSY,
+    getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL),
+    getattr(errno, "ENOTTY", errno.EINVAL),
+}
+
+
+class TransferResult(NamedTuple):
+    source: str
+    destination: str
+    method: str
+    size: int
+    seconds: float
+    verified: bool
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second (0 for renames, which move no data)."""
+        return self.size / self.seconds if self.seconds > 0 and self.method != "rename" else 0.0
+
+    def describe(self) -> str:
+        """Human-readable summary for logs."""
+        if self.method == "rename":
+            return f"renamed {self.source} -> {self.destination}"
+        return (f"{self.method} {self.source} -> {self.destination}: {self.size} bytes in "
+                f"{self.seconds:.2f}s ({self.throughput / 1e6:.1f} MB/s{', verified' if self.verified else ''})")
+
+
+def _reflink(source_fd: int, dest_fd: int, size: int) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    fcntl.ioctl(dest_fd, _FICLONE, source_fd)
+    return True
+
+
+def _copy_file_range(source_fd: int, dest_fd: int, size: int) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(source_fd, dest_fd, min(_COPY_CHUNK, size - offset))
+        if copied == 0:
+            break
+        offset += copied
+    return True
+
+
+def _sendfile(source_fd: int, dest_fd: int, size: int) -> bool:
+    # Only Linux accepts a regular file as the sendfile destination
+    if not sys.platform.startswith("linux"):
+        return False
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dest_fd, source_fd, offset, min(_COPY_CHUNK, size - offset))
+        if sent == 0:
+            break
+        offset += sent
+    return True
+
+
+_ZERO_COPY_METHODS = [
+    ("reflink", _reflink),
+    ("copy_file_range", _copy_file_range),
+    ("sendfile", _sendfile),
+]
+
+
+def copy_data(source: Path, destination: Path, fsync: bool = TRANSFER_FSYNC) -> str:
+    """
+    Copy a file's contents, trying kernel-side copies before a buffered copy.
+
+    Tries a reflink, ``copy_file_range`` and ``sendfile`` in turn; a method
+    that is unsupported for this pair of filesystems falls through to the
+    next, ending with ``shutil.copyfileobj``.
+
+    Args:
+        source (Path): File to copy
+        destination (Path): New file to create (overwritten if present)
+        fsync (bool): Flush the copy to disk before returning
+
+    Returns:
+        str: Name of the method that copied the data
+    """
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        method = None
+        for name, copy in _ZERO_COPY_METHODS:
+            try:
+                if copy(src.fileno(), dst.fileno(), size):
+                    method = name
+                    break
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+            # Discard anything a failed method may have written
+            os.ftruncate(dst.fileno(), 0)
+            os.lseek(dst.fileno(), 0, os.SEEK_SET)
+
+        if method is None:
+            src.seek(0)
+            shutil.copyfileobj(src, dst, _BUFFER_SIZE)
+            method = "copy"
+        dst.flush()
+        if fsync:
+            os.fsync(dst.fileno())
+    return method
+
+
+def _fsync_directory(directory: Path) -> None:
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def add_move_listener(listener: Callable[..., None]) -> None:
+    """Call ``listener(source, destination)`` before every move the organizer makes."""
+    _move_listeners.append(listener)
+
+
+def remove_move_listener(listener: Callable[..., None]) -> None:
+    if listener in _move_listeners:
+        _move_listeners.remove(listener)
+
+
+def _rename_no_replace(source: Path, destination: Path) -> None:
+    """
+    Rename ``source`` to ``destination`` unless ``destination`` exists.
+
+    ``os.rename`` and ``os.replace`` silently overwrite, so the new name is
+    created as a hard link (which fails atomically if it is taken) before
+    the old one is unlinked. Filesystems without hard links fall back to an
+    existence check followed by a rename.
+
+    Raises:
+        FileExistsError: If ``destination`` exists
+    """
+    try:
+        os.link(source, destination, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        if os.path.lexists(destination):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(destination))
+        os.rename(source, destination)
+        return
+    os.unlink(source)
+
+
+def announce_move(source: Path, destination: Path) -> None:
+    """Tell the move listeners that ``source`` is about to become ``destination``."""
+    for listener in list(_move_listeners):
+        listener(source, destination)
+
+
+def _record(result: TransferResult) -> TransferResult:
+    STAGE_SECONDS.observe(result.seconds, stage="move")
+    MOVED_BYTES.inc(result.size, method=result.method)
+    return result
+
+
+def move_file(source: Path, destination: Path, try_rename: bool = True,
+              verify: bool = TRANSFER_VERIFY, fsync: bool = TRANSFER_FSYNC) -> TransferResult:
+    """
+    Move a file, across filesystems if necessary.
+
+    Same-filesystem moves are a rename. Otherwise the data is copied (see
+    ``copy_data``) to a temporary ``.part`` file next to the destination,
+    metadata is copied, the copy is optionally verified against the source
+    with a streaming hash, and it is renamed into place before the source is
+    unlinked, so the destination never holds a partial file. An existing
+    destination is never overwritten.
+
+    Args:
+        source (Path): File to move
+        destination (Path): Full destination path
+        try_rename (bool): Attempt ``os.rename`` first (skip it when the
+            caller already knows the move crosses devices)
+        verify (bool): Compare content hashes before removing the source
+        fsync (bool): Flush the copy and its directory entry to disk
+
+    Returns:
+        TransferResult: Method used, size, duration and throughput
+
+    Raises:
+        FileExistsError: If ``destination`` already exists
+    """
+    source, destination = Path(source), Path(destination)
+    announce_move(source, destination)
+    start = time.perf_counter()
+    if try_rename:
+        try:
+            _rename_no_replace(source, destination)
+            return _record(TransferResult(str(source), str(destination), "rename",
+                                          destination.stat().st_size, time.perf_counter() - start, False))
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+    temp = destination.with_name(f".{destination.name}.{uuid.uuid4().hex[:8]}.part")
+    try:
+        method = copy_data(source, temp, fsync=fsync)
+        shutil.copystat(source, temp)
+        if verify and hash_file(source) != hash_file(temp):
+            raise IOError(f"Verification failed copying {source} to {destination}")
+        _rename_no_replace(temp, destination)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_directory(destination.parent)
+    size = destination.stat().st_size
+    os.unlink(source)
+    return _record(TransferResult(str(source), str(destination), method, size,
+                                  time.perf_counter() - start, verify))
+
@@ -0,0 +1,477 @@
+"""
+Watching folders for new files.
+
+``FolderWatcher`` watches several folders through one watchdog observer,
+each with its own ``WatchRoot`` policy. On their way to the directory index
+and the write-completion detector, events are:
+
+- dropped if the policy ignores the path, or it is in the organizer's own
+  log or cache folder;
+- folded per path for ``WATCH_COALESCE_WINDOW`` seconds (``EventCoalescer``),
+  so a create, a few modifies and a rename become one event for the final path;
+- kept out of the pipeline if the organizer itself just moved the path
+  (``SelfEventFilter``), so sorted files do not loop back through it.
+
+The directory index still sees every change. ``root_for`` tells which
+watched folder a released file belongs to, so work can be sharded by folder.
+"""
+import logging
+import os
+import threading
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from watchdog.events import FileSystemEventHandler
+
+from config import LOG_DIR, CACHE_DIR, WATCH_ROOTS, WATCH_COALESCE_WINDOW, WATCH_SELF_EVENT_TTL
+from utils.directory_index import DirectoryIndex
+from utils.file_analyzer import iter_files
+from utils.stability import WriteCompletionDetector
+from utils.transfer import add_move_listener, remove_move_listener
+
+logger = logging.getLogger("FileOrganizer.watcher")
+
+# WatchRoot.ingest modes
+INGEST_TOP = "top"  # sort new files directly inside the folder; deeper ones are only indexed
+INGEST_ALL = "all"  # sort new files at any depth
+INGEST_NONE = "none"  # only keep the folder in the directory index
+INGEST_MODES = (INGEST_TOP, INGEST_ALL, INGEST_NONE)
+
+# Coalesced event kinds
+CHANGED = "changed"
+CLOSED = "closed"
+DELETED = "deleted"
+MOVED = "moved"
+
+
+def _absolute(path: Union[str, Path]) -> Path:
+    return Path(os.path.abspath(os.path.expanduser(str(path))))
+
+
+class WatchRoot(NamedTuple):
+    """A watched folder and its policy."""
+    path: Path
+    recursive: bool = True
+    ingest: str = INGEST_TOP
+    sorted_folder: Optional[Path] = None
+    ignore: Tuple[str, ...] = ()
+    workers: int = 0
+
+    @classmethod
+    def from_config(cls, value: Union[str, Path, Dict[str, Any]]) -> "WatchRoot":
+        """
+        Build a root from a ``WATCH_ROOTS`` entry: a path, or a dict of the fields.
+
+        Raises:
+            ValueError: If the entry has no path, unknown keys or an unknown ingest mode
+        """
+        if not isinstance(value, dict):
+            value = {"path": value}
+        unknown = set(value) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"Unknown watch root settings: {', '.join(sorted(unknown))}")
+        if not value.get("path"):
+            raise ValueError("Every watch root needs a path")
+        ingest = value.get("ingest", INGEST_TOP)
+        if ingest not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode {ingest!r} (expected one of {', '.join(INGEST_MODES)})")
+        sorted_folder = value.get("sorted_folder")
+        return cls(
+            path=_absolute(value["path"]),
+            recursive=bool(value.get("recursive", True)),
+            ingest=ingest,
+            sorted_folder=_absolute(sorted_folder) if sorted_folder else None,
+            ignore=tuple(value.get("ignore") or ()),
+            workers=int(value.get("workers") or 0)
+        )
+
+    def contains(self, path: Path) -> bool:
+        """Whether events for ``path`` are delivered by this root's watch."""
+        return path.parent == self.path or (self.recursive and self.path in path.parents)
+
+    def ignores(self, path: Path) -> bool:
+        """Paths in hidden subfolders, or with a file or folder name matching an ``ignore`` pattern, are skipped."""
+        try:
+            folders = path.parent.relative_to(self.path).parts
+        except ValueError:
+            folders = ()
+        if any(folder.startswith('.') for folder in folders):
+            return True
+        return any(fnmatch(name, pattern) for name in (*folders, path.name) for pattern in self.ignore)
+
+    def ingests(self, path: Path) -> bool:
+        """Whether a new file at ``path`` should be sorted (rather than only indexed)."""
+        if self.ingest == INGEST_NONE:
+            return False
+        return self.ingest == INGEST_ALL or path.parent == self.path
+
+
+def load_watch_roots(values: Optional[Iterable[Union[str, Path, Dict[str, Any]]]] = None) -> List[WatchRoot]:
+    """Parse ``WATCH_ROOTS`` (or ``values``), dropping repeated folders."""
+    roots: Dict[Path, WatchRoot] = {}
+    for value in WATCH_ROOTS if values is None else values:
+        root = WatchRoot.from_config(value)
+        roots.setdefault(root.path, root)
+    return list(roots.values())
+
+
+def index_roots(roots: Iterable[WatchRoot], excluded: Iterable[Path] = (LOG_DIR, CACHE_DIR)) -> DirectoryIndex:
+    """A directory index of the watched folders (recursive if any of them is), without ``excluded``."""
+    roots = list(roots)
+    return DirectoryIndex([root.path for root in roots], recursive=any(root.recursive for root in roots),
+                          excluded=excluded)
+
+
+class SelfEventFilter:
+    """
+    Paths the organizer is about to move; their events are not new files.
+
+    ``expect`` is registered as a move listener (see ``utils/transfer.py``),
+    so the source and destination of every move are remembered for up to
+    ``ttl`` seconds. The next (coalesced) event on them still updates the
+    directory index but is not handed to the pipeline; later events are, so
+    a new download reusing a just-sorted name is not lost.
+
+    Without coalescing one move arrives as several raw events, so with
+    ``consume`` off a path stays expected until its ``ttl`` runs out. A new
+    download reusing the name within that time is then missed.
+    """
+
+    def __init__(self, ttl: float = WATCH_SELF_EVENT_TTL, consume: bool = True):
+        self.ttl = ttl
+        self.consume = consume
+        self.suppressed = 0
+        self._expected: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def expect(self, *paths: Union[str, Path]) -> None:
+        """Mark paths whose events during the next ``ttl`` seconds are the organizer's own."""
+        deadline = time.monotonic() + self.ttl
+        with self._lock:
+            for path in paths:
+                self._expected[str(path)] = deadline
+
+    def is_self(self, *paths: Union[str, Path]) -> bool:
+        """Whether an event on any of these paths was caused by the organizer."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._expected) > 1000:
+                self._expected = {path: deadline for path, deadline in self._expected.items() if deadline >= now}
+            matched = False
+            for path in paths:
+                if path is None:
+                    continue
+                key = str(path)
+                deadline = self._expected.pop(key, 0) if self.consume else self._expected.get(key, 0)
+                if deadline >= now:
+                    matched = True
+            if matched:
+                self.suppressed += 1
+        return matched
+
+
+class _Pending:
+    __slots__ = ("kind", "source", "stale")
+
+    def __init__(self, kind: str, source: Optional[Path] = None, stale: Optional[Set[Path]] = None):
+        self.kind = kind
+        self.source = source
+        self.stale = stale or set()
+
+
+class EventCoalescer:
+    """
+    Folds the events of each path over a short window into one.
+
+    Created and modified become ``CHANGED`` (a close-after-write makes it
+    ``CLOSED``), a rename carries the folded state over to the new path, and
+    a rename of a partial download to its final name becomes ``CLOSED``. A
+    rename of a path without events in the window stays ``MOVED`` with its
+    source. Folded-away paths are passed on as ``stale`` so the directory
+    index can re-check them. With a window of 0 every event is dispatched at once.
+    """
+
+    def __init__(self, dispatch: Callable[[str, Path, Optional[Path], Set[Path]], None],
+                 window: float = WATCH_COALESCE_WINDOW,
+                 is_partial: Callable[[Path], bool] = lambda path: False):
+        """
+        Args:
+            dispatch (Callable): Called with (kind, path, source, stale paths) per folded event
+            window (float): Seconds events are collected before dispatch
+            is_partial (Callable[[Path], bool]): Whether a path is an in-progress download
+        """
+        self.dispatch = dispatch
+        self.window = window
+        self.is_partial = is_partial
+        self.received = 0
+        self.dispatched = 0
+
+        self._pending: Dict[Path, _Pending] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self) -> None:
+        if self.window <= 0 or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="event-coalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread after dispatching the events still waiting."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._flush()
+
+    def add(self, kind: str, path: Path, dest: Optional[Path] = None) -> None:
+        """
+        Add a raw event.
+
+        Args:
+            kind (str): ``CHANGED``, ``CLOSED``, ``DELETED`` or ``MOVED``
+            path (Path): Path of the event (the source of a move)
+            dest (Optional[Path]): Destination of a move
+        """
+        with self._condition:
+            self.received += 1
+            self._fold(kind, path, dest)
+            if self._running:
+                self._condition.notify()
+                return
+        self._flush()
+
+    def _fold(self, kind: str, path: Path, dest: Optional[Path]) -> None:
+        # Caller holds self._condition
+        pending = self._pending
+        if kind != MOVED:
+            current = pending.get(path)
+            if current is None:
+                pending[path] = _Pending(kind)
+            elif kind == DELETED:
+                if current.source is not None:
+                    current.stale.add(current.source)
+                current.kind, current.source = DELETED, None
+            elif kind == CLOSED or current.kind == DELETED:
+                current.kind = kind
+            elif current.kind == CLOSED:
+                current.kind = CHANGED
+            return
+
+        previous = pending.pop(path, None)
+        stale = (previous.stale if previous is not None else set()) | {path}
+        if self.is_partial(path) and not self.is_partial(dest):
+            folded = _Pending(CLOSED, stale=stale)
+        elif previous is not None and previous.kind != DELETED:
+            # The file appeared or changed within the window: its new name is all that matters
+            folded = _Pending(previous.kind, previous.source, stale)
+            if previous.source is not None:
+                folded.stale.discard(previous.source)
+        else:
+            folded = _Pending(MOVED, path)
+        replaced = pending.pop(dest, None)
+        if replaced is not None:
+            folded.stale |= replaced.stale
+        pending[dest] = folded
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+            time.sleep(self.window)
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._condition:
+            pending, self._pending = self._pending, {}
+        for path, event in pending.items():
+            self.dispatched += 1
+            try:
+                self.dispatch(event.kind, path, event.source, event.stale)
+            except Exception as e:
+                logger.error("Could not dispatch %s event for %s: %s", event.kind, path, e)
+
+
+class DownloadEventHandler(FileSystemEventHandler):
+    """
+    Forwards one root's watchdog events to its ``FolderWatcher``.
+
+    These callbacks run on the observer thread, so they only hand paths on
+    and never do any real work (or touch widgets) themselves.
+    """
+
+    def __init__(self, watcher: "FolderWatcher", root: WatchRoot):
+        self.watcher = watcher
+        self.root = root
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.event(self.root, CHANGED, event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.event(self.root, CHANGED, event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.watcher.event(self.root, CLOSED, event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.event(self.root, MOVED, event.src_path, event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.event(self.root, DELETED, event.src_path)
+
+
+class FolderWatcher:
+    """
+    Recursive watcher of several folders with per-folder policies.
+
+    Every event updates the directory index. Events of files a folder's
+    policy ingests go on to the write-completion detector, which releases
+    them once they are complete; the caller maps a released file back to its
+    folder with ``root_for``.
+    """
+
+    def __init__(self, roots: Iterable[WatchRoot], directory_index: DirectoryIndex,
+                 write_detector: WriteCompletionDetector,
+                 coalesce_window: float = WATCH_COALESCE_WINDOW,
+                 self_events: Optional[SelfEventFilter] = None,
+                 excluded: Iterable[Path] = (LOG_DIR, CACHE_DIR)):
+        """
+        Args:
+            roots (Iterable[WatchRoot]): Folders to watch
+            directory_index (DirectoryIndex): Index journaling every change
+            write_detector (WriteCompletionDetector): Releases complete files of ingesting folders
+            coalesce_window (float): Seconds a path's events are folded before dispatch
+            self_events (Optional[SelfEventFilter]): Filter of the organizer's own moves
+                (default: one that keeps matching for its whole TTL when ``coalesce_window`` is 0)
+            excluded (Iterable[Path]): Folders whose events are dropped (the organizer's logs and caches)
+        """
+        # Most specific folder first, so nested roots own their own events
+        self.roots = sorted(roots, key=lambda root: len(root.path.parts), reverse=True)
+        self.directory_index = directory_index
+        self.write_detector = write_detector
+        # Uncoalesced, the events of one move must all be matched
+        self.self_events = self_events or SelfEventFilter(consume=coalesce_window > 0)
+        self.excluded = [_absolute(folder) for folder in excluded]
+        self.coalescer = EventCoalescer(self._dispatch, coalesce_window, write_detector.is_partial)
+        self._observer = None
+
+    def start(self) -> None:
+        """Schedule a watch per folder and start the observer thread."""
+        from watchdog.observers import Observer
+
+        add_move_listener(self.self_events.expect)
+        self.coalescer.start()
+        self._observer = Observer()
+        for root in self.roots:
+            if not root.path.is_dir():
+                logger.warning("Not watching %s: it is not a folder", root.path)
+                continue
+            self._observer.schedule(DownloadEventHandler(self, root), str(root.path), recursive=root.recursive)
+            logger.info("Watching %s (%s, ingest: %s)", root.path,
+                        "recursive" if root.recursive else "top level only", root.ingest)
+        self._observer.start()
+
+    def stop(self) -> None:
+        """Stop the observer and dispatch the events still being coalesced."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self.coalescer.stop()
+        remove_move_listener(self.self_events.expect)
+
+    def root_for(self, path: Union[str, Path]) -> Optional[WatchRoot]:
+        """The most specific watched folder whose watch covers ``path``."""
+        path = Path(path)
+        for root in self.roots:
+            if root.contains(path):
+                return root
+        return None
+
+    def existing_files(self) -> Iterator[Path]:
+        """Files already in the folders that their policies would ingest."""
+        for root in self.roots:
+            if root.ingest == INGEST_NONE:
+                continue
+            for file_path, _ in iter_files(root.path, root.recursive and root.ingest == INGEST_ALL, self.excluded):
+                if (self.root_for(file_path) is root and root.ingests(file_path) and not root.ignores(file_path)
+                        and not self._excluded(file_path) and not self.write_detector.is_partial(file_path)):
+                    yield file_path
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "roots": [str(root.path) for root in self.roots],
+            "events": self.coalescer.received,
+            "dispatched": self.coalescer.dispatched,
+            "self_events_suppressed": self.self_events.suppressed
+        }
+
+    def event(self, root: WatchRoot, kind: str, path: str, dest: Optional[str] = None) -> None:
+        """Take a raw event from ``root``'s watch (observer thread)."""
+        path = Path(path)
+        dest_path = Path(dest) if dest is not None else None
+        # With nested roots the outer watch reports the inner root's events too
+        if self.root_for(dest_path or path) is not root:
+            return
+
+        if dest_path is None:
+            if not self._dropped(root, path):
+                self.coalescer.add(kind, path)
+            return
+        # A move out of (or into) ignored territory is a delete (or a new file)
+        if self._dropped(root, dest_path):
+            if not self._dropped(root, path):
+                self.coalescer.add(DELETED, path)
+        elif self._dropped(root, path):
+            self.coalescer.add(CHANGED, dest_path)
+        else:
+            self.coalescer.add(MOVED, path, dest_path)
+
+    def _excluded(self, path: Path) -> bool:
+        return any(folder == path.parent or folder in path.parents for folder in self.excluded)
+
+    def _dropped(self, root: WatchRoot, path: Path) -> bool:
+        return self._excluded(path) or root.ignores(path)
+
+    def _dispatch(self, kind: str, path: Path, source: Optional[Path], stale: Set[Path]) -> None:
+        detector = self.write_detector
+        self.directory_index.record(path, *stale, *([source] if source is not None else []))
+        if self.self_events.is_self(path, source):
+            return
+
+        root = self.root_for(path)
+        if root is None or not root.ingests(path):
+            # Files leaving an inbox for a folder that is not ingested stop settling
+            if source is not None:
+                detector.discard(source)
+            if kind == DELETED:
+                detector.discard(path)
+            return
+
+        if kind == CHANGED:
+            detector.track(path)
+        elif kind == CLOSED:
+            detector.closed(path)
+        elif kind == DELETED:
+            detector.discard(path)
+        else:
+            source_root = self.root_for(source)
+            if source_root is None or not source_root.ingests(source):
+                # Moved in from a folder that is not ingested: a new file here
+                detector.track(path)
+            else:
+                detector.moved(source, path)